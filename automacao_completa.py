@@ -1,119 +1,2641 @@
 # -*- coding: utf-8 -*-
 
+import time
+INICIO_PROCESSO = time.monotonic()
+
 import tkinter as tk
-from tkinter import simpledialog, messagebox, scrolledtext
-import pandas as pd
-import openpyxl
-from openpyxl import Workbook, load_workbook
+from tkinter import simpledialog, messagebox, scrolledtext, filedialog, ttk
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.common.keys import Keys
 import threading
 import logging
+import logging.handlers
+import atexit
+import gzip
+import shutil
 import os
 import sys
 import traceback
-import time
+import json
+import csv
+import pickle
+import sqlite3
+import heapq
+import bisect
+import queue
+import argparse
+import platform
+from urllib.parse import urljoin, quote
+from collections import namedtuple, deque
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import pyperclip
 
-# --- CONFIGURAÇÕES E CONSTANTES ---
-logging.basicConfig(filename="log_automacao.log", level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+# pandas, openpyxl e selenium (e o urllib3 que vem com ele) demoram a importar, principalmente
+# no .exe: são carregados por carregar_modulos_pesados(), depois que a janela já apareceu.
+pd = openpyxl = Workbook = load_workbook = None
+webdriver = ChromeService = By = WebDriverWait = EC = TimeoutException = Keys = urllib3 = None
+_lock_modulos = threading.Lock()
+
+def carregar_modulos_pesados():
+    """ Importa os módulos pesados na primeira chamada; as seguintes não custam nada """
+    global pd, openpyxl, Workbook, load_workbook
+    global webdriver, ChromeService, By, WebDriverWait, EC, TimeoutException, Keys, urllib3
+    if Keys is not None:
+        return
+    with _lock_modulos:
+        if Keys is not None:
+            return
+        inicio = time.monotonic()
+        import pandas as _pd
+        import openpyxl as _openpyxl
+        import urllib3 as _urllib3
+        from selenium import webdriver as _webdriver
+        from selenium.webdriver.chrome.service import Service as _ChromeService
+        from selenium.webdriver.common.by import By as _By
+        from selenium.webdriver.support.ui import WebDriverWait as _WebDriverWait
+        from selenium.webdriver.support import expected_conditions as _EC
+        from selenium.common.exceptions import TimeoutException as _TimeoutException
+        from selenium.webdriver.common.keys import Keys as _Keys
+        pd, openpyxl, urllib3 = _pd, _openpyxl, _urllib3
+        Workbook, load_workbook = _openpyxl.Workbook, _openpyxl.load_workbook
+        webdriver, ChromeService, By, WebDriverWait = _webdriver, _ChromeService, _By, _WebDriverWait
+        EC, TimeoutException = _EC, _TimeoutException
+        # Keys por último: é o sinal de que todos os outros já estão prontos
+        Keys = _Keys
+        logging.info(f"Módulos pesados carregados em {time.monotonic() - inicio:.2f}s.")
+
+# --- LOG (GRAVADO EM SEGUNDO PLANO) ---
+NOME_ARQUIVO_LOG = "log_automacao.log"
+# Um JSON por linha (COD, etapa, resultado, duração) para analisar as execuções
+NOME_ARQUIVO_EVENTOS = "eventos_automacao.jsonl"
+LOG_TAMANHO_PADRAO_MB = 10.0
+LOG_ARQUIVOS_PADRAO = 10
+
+_log_eventos = logging.getLogger("automacao.eventos")
+_arquivos_log = []
+_ouvinte_log = None
+
+
+class ArquivoLogRotativo(logging.handlers.RotatingFileHandler):
+    """
+    Arquivo que vira o .1.gz ao passar do tamanho máximo ou na primeira linha de um novo dia;
+    os antigos são comprimidos com gzip e só os `arquivos` mais recentes são mantidos.
+    """
+    def __init__(self, caminho, tamanho_maximo, arquivos):
+        super().__init__(caminho, maxBytes=tamanho_maximo, backupCount=arquivos, encoding="utf-8", delay=True)
+        self.namer = lambda nome: nome + ".gz"
+        self.rotator = self._comprimir
+        try:
+            self._dia = datetime.fromtimestamp(os.path.getmtime(caminho)).date()
+        except OSError:
+            self._dia = datetime.now().date()
+
+    def shouldRollover(self, record):
+        hoje = datetime.fromtimestamp(record.created).date()
+        if hoje != self._dia:
+            self._dia = hoje
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return 1
+        return super().shouldRollover(record)
+
+    @staticmethod
+    def _comprimir(origem, destino):
+        with open(origem, "rb") as f_origem, gzip.open(destino, "wb") as f_destino:
+            shutil.copyfileobj(f_origem, f_destino)
+        os.remove(origem)
+
+
+class FormatadorEvento(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.evento, ensure_ascii=False, default=str)
+
+
+def iniciar_log(nivel=logging.INFO):
+    """
+    O log comum e o de eventos passam por uma fila: quem registra só enfileira, e uma thread
+    do QueueListener grava, roda e comprime os arquivos.
+    """
+    global _ouvinte_log
+    if _ouvinte_log is not None:
+        return
+    tamanho = int(LOG_TAMANHO_PADRAO_MB * 1024 * 1024)
+    texto = ArquivoLogRotativo(NOME_ARQUIVO_LOG, tamanho, LOG_ARQUIVOS_PADRAO)
+    texto.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    texto.addFilter(lambda record: not hasattr(record, 'evento'))
+    eventos = ArquivoLogRotativo(NOME_ARQUIVO_EVENTOS, tamanho, LOG_ARQUIVOS_PADRAO)
+    eventos.setFormatter(FormatadorEvento())
+    eventos.addFilter(lambda record: hasattr(record, 'evento'))
+    _arquivos_log[:] = [texto, eventos]
+
+    fila_log = queue.Queue(-1)
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    raiz.addHandler(logging.handlers.QueueHandler(fila_log))
+    _ouvinte_log = logging.handlers.QueueListener(fila_log, texto, eventos, respect_handler_level=True)
+    _ouvinte_log.start()
+    atexit.register(encerrar_log)
+
+def ajustar_log(config):
+    """ Aplica log_tamanho_mb e log_arquivos do config.txt aos dois arquivos """
+    for arquivo in _arquivos_log:
+        arquivo.maxBytes = int(config['log_tamanho_mb'] * 1024 * 1024)
+        arquivo.backupCount = max(1, int(config['log_arquivos']))
+
+def encerrar_log():
+    """ Grava o que ainda está na fila (chamado na saída do programa) """
+    global _ouvinte_log
+    if _ouvinte_log is not None:
+        _ouvinte_log.stop()
+        _ouvinte_log = None
+        for arquivo in _arquivos_log:
+            arquivo.close()
+
+def registrar_evento(etapa, cod, resultado=None, duracao=None, **extras):
+    """ Uma linha no arquivo de eventos; `duracao` em segundos """
+    evento = {'hora': datetime.now().isoformat(timespec='milliseconds'), 'cod': cod, 'etapa': etapa,
+              'resultado': resultado, 'duracao': round(duracao, 3) if duracao is not None else None}
+    evento.update(extras)
+    _log_eventos.info(etapa, extra={'evento': evento})
+
+iniciar_log()
+
+# --- CONFIGURAÇÕES E CONSTANTES ---
+
+# Arquivos de configuração
+NOME_ARQUIVO_EXCEL = "automacao_weon.xlsx"
+NOME_ARQUIVO_LOGIN = "login.txt"
+NOME_ARQUIVO_CONFIG = "config.txt"
+
+# Diário (journal) das escritas pendentes na planilha
+NOME_ARQUIVO_DIARIO = "automacao_weon.diario"
+
+# Cache persistente das buscas de telefone
+NOME_ARQUIVO_CACHE = "cache_telefones.db"
+
+# Índice de contatados e ponto de retomada da execução
+NOME_ARQUIVO_ESTADO = "estado_automacao.db"
+
+# Lista de contatos já classificada (pickle), reaproveitada enquanto a aba de contatos não muda
+NOME_ARQUIVO_PLANO = "plano_execucao.pkl"
+
+# Contagem dos resultados por dia, hora e categoria (para o relatório dos supervisores)
+NOME_ARQUIVO_RESUMO = "resumo_resultados.db"
+
+# Tempos por etapa e contadores da execução (JSON, sobrescrito periodicamente)
+NOME_ARQUIVO_METRICAS = "metricas_automacao.json"
+
+# Valores padrão das opções do config.txt (opcional)
+CONFIG_PADRAO = {
+    'lote_escrita': 50,          # Nº de operações pendentes que dispara a gravação na planilha
+    'intervalo_escrita': 30.0,   # Segundos máximos entre a primeira operação pendente e a gravação
+    'busca_antecipada': True,    # Busca os telefones dos próximos CODs num segundo Chrome durante a chamada
+    'profundidade_busca': 3,     # Quantos CODs à frente a busca antecipada resolve
+    'cache_validade_horas': 720.0,         # Validade de um telefone encontrado no cache de buscas
+    'cache_validade_negativa_horas': 24.0, # Validade de um "não encontrado"/divergência no cache
+    'cache_max_entradas': 200000,          # Acima disso os registros usados há mais tempo são descartados
+    # Pausas extras (segundos) por etapa do loop; as esperas pela tela não dependem delas
+    'atraso_antes_discar': 0.0,
+    'atraso_ja_contatado': 0.0,
+    'atraso_apos_divergencia': 0.0,
+    'atraso_apos_nao_encontrado': 0.0,
+    'atraso_apos_erro_discagem': 2.0,
+    'atraso_sem_telefone': 0.0,
+    'lote_enriquecimento': 200,  # Modo --enriquecer: resultados acumulados antes de cada gravação
+    # Busca direta por HTTP (desligada enquanto api_busca_url estiver vazio)
+    'api_busca_url': '',          # Ex.: /api/contatos?busca={codigo} (relativo à URL do login.txt)
+    'api_campo_lista': 'data',    # Caminho (com pontos) até a lista de resultados no JSON
+    'api_campo_cod': 'cod',       # Campo do COD em cada resultado
+    'api_campo_telefone': 'telefone',
+    'api_token_storage': '',      # Chave do localStorage com o token Bearer, se o Weon usar um
+    'api_max_conexoes': 4,        # Requisições simultâneas permitidas
+    'api_timeout': 10.0,
+    # Chamadas que não conectam são registradas sozinhas (NAO ATENDEU / CAIU), sem esperar o operador
+    'deteccao_chamada': True,
+    'tempo_toque': 40.0,               # Segundos de toque sem atendimento antes de desligar e registrar NAO ATENDEU (exige seletor_chamada_atendida)
+    'tempo_minimo_chamada': 5.0,       # Chamada que some antes disso é registrada como CAIU
+    'seletor_chamada_atendida': '',    # CSS de um elemento que só existe com a chamada atendida (ex.: o cronômetro); vazio: só CAIU é automático
+    # Inicialização e recuperação do Chrome
+    'perfil_chrome': '',          # Pasta de perfil do Chrome reaproveitada entre execuções (mantém a sessão do Weon)
+    'preaquecer_chrome': True,    # Abre o Chrome e a página do Weon enquanto a janela está ociosa
+    'chrome_headless': False,     # Chrome da discagem sem janela (usado pelo benchmark)
+    'max_tentativas_reconexao': 8,  # Tentativas (com espera crescente) de reabrir o Chrome/refazer o login após uma queda
+    # Campanha compartilhada entre operadores (desligada enquanto campanha_compartilhada estiver vazio)
+    'campanha_compartilhada': '',   # Caminho do .db numa pasta compartilhada (ex.: \\servidor\ligacoes\campanha.db)
+    'nome_operador': '',            # Como esta máquina aparece nos resultados da campanha (padrão: usuário@máquina)
+    'lote_campanha': 20,            # CODs reservados de cada vez
+    'reserva_campanha_segundos': 300.0,  # Prazo da reserva; renovado enquanto o programa está aberto
+    # Métricas de desempenho
+    'janela_metricas': 200,       # Últimas medições de cada etapa usadas no p50/p95/máx
+    'intervalo_metricas': 30.0,   # Segundos entre as gravações do arquivo de métricas
+    # Log (log_automacao.log e eventos_automacao.jsonl)
+    'log_tamanho_mb': LOG_TAMANHO_PADRAO_MB,  # Tamanho que faz o arquivo rodar (ele também roda a cada dia)
+    'log_arquivos': LOG_ARQUIVOS_PADRAO,      # Arquivos antigos (.gz) mantidos de cada um
+}
+
+# Abas da Planilha
+ABA_CONTATOS = "contatos"
+ABA_RESULTADOS = "resultados"
+ABA_RETORNOS = "retornos"
+ABA_PRIORIDADE = "PRIORIDADE"
+
+# Seletores do Selenium (CSS: o navegador resolve mais rápido que XPath e servem também no JavaScript)
+SELETOR_BOTAO_ENCERRAR_CHAMADA = 'button[class="v-btn v-btn--block theme--dark green accent-5"]'
+SELETOR_CAMPO_BUSCA = 'input[aria-label="Buscar contato"]'
+SELETOR_DIALOGO_ATIVO = 'div.v-dialog--active'
+SELETOR_ICONE_DISCADOR = 'button i.mdi-rocket-launch'
+SELETOR_CAMPO_TELEFONE = 'input[type="text"][placeholder="Telefone"]'
+SELETOR_TEXTO_ACIONAR = 'span.white--text'
+
+# Scripts injetados: cada execução é uma única ida e volta ao chromedriver
+# Estado do diálogo de busca: aberto?, quantas linhas e o COD (1ª coluna) e telefone (3ª) da primeira linha
+SCRIPT_LER_DIALOGO = """
+var dialogo = document.querySelector(arguments[0]);
+if (!dialogo || !dialogo.getClientRects().length) return {aberto: false, linhas: 0, cod: null, telefone: null};
+var linhas = dialogo.querySelectorAll('tbody > tr');
+var celulas = linhas.length ? linhas[0].querySelectorAll('td') : [];
+return {aberto: true, linhas: linhas.length,
+        cod: celulas.length > 0 ? celulas[0].innerText.trim() : null,
+        telefone: celulas.length > 2 ? celulas[2].innerText.trim() : null};
+"""
+# Clica no botão do discador (o que contém o ícone) se ele estiver visível e habilitado
+SCRIPT_ABRIR_DISCADOR = """
+var icone = document.querySelector(arguments[0]);
+var botao = icone && icone.closest('button');
+if (!botao || botao.disabled || !botao.getClientRects().length) return false;
+botao.click();
+return true;
+"""
+# Devolve o campo de telefone já limpo (ou null enquanto ele não aparece)
+SCRIPT_CAMPO_TELEFONE = """
+var campo = document.querySelector(arguments[0]);
+if (!campo || !campo.getClientRects().length) return null;
+campo.value = '';
+campo.dispatchEvent(new Event('input', {bubbles: true}));
+return campo;
+"""
+# Clica no botão cujo texto é exatamente o informado
+SCRIPT_CLICAR_TEXTO = """
+var textos = document.querySelectorAll(arguments[0]);
+for (var i = 0; i < textos.length; i++) {
+  if (textos[i].textContent.trim() !== arguments[1]) continue;
+  var botao = textos[i].closest('button') || textos[i];
+  if (botao.disabled || !botao.getClientRects().length) return false;
+  botao.click();
+  return true;
+}
+return false;
+"""
+SCRIPT_EXISTE = "return document.querySelector(arguments[0]) !== null;"
+SCRIPT_ESTADO_CHAMADA = """
+var botao = document.querySelector(arguments[0]);
+return {
+  ativa: botao !== null && botao.getClientRects().length > 0,
+  atendida: arguments[1] ? document.querySelector(arguments[1]) !== null : false
+};
+"""
+SCRIPT_CLICAR = """
+var elemento = document.querySelector(arguments[0]);
+if (!elemento) return false;
+elemento.click();
+return true;
+"""
+SCRIPT_DIALOGO_FECHADO = """
+var dialogo = document.querySelector(arguments[0]);
+return !dialogo || !dialogo.getClientRects().length;
+"""
+
+# Níveis de prioridade da fila de tarefas (menor = atendido antes)
+PRIORIDADE_MANUAL = 0     # CODs adicionados pelo botão durante a execução
+PRIORIDADE_PLANILHA = 1   # Aba PRIORIDADE
+PRIORIDADE_RETORNO = 2    # Retornos agendados que já venceram
+PRIORIDADE_LISTA = 3      # Lista principal (aba de contatos)
+
+# Resultado gravado para um COD que não pode ser buscado
+OBS_CODIGO_INVALIDO = "CÓDIGO/CNPJ INVÁLIDO"
+
+# Resultados gravados pela detecção de chamadas (sem o operador)
+OBS_NAO_ATENDEU = "NAO ATENDEU"
+OBS_CAIU = "CAIU"
+
+# Coluna STATUS da aba de retornos
+STATUS_RETORNO_AGUARDANDO = "aguardando"
+STATUS_RETORNO_CONCLUIDO = "concluido"
+
+# Situações possíveis de uma busca de telefone
+BUSCA_ENCONTRADO = "encontrado"
+BUSCA_DIVERGENTE = "divergente"
+BUSCA_NAO_ENCONTRADO = "nao_encontrado"
+BUSCA_ERRO = "erro"   # Falha inesperada no navegador: tratada como não encontrado, mas não vai para o cache
+
+
+# --- FUNÇÃO DE AJUDA PARA PYINSTALLER ---
+def resource_path(relative_path):
+    """ Retorna o caminho absoluto para o recurso, funciona para desenvolvimento e para o PyInstaller """
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+# --- FUNÇÕES AUXILIARES ---
+def verificar_ou_criar_planilha():
+    if not os.path.exists(NOME_ARQUIVO_EXCEL):
+        logging.info(f"Arquivo '{NOME_ARQUIVO_EXCEL}' não encontrado. Criando um novo.")
+        carregar_modulos_pesados()
+        wb = Workbook()
+        ws_contatos = wb.active
+        ws_contatos.title = ABA_CONTATOS
+        ws_contatos.append(['COD', 'TELEFONE'])
+        ws_resultados = wb.create_sheet(ABA_RESULTADOS)
+        ws_resultados.append(['COD', 'TELEFONE', 'HORA', 'DATA', 'OBSERVACAO'])
+        ws_retornos = wb.create_sheet(ABA_RETORNOS)
+        ws_retornos.append(['COD', 'TELEFONE', 'HORA', 'DATA', 'STATUS'])
+        ws_prioridade = wb.create_sheet(ABA_PRIORIDADE)
+        ws_prioridade.append(['COD'])
+        wb.save(NOME_ARQUIVO_EXCEL)
+        logging.info("Planilha criada com sucesso.")
+        messagebox.showinfo("Planilha Criada", 
+                            f"A planilha '{NOME_ARQUIVO_EXCEL}' foi criada com as abas necessárias, incluindo a aba 'PRIORIDADE'.")
+    else:
+        logging.info(f"Planilha '{NOME_ARQUIVO_EXCEL}' encontrada.")
+
+def verificar_ou_criar_login():
+    if not os.path.exists(NOME_ARQUIVO_LOGIN):
+        with open(NOME_ARQUIVO_LOGIN, "w", encoding="utf-8") as f:
+            f.write("Usuário=\nSenha=\nURL=\n")
+        logging.info("Arquivo login.txt criado automaticamente.")
+        messagebox.showinfo("Login Criado", f"O arquivo '{NOME_ARQUIVO_LOGIN}' foi criado.\n\nPor favor, preencha seu usuário, senha e a URL do sistema Weon antes de continuar.")
+
+def ler_login():
+    try:
+        config = {}
+        with open(NOME_ARQUIVO_LOGIN, "r", encoding="utf-8") as f:
+            for linha in f:
+                if "=" in linha:
+                    chave, valor = linha.strip().split("=", 1)
+                    config[chave.strip().lower()] = valor.strip()
+        
+        usuario = config.get('usuário')
+        senha = config.get('senha')
+        url = config.get('url')
+
+        if not all([usuario, senha, url]):
+            raise ValueError("Usuário, senha ou URL não preenchidos no login.txt")
+        
+        return usuario, senha, url
+    except (FileNotFoundError, ValueError) as e:
+        raise ValueError(f"Erro ao ler '{NOME_ARQUIVO_LOGIN}': {e}.")
+
+def ler_configuracoes():
+    """ Lê o config.txt (opcional) e devolve as opções mescladas com CONFIG_PADRAO """
+    config = dict(CONFIG_PADRAO)
+    if not os.path.exists(NOME_ARQUIVO_CONFIG):
+        return config
+    with open(NOME_ARQUIVO_CONFIG, "r", encoding="utf-8") as f:
+        for linha in f:
+            if "=" not in linha or linha.lstrip().startswith("#"):
+                continue
+            chave, valor = linha.strip().split("=", 1)
+            chave, valor = chave.strip().lower(), valor.split("#", 1)[0].strip()
+            padrao = CONFIG_PADRAO.get(chave)
+            try:
+                if isinstance(padrao, bool):
+                    config[chave] = valor.lower() in ("1", "sim", "true", "s")
+                elif isinstance(padrao, (int, float)):
+                    config[chave] = type(padrao)(valor)
+                else:
+                    config[chave] = valor
+            except ValueError:
+                logging.warning(f"Valor inválido para '{chave}' no {NOME_ARQUIVO_CONFIG}: {valor}. Usando o padrão.")
+    return config
+
+def esperar_elemento(driver, by, value, tempo=10):
+    try:
+        return WebDriverWait(driver, tempo).until(EC.presence_of_element_located((by, value)))
+    except TimeoutException:
+        logging.error(f"Timeout esperando elemento: {value}")
+        return None
+
+def esperar_elemento_clickable(driver, by, value, tempo=10):
+    try:
+        return WebDriverWait(driver, tempo).until(EC.element_to_be_clickable((by, value)))
+    except TimeoutException:
+        logging.error(f"Timeout esperando elemento clicável: {value}")
+        return None
+
+def limpar_codigo(codigo_bruto):
+    if not isinstance(codigo_bruto, str): return ""
+    return re.sub(r'[^0-9]', '', codigo_bruto)
+
+def impressao_arquivo(caminho):
+    """ Identifica a versão do arquivo em disco (data de modificação e tamanho) """
+    try:
+        info = os.stat(caminho)
+        return f"{info.st_mtime_ns}:{info.st_size}"
+    except OSError:
+        return None
+
+
+# --- FUNÇÕES DO NAVEGADOR ---
+ResultadoBusca = namedtuple('ResultadoBusca', ['codigo_buscado', 'cod_encontrado', 'telefone', 'situacao'])
+
+def observacao_busca(resultado):
+    """ Texto gravado nos resultados quando a busca não rende um telefone para ligar """
+    if resultado.situacao == BUSCA_DIVERGENTE:
+        return f"DIVERGÊNCIA: Buscou {resultado.codigo_buscado}, encontrou {resultado.cod_encontrado}"
+    return 'TELEFONE NÃO ENCONTRADO'
+
+def linha_resultado(cod, tel, obs):
+    agora = datetime.now()
+    return [str(cod), str(tel), agora.strftime("%H:%M:%S"), agora.strftime("%d/%m/%Y"), obs]
+
+def classificar_busca(codigo_limpo, cod_encontrado, telefone):
+    if cod_encontrado and limpar_codigo(cod_encontrado) != codigo_limpo:
+        situacao = BUSCA_DIVERGENTE
+    elif telefone:
+        situacao = BUSCA_ENCONTRADO
+    else:
+        situacao = BUSCA_NAO_ENCONTRADO
+    return ResultadoBusca(codigo_limpo, cod_encontrado, telefone, situacao)
+
+def criar_driver(headless=False, perfil=None):
+    carregar_modulos_pesados()
+    chrome_options = webdriver.ChromeOptions()
+    prefs = {"profile.default_content_setting_values.notifications": 2, "profile.default_content_setting_values.media_stream_mic": 1}
+    chrome_options.add_experimental_option("prefs", prefs)
+    chrome_options.add_argument("--force-device-scale-factor=0.7")
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    if perfil:
+        # O Chrome trava a pasta do perfil: só o navegador principal a usa
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(perfil)}")
+
+    caminho_chromedriver = resource_path("chromedriver.exe")
+    service = ChromeService(executable_path=caminho_chromedriver)
+    return contar_chamadas_webdriver(webdriver.Chrome(service=service, options=chrome_options))
+
+def preencher_login(driver, usuario, senha):
+    """ Preenche e envia a tela de login que já está aberta """
+    esperar_elemento(driver, By.NAME, "login").send_keys(usuario)
+    esperar_elemento(driver, By.ID, "password").send_keys(senha)
+    esperar_elemento_clickable(driver, By.XPATH, "//button[contains(., 'Acessar')]").click()
+
+def entrar_no_weon(driver, usuario, senha, url_weon, tempo=30):
+    """
+    Abre o Weon (se o navegador ainda não estiver nele) e faz o login só se a tela de login
+    aparecer. Retorna False quando a sessão do perfil ainda era válida e o login foi pulado.
+    """
+    if not driver.current_url.startswith(url_weon):
+        driver.get(url_weon)
+    WebDriverWait(driver, tempo).until(EC.any_of(
+        EC.presence_of_element_located((By.NAME, "login")),
+        EC.presence_of_element_located((By.CSS_SELECTOR, SELETOR_CAMPO_BUSCA))))
+    if driver.find_elements(By.CSS_SELECTOR, SELETOR_CAMPO_BUSCA):
+        return False
+    preencher_login(driver, usuario, senha)
+    return True
+
+def contar_chamadas_webdriver(driver):
+    """ Conta os comandos enviados ao chromedriver (cada um é uma requisição HTTP) em driver.chamadas_webdriver """
+    executar = driver.execute
+    driver.chamadas_webdriver = 0
+    def execute(comando, parametros=None):
+        driver.chamadas_webdriver += 1
+        return executar(comando, parametros)
+    driver.execute = execute
+    return driver
+
+def esperar_script(driver, tempo, script, *argumentos):
+    """ Repete o script até ele devolver algo verdadeiro (uma chamada ao chromedriver por tentativa); None no timeout """
+    try:
+        return WebDriverWait(driver, tempo, poll_frequency=0.1).until(lambda d: d.execute_script(script, *argumentos))
+    except TimeoutException:
+        return None
+
+def ler_dialogo(driver):
+    return driver.execute_script(SCRIPT_LER_DIALOGO, SELETOR_DIALOGO_ATIVO)
+
+def esperar_dialogo_fechar(driver, tempo=5):
+    """ Espera o diálogo do Vuetify sumir depois do ESC, em vez de uma pausa fixa """
+    if esperar_script(driver, tempo, SCRIPT_DIALOGO_FECHADO, SELETOR_DIALOGO_ATIVO) is None:
+        logging.warning("Diálogo de busca continuou aberto após o ESC.")
+        return False
+    return True
+
+def esperar_pagina_principal(driver, tempo=30):
+    return esperar_elemento(driver, By.CSS_SELECTOR, SELETOR_CAMPO_BUSCA, tempo) is not None
+
+def discar(driver, telefone):
+    """ Abre o discador, digita o número e aciona; cada espera é um script por tentativa. Espera o botão de encerrar aparecer """
+    if not esperar_script(driver, 30, SCRIPT_ABRIR_DISCADOR, SELETOR_ICONE_DISCADOR):
+        raise Exception("Botão de discador não encontrado")
+    campo_telefone = esperar_script(driver, 10, SCRIPT_CAMPO_TELEFONE, SELETOR_CAMPO_TELEFONE)
+    if not campo_telefone:
+        raise Exception("Campo de telefone não encontrado")
+    campo_telefone.send_keys(str(telefone))
+    if not esperar_script(driver, 10, SCRIPT_CLICAR_TEXTO, SELETOR_TEXTO_ACIONAR, 'Acionar'):
+        raise Exception("Botão 'Acionar' não encontrado")
+    if esperar_script(driver, 30, SCRIPT_EXISTE, SELETOR_BOTAO_ENCERRAR_CHAMADA) is None:
+        logging.error(f"Timeout esperando o botão de encerrar chamada: {SELETOR_BOTAO_ENCERRAR_CHAMADA}")
+
+def estado_chamada(driver, seletor_atendida=''):
+    """ {'ativa': botão de encerrar visível, 'atendida': elemento de chamada atendida presente} """
+    return driver.execute_script(SCRIPT_ESTADO_CHAMADA, SELETOR_BOTAO_ENCERRAR_CHAMADA, seletor_atendida)
+
+def desligar(driver):
+    return bool(driver.execute_script(SCRIPT_CLICAR, SELETOR_BOTAO_ENCERRAR_CHAMADA))
+
+
+class DetectorChamada:
+    """
+    Decide, a cada leitura da página, se a chamada terminou sem precisar do operador:
+      - o botão de encerrar sumiu antes de tempo_minimo: CAIU (não conectou);
+      - com seletor_atendida: sumiu sem ter sido atendida, ou tocou mais que tempo_toque
+        (nesse caso é preciso desligar): NAO ATENDEU;
+      - sem seletor_atendida não há como saber se atenderam (uma chamada curta atendida
+        também some antes de tempo_toque), então só o CAIU é automático; depois de
+        tempo_minimo a chamada fica com o operador.
+    Uma chamada atendida é sempre do operador (com_operador).
+    """
+    def __init__(self, tempo_toque, tempo_minimo, seletor_atendida=''):
+        self.tempo_toque = float(tempo_toque)
+        self.tempo_minimo = float(tempo_minimo)
+        self.seletor_atendida = seletor_atendida
+        self.com_operador = False
+
+    def avaliar(self, estado, decorrido):
+        """ Devolve (observação, desligar) quando a chamada terminou sem o operador, senão None """
+        if self.com_operador or estado.get('atendida'):
+            self.com_operador = True
+            return None
+        if not estado.get('ativa'):
+            if decorrido < self.tempo_minimo:
+                return OBS_CAIU, False
+            if self.seletor_atendida:
+                return OBS_NAO_ATENDEU, False
+            self.com_operador = True
+            return None
+        if not self.seletor_atendida and decorrido >= self.tempo_minimo:
+            # Já conectou e não há como saber o resto: o operador registra
+            self.com_operador = True
+            return None
+        if self.seletor_atendida and decorrido >= self.tempo_toque:
+            return OBS_NAO_ATENDEU, True
+        return None
+
+
+def buscar_contato(driver, codigo_limpo_buscado):
+    """ Pesquisa o código no diálogo de busca do Weon e devolve o ResultadoBusca """
+    cod_encontrado, telefone_encontrado = _buscar_no_dialogo(driver, codigo_limpo_buscado)
+    if cod_encontrado is BUSCA_ERRO:
+        return ResultadoBusca(codigo_limpo_buscado, None, None, BUSCA_ERRO)
+    return classificar_busca(codigo_limpo_buscado, cod_encontrado, telefone_encontrado)
+
+def _buscar_no_dialogo(driver, codigo_limpo_buscado):
+    try:
+        campo_pesquisa = WebDriverWait(driver, 15).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, SELETOR_CAMPO_BUSCA)))
+        campo_pesquisa.clear()
+        campo_pesquisa.send_keys(codigo_limpo_buscado + Keys.ENTER)
+
+        # Uma leitura da linha inteira por tentativa, até a primeira coluna trazer o código buscado
+        def linha_do_codigo(d):
+            dialogo = ler_dialogo(d)
+            return dialogo if dialogo['cod'] and codigo_limpo_buscado in dialogo['cod'] else False
+        dialogo = WebDriverWait(driver, 15, poll_frequency=0.1).until(linha_do_codigo)
+
+        cod_encontrado = dialogo['cod']
+        telefone_encontrado = dialogo['telefone'] or ''
+        webdriver.ActionChains(driver).send_keys(Keys.ESCAPE).perform()
+        esperar_dialogo_fechar(driver)
+        if telefone_encontrado and telefone_encontrado != "-":
+            return cod_encontrado, telefone_encontrado
+        return cod_encontrado, None
+
+    except TimeoutException:
+        logging.warning(f"Timeout buscando telefone para {codigo_limpo_buscado}. Nenhum resultado encontrado.")
+        try: 
+            webdriver.ActionChains(driver).send_keys(Keys.ESCAPE).perform()
+            esperar_dialogo_fechar(driver)
+        except: pass
+        return None, None
+    except Exception as e:
+        logging.error(f"Erro inesperado ao buscar {codigo_limpo_buscado}. Detalhes: {e}")
+        return BUSCA_ERRO, None
+
+
+# --- ESCRITA EM LOTE NA PLANILHA (WRITE-BEHIND) ---
+class IndiceLinhas:
+    """ Índice chave -> nº da linha de uma aba, montado uma vez e mantido a cada append """
+    def __init__(self, colunas=(1,)):
+        self.colunas = tuple(colunas)
+        self._linhas = None
+        self._ultima_linha = 0
+
+    def chave(self, valores):
+        return tuple(str(v) for v in valores) if len(self.colunas) > 1 else str(valores[0])
+
+    def construir(self, sheet):
+        self._linhas = {}
+        menor, maior = min(self.colunas), max(self.colunas)
+        for numero, valores in enumerate(sheet.iter_rows(min_row=2, min_col=menor, max_col=maior, values_only=True), start=2):
+            valores_chave = [valores[c - menor] for c in self.colunas]
+            if valores_chave[0] is None:
+                continue
+            # Em CODs repetidos vale a primeira ocorrência, como na busca linha a linha
+            self._linhas.setdefault(self.chave(valores_chave), numero)
+        self._ultima_linha = sheet.max_row
+        logging.info(f"Índice da aba '{sheet.title}' montado com {len(self._linhas)} chaves.")
+
+    def registrar_anexo(self, sheet, dados_linha):
+        if self._linhas is None or not dados_linha:
+            return
+        valores_chave = [dados_linha[c - 1] if c - 1 < len(dados_linha) else None for c in self.colunas]
+        if valores_chave[0] is not None:
+            self._linhas.setdefault(self.chave(valores_chave), sheet.max_row)
+        self._ultima_linha = sheet.max_row
+
+    def localizar(self, sheet, chave):
+        """ Devolve a linha da chave, remontando o índice se a aba foi alterada por fora """
+        if self._linhas is None:
+            self.construir(sheet)
+        linha = self._linhas.get(chave)
+        if linha is None:
+            if sheet.max_row == self._ultima_linha:
+                return None
+        elif self._confere(sheet, linha, chave):
+            return linha
+        self.construir(sheet)
+        return self._linhas.get(chave)
+
+    def _confere(self, sheet, linha, chave):
+        valores = [sheet.cell(linha, c).value for c in self.colunas]
+        return valores[0] is not None and self.chave(valores) == chave
+
+
+class EscritorPlanilha:
+    """
+    Registra as operações de escrita num diário append-only (uma linha JSON por operação,
+    com fsync) e as aplica na planilha em lotes, numa thread própria. Gravar um resultado
+    custa só o append no diário; o load/save do workbook acontece uma vez por lote.
+    Se o programa cair, as operações que ficaram no diário são reaplicadas na próxima abertura.
+    """
+    def __init__(self, caminho_excel, caminho_diario, lock, lote_maximo=50, intervalo_maximo=30.0, notificar=None,
+                 metricas=None):
+        self.caminho_excel = caminho_excel
+        self.caminho_diario = caminho_diario
+        self.excel_lock = lock
+        self.lote_maximo = max(1, int(lote_maximo))
+        self.intervalo_maximo = float(intervalo_maximo)
+        self.notificar = notificar or (lambda mensagem: None)
+        self.metricas = metricas
+
+        self._condicao = threading.Condition()
+        self._pendentes = []
+        self._primeira_pendente_em = None
+        self._encerrando = False
+        self._indices = {ABA_CONTATOS: IndiceLinhas(colunas=(1,)), ABA_RETORNOS: IndiceLinhas(colunas=(1, 3, 4))}
+        self.ao_gravar = []   # Funções chamadas com (impressão depois, impressão antes) de cada gravação
+        self.ao_anexar = []   # Funções chamadas com (aba, linhas) a cada linha nova registrada no diário
+
+        self._pendentes.extend(self._ler_diario())
+        self.recuperadas = list(self._pendentes)
+        if self._pendentes:
+            logging.info(f"{len(self._pendentes)} operações pendentes recuperadas do diário '{caminho_diario}'.")
+            self._primeira_pendente_em = time.monotonic()
+        self._arquivo_diario = open(caminho_diario, "a", encoding="utf-8")
+
+        self._thread = threading.Thread(target=self._loop_gravacao, daemon=True)
+        self._thread.start()
+
+    def _ler_diario(self):
+        operacoes = []
+        if not os.path.exists(self.caminho_diario):
+            return operacoes
+        with open(self.caminho_diario, "r", encoding="utf-8") as f:
+            for linha in f:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    operacoes.append(json.loads(linha))
+                except ValueError:
+                    # Última linha truncada por uma queda no meio do append
+                    logging.warning(f"Linha corrompida ignorada no diário: {linha[:80]}")
+        return operacoes
+
+    def registrar(self, operacao):
+        """ Grava a operação no diário e a enfileira para a próxima gravação em lote """
+        self.registrar_varias([operacao])
+
+    def registrar_varias(self, operacoes):
+        """ Como registrar, com um único fsync para todas as operações """
+        if not operacoes:
+            return
+        with self._condicao:
+            self._arquivo_diario.write("".join(json.dumps(operacao, ensure_ascii=False) + "\n" for operacao in operacoes))
+            self._arquivo_diario.flush()
+            os.fsync(self._arquivo_diario.fileno())
+            self._pendentes.extend(operacoes)
+            if self._primeira_pendente_em is None:
+                self._primeira_pendente_em = time.monotonic()
+            if len(self._pendentes) >= self.lote_maximo:
+                self._condicao.notify()
+
+    def anexar(self, nome_aba, dados_linha):
+        self.anexar_varias(nome_aba, [dados_linha])
+
+    def anexar_varias(self, nome_aba, linhas):
+        """ Várias linhas com um único fsync no diário (e, como sempre, um único save do lote) """
+        linhas = [list(linha) for linha in linhas]
+        self.registrar_varias([{'op': 'anexar', 'aba': nome_aba, 'linha': linha} for linha in linhas])
+        for funcao in self.ao_anexar:
+            try:
+                funcao(nome_aba, linhas)
+            except Exception as e:
+                logging.error(f"Erro no aviso de linhas novas na aba '{nome_aba}': {e}")
+
+    def limpar_aba(self, nome_aba):
+        """ Apaga as linhas de dados da aba (mantém o cabeçalho) """
+        self.registrar({'op': 'limpar', 'aba': nome_aba})
+
+    def pendentes_da_aba(self, nome_aba):
+        """ Linhas ainda no diário (não gravadas) destinadas à aba """
+        with self._condicao:
+            return [op['linha'] for op in self._pendentes if op['op'] == 'anexar' and op['aba'] == nome_aba]
+
+    def atualizar_telefone(self, cod, telefone):
+        """ Grava o telefone na linha do COD na aba de contatos (várias atualizações viram um único save) """
+        self.registrar({'op': 'telefone', 'cod': str(cod), 'telefone': telefone})
+
+    def atualizar_status_retornos(self, chaves, status):
+        """ Muda o STATUS das linhas de retorno identificadas por (COD, HORA, DATA) """
+        self.registrar_varias([{'op': 'status_retorno', 'chave': list(chave), 'status': status} for chave in chaves])
+
+    def status_retornos_pendentes(self):
+        """ Mudanças de status de retorno ainda no diário: (COD, HORA, DATA) -> status """
+        with self._condicao:
+            return {tuple(op['chave']): op['status'] for op in self._pendentes if op['op'] == 'status_retorno'}
+
+    def descarregar(self):
+        """ Aplica imediatamente tudo o que está pendente. Retorna True se a planilha ficou em dia. """
+        return self._gravar_pendentes()
+
+    def encerrar(self):
+        with self._condicao:
+            self._encerrando = True
+            self._condicao.notify()
+        self._thread.join(timeout=60)
+        self.descarregar()
+        with self._condicao:
+            self._arquivo_diario.close()
+
+    def _loop_gravacao(self):
+        while True:
+            with self._condicao:
+                while not self._encerrando:
+                    if len(self._pendentes) >= self.lote_maximo:
+                        break
+                    if self._primeira_pendente_em is not None:
+                        restante = self._primeira_pendente_em + self.intervalo_maximo - time.monotonic()
+                        if restante <= 0:
+                            break
+                        self._condicao.wait(restante)
+                    else:
+                        self._condicao.wait()
+                if self._encerrando:
+                    return
+            if not self._gravar_pendentes():
+                # Planilha provavelmente aberta no Excel: tenta de novo no próximo intervalo
+                with self._condicao:
+                    self._primeira_pendente_em = time.monotonic()
+
+    def _gravar_pendentes(self):
+        with self.excel_lock:
+            with self._condicao:
+                lote = list(self._pendentes)
+            if not lote:
+                return True
+            carregar_modulos_pesados()
+            inicio = time.monotonic()
+            # Como o arquivo estava antes desta gravação: se não é o que o programa gravou, alguém mexeu por fora
+            anterior = impressao_arquivo(self.caminho_excel)
+            try:
+                wb = load_workbook(self.caminho_excel)
+                telefones = {}
+                status_retornos = {}
+                for operacao in lote:
+                    if operacao['op'] == 'telefone':
+                        telefones[operacao['cod']] = operacao['telefone']
+                    elif operacao['op'] == 'status_retorno':
+                        status_retornos[tuple(operacao['chave'])] = operacao['status']
+                    else:
+                        self._aplicar(wb, operacao)
+                self._aplicar_telefones(wb, telefones)
+                self._aplicar_status_retornos(wb, status_retornos)
+                caminho_temp = self.caminho_excel + ".tmp"
+                wb.save(caminho_temp)
+                os.replace(caminho_temp, self.caminho_excel)
+            except Exception as e:
+                logging.error(f"Erro ao gravar lote de {len(lote)} operações na planilha: {e}")
+                self.notificar("Erro ao salvar na planilha! As linhas continuam no diário.")
+                return False
+            if self.metricas:
+                self.metricas.registrar('gravacao_planilha', time.monotonic() - inicio)
+
+            # Uma queda exatamente entre as duas trocas de arquivo reaplicaria o lote; a janela é mínima.
+            with self._condicao:
+                # Mantém no diário só o que chegou enquanto o lote era gravado
+                del self._pendentes[:len(lote)]
+                self._reescrever_diario()
+                self._primeira_pendente_em = time.monotonic() if self._pendentes else None
+            logging.info(f"Lote de {len(lote)} operações gravado na planilha.")
+            impressao = impressao_arquivo(self.caminho_excel)
+            for funcao in self.ao_gravar:
+                try:
+                    funcao(impressao, anterior)
+                except Exception as e:
+                    logging.error(f"Erro no aviso de gravação da planilha: {e}")
+            return True
+
+    def _reescrever_diario(self):
+        caminho_temp = self.caminho_diario + ".tmp"
+        with open(caminho_temp, "w", encoding="utf-8") as f:
+            for operacao in self._pendentes:
+                f.write(json.dumps(operacao, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._arquivo_diario.close()
+        os.replace(caminho_temp, self.caminho_diario)
+        self._arquivo_diario = open(self.caminho_diario, "a", encoding="utf-8")
+
+    def _aplicar(self, wb, operacao):
+        if operacao['op'] == 'anexar':
+            sheet = wb[operacao['aba']]
+            sheet.append(operacao['linha'])
+            indice = self._indices.get(operacao['aba'])
+            if indice:
+                indice.registrar_anexo(sheet, operacao['linha'])
+        elif operacao['op'] == 'limpar':
+            if operacao['aba'] in wb.sheetnames:
+                sheet = wb[operacao['aba']]
+                if sheet.max_row > 1:
+                    sheet.delete_rows(2, sheet.max_row)
+                logging.info(f"Aba '{operacao['aba']}' limpa com sucesso.")
+        else:
+            logging.warning(f"Operação desconhecida no diário: {operacao['op']}")
+
+    def _aplicar_telefones(self, wb, telefones):
+        """ Aplica as atualizações de telefone já coalescidas (a última de cada COD vale) """
+        if not telefones:
+            return
+        sheet = wb[ABA_CONTATOS]
+        indice = self._indices[ABA_CONTATOS]
+        for cod, telefone in telefones.items():
+            linha = indice.localizar(sheet, cod)
+            if linha is None:
+                logging.warning(f"COD {cod} não encontrado na aba '{ABA_CONTATOS}' para atualizar o telefone.")
+                continue
+            sheet.cell(linha, 2, value=telefone)
+            logging.info(f"Telefone '{telefone}' atualizado para o COD {cod}.")
+
+    def _aplicar_status_retornos(self, wb, status_retornos):
+        if not status_retornos:
+            return
+        sheet = wb[ABA_RETORNOS]
+        indice = self._indices[ABA_RETORNOS]
+        for chave, status in status_retornos.items():
+            linha = indice.localizar(sheet, chave)
+            if linha is None:
+                logging.warning(f"Retorno {chave} não encontrado na aba '{ABA_RETORNOS}' para mudar o status.")
+                continue
+            sheet.cell(linha, 5, value=status)
+        logging.info(f"Status de {len(status_retornos)} retornos atualizado.")
+
+
+# --- FILA DE TAREFAS ---
+Tarefa = namedtuple('Tarefa', ['cod', 'telefone', 'nivel', 'posicao'], defaults=[None])
+
+def chave_tarefa(cod):
+    """ Chave de deduplicação: o código limpo (ou o próprio texto, se não tiver dígitos) """
+    return limpar_codigo(cod) or cod
+
+def texto_celula(valor):
+    """ Converte o valor da célula para texto como o pandas faz com dtype=str (None vira '') """
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+def iterar_contatos(caminho_excel):
+    """ Lê a aba de contatos em modo streaming e gera pares (cod, telefone), sem montar DataFrame """
+    carregar_modulos_pesados()
+    wb = load_workbook(caminho_excel, read_only=True, data_only=True)
+    try:
+        linhas = wb[ABA_CONTATOS].iter_rows(values_only=True)
+        cabecalho = [texto_celula(v) for v in next(linhas, ())]
+        col_cod = cabecalho.index('COD') if 'COD' in cabecalho else 0
+        col_tel = cabecalho.index('TELEFONE') if 'TELEFONE' in cabecalho else 1
+        for valores in linhas:
+            cod = texto_celula(valores[col_cod]) if col_cod < len(valores) else ''
+            telefone = texto_celula(valores[col_tel]) if col_tel < len(valores) else ''
+            if cod or telefone:
+                yield cod, telefone
+    finally:
+        wb.close()
+
+class ListaContatos:
+    """
+    Lista principal em formato colunar: CODs e telefones em duas listas paralelas, sem um
+    dict por linha. É preenchida por uma thread enquanto o loop já consome as primeiras
+    linhas; quem pede uma posição ainda não lida espera a carga chegar até ela.
+    A posição de uma tarefa (e do ponto de retomada) é sempre a linha na aba de contatos:
+    numa lista que veio do plano, posicoes traz a linha de cada item e cods_planilha a aba toda.
+    """
+    TAMANHO_BLOCO = 1000
+
+    def __init__(self):
+        self.cods = []
+        self.telefones = []
+        self.posicoes = None
+        self.cods_planilha = None
+        self.carregados = 0
+        self.finalizada = False
+        self.completa = False   # A aba foi lida até o fim sem erro
+        self._condicao = threading.Condition()
+
+    def carregar(self, caminho_excel):
+        bloco_cods, bloco_telefones = [], []
+        try:
+            for cod, telefone in iterar_contatos(caminho_excel):
+                bloco_cods.append(cod)
+                bloco_telefones.append(telefone)
+                if len(bloco_cods) >= self.TAMANHO_BLOCO:
+                    self._publicar(bloco_cods, bloco_telefones)
+                    bloco_cods, bloco_telefones = [], []
+            self._publicar(bloco_cods, bloco_telefones)
+            self.completa = True
+            logging.info(f"{self.carregados} contatos carregados da aba '{ABA_CONTATOS}'.")
+        except Exception as e:
+            logging.error(f"Erro ao carregar a aba '{ABA_CONTATOS}': {e}")
+        finally:
+            with self._condicao:
+                self.finalizada = True
+                self._condicao.notify_all()
+
+    def preencher(self, cods, telefones, posicoes=None, cods_planilha=None):
+        """ Lista já pronta (do plano da execução): nada para carregar """
+        self.posicoes = posicoes
+        self.cods_planilha = cods_planilha
+        self._publicar(list(cods), list(telefones))
+        with self._condicao:
+            self.finalizada = True
+            self._condicao.notify_all()
+
+    def posicao_na_planilha(self, indice):
+        return self.posicoes[indice] if self.posicoes is not None else indice
+
+    def confere(self, posicao, cod):
+        """ O COD do ponto de retomada continua na mesma linha (sem esperar o resto da carga) """
+        planilha = self.cods if self.cods_planilha is None else self.cods_planilha
+        return posicao < len(planilha) and planilha[posicao] == cod
+
+    def retomar(self, posicao, cod):
+        """
+        Índice da lista logo depois do ponto de retomada (linha na aba + COD). Se a aba mudou
+        (linhas inseridas ou removidas), procura o próprio COD; None se ele não está mais lá.
+        """
+        planilha = self.cods if self.cods_planilha is None else self.cods_planilha
+        if not self.confere(posicao, cod):
+            chave = chave_tarefa(cod)
+            posicao = next((i for i, outro in enumerate(planilha) if chave_tarefa(outro) == chave), None)
+            if posicao is None:
+                return None
+        if self.posicoes is None:
+            return posicao + 1
+        return bisect.bisect_right(self.posicoes, posicao)
+
+    def _publicar(self, bloco_cods, bloco_telefones):
+        with self._condicao:
+            self.cods.extend(bloco_cods)
+            self.telefones.extend(bloco_telefones)
+            self.carregados = len(self.cods)
+            self._condicao.notify_all()
+
+    def aguardar(self, posicao, tempo_maximo=0.5):
+        """ Espera até a posição estar carregada (ou a carga terminar) """
+        with self._condicao:
+            if posicao >= self.carregados and not self.finalizada:
+                self._condicao.wait(tempo_maximo)
+
+class FilaTarefas:
+    """
+    Fila de prioridade (heap) com vários níveis e deduplicação pelo código limpo: o mesmo
+    cliente nunca fica duas vezes na fila nem volta depois de processado na execução.
+    Se um COD já enfileirado chega com prioridade maior, ele é promovido (a entrada antiga
+    fica marcada como obsoleta e é descartada ao sair do heap). A lista principal não entra
+    no heap: é lida em ordem de uma ListaContatos por um cursor. Contagens são O(1): um índice
+    chave -> primeira posição da lista (montado aos poucos, a partir de onde a lista começou)
+    conta as linhas à frente do cursor que não vão virar tarefa (vazias, COD repetido na lista,
+    já no heap ou processado), para pendentes contar cada COD uma vez só.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._sequencia = 0
+        self._ativas = {}        # chave -> (nivel, sequencia) da entrada válida no heap
+        self._processadas = set()
+        self._lista = None
+        self._cursor = 0
+        self._conferir = None
+        self._espera = 0         # Posição da lista que a retomada precisa ver carregada
+        self._indice = {}        # chave -> primeira posição na lista principal (a partir do início da leitura)
+        self._indexados = 0
+        self._sem_tarefa_a_frente = 0   # Linhas indexadas à frente do cursor que não vão virar tarefa
+        self.processados = 0
+
+    def adicionar(self, tarefas, nivel, forcar=False):
+        """ Enfileira as tarefas no nível indicado e devolve quantas entraram (forcar ignora as já processadas) """
+        novas = []
+        with self._lock:
+            self._indexar()
+            for tarefa in tarefas:
+                chave = chave_tarefa(tarefa.cod)
+                if not chave or (chave in self._processadas and not forcar):
+                    continue
+                atual = self._ativas.get(chave)
+                if atual is not None and atual[0] <= nivel:
+                    continue
+                if atual is None and chave not in self._processadas and chave in self._indice:
+                    # A linha dele na lista deixa de virar tarefa
+                    self._sem_tarefa_a_frente += 1
+                self._sequencia += 1
+                self._ativas[chave] = (nivel, self._sequencia)
+                novas.append((nivel, self._sequencia, tarefa._replace(nivel=nivel)))
+            if len(novas) > len(self._heap):
+                self._heap.extend(novas)
+                heapq.heapify(self._heap)
+            else:
+                for entrada in novas:
+                    heapq.heappush(self._heap, entrada)
+        return len(novas)
+
+    def definir_lista(self, lista, retomar_apos=None):
+        """
+        Liga a lista principal à fila. Com retomar_apos (linha na aba de contatos, COD) do ponto
+        de retomada, começa logo depois desse COD (ListaContatos.retomar); se ele não está mais
+        na aba, volta ao início.
+        """
+        with self._lock:
+            self._lista = lista
+            self._cursor = 0
+            self._conferir = tuple(retomar_apos) if retomar_apos else None
+            self._reindexar()
+
+    def _reindexar(self):
+        """ Recomeça o índice no cursor: o que ficou para trás (retomada) não conta """
+        self._indice = {}
+        self._indexados = self._cursor
+        self._sem_tarefa_a_frente = 0
+
+    @staticmethod
+    def _chave_rapida(cod):
+        # A maioria já vem só com dígitos: sem regex
+        return cod if cod.isascii() and cod.isdigit() else chave_tarefa(cod)
+
+    def _sem_tarefa(self, posicao, chave):
+        """ A linha da lista será pulada: vazia, repetição de uma linha anterior, já no heap ou processada """
+        return (not chave or self._indice[chave] != posicao
+                or chave in self._ativas or chave in self._processadas)
+
+    def _indexar(self):
+        """ Acrescenta ao índice as posições da lista carregadas desde a última chamada """
+        lista = self._lista
+        if lista is None or not self._resolver_retomada():
+            return
+        while self._indexados < lista.carregados:
+            posicao = self._indexados
+            self._indexados += 1
+            chave = self._chave_rapida(lista.cods[posicao])
+            if chave:
+                self._indice.setdefault(chave, posicao)
+            if self._sem_tarefa(posicao, chave):
+                self._sem_tarefa_a_frente += 1
+
+    def _valida(self, entrada):
+        nivel, sequencia, tarefa = entrada
+        return self._ativas.get(chave_tarefa(tarefa.cod)) == (nivel, sequencia)
+
+    def _retirar_do_heap(self):
+        while self._heap:
+            entrada = heapq.heappop(self._heap)
+            if not self._valida(entrada):
+                continue
+            # Sai do heap mas fica em processadas: a linha dele na lista continua sem tarefa
+            chave = chave_tarefa(entrada[2].cod)
+            del self._ativas[chave]
+            self._processadas.add(chave)
+            self.processados += 1
+            return entrada[2]
+        return None
+
+    def _resolver_retomada(self):
+        """ Confere o ponto de retomada assim que a lista tem as linhas para isso; False enquanto precisa esperar """
+        if self._conferir is None:
+            return True
+        lista = self._lista
+        posicao, cod_anterior = self._conferir
+        if not lista.finalizada:
+            # Espera só a linha salva; se o COD saiu dela, procura até um bloco adiante, sem esperar a aba toda
+            necessarias = posicao + 1
+            if posicao < lista.carregados and not lista.confere(posicao, cod_anterior):
+                necessarias += lista.TAMANHO_BLOCO
+            if lista.carregados < necessarias:
+                self._espera = necessarias - 1
+                return False
+        self._conferir = None
+        inicio = lista.retomar(posicao, cod_anterior)
+        if inicio is None:
+            logging.info("O COD da última execução não foi encontrado na lista de contatos: começando do início.")
+            inicio = 0
+        self._cursor = inicio
+        self._reindexar()
+        return True
+
+    def _retirar_da_lista(self):
+        lista = self._lista
+        if not self._resolver_retomada():
+            return None
+        self._indexar()
+        while self._cursor < self._indexados:
+            posicao = self._cursor
+            self._cursor += 1
+            cod = lista.cods[posicao]
+            chave = self._chave_rapida(cod)
+            if self._sem_tarefa(posicao, chave):
+                self._sem_tarefa_a_frente -= 1
+                continue
+            # Depois de o cursor passar pela primeira linha de um COD, ele sempre está em processadas
+            self._processadas.add(chave)
+            self.processados += 1
+            return Tarefa(cod, lista.telefones[posicao], PRIORIDADE_LISTA, lista.posicao_na_planilha(posicao))
+        return None
+
+    def proxima(self):
+        """ Retira a próxima tarefa (ou None se a fila acabou); espera a carga da lista se preciso """
+        while True:
+            with self._lock:
+                tarefa = self._retirar_do_heap()
+                if tarefa is None and self._lista is not None:
+                    tarefa = self._retirar_da_lista()
+                if tarefa is not None:
+                    return tarefa
+                if self._lista is None or (self._lista.finalizada and self._cursor >= self._lista.carregados
+                                           and self._conferir is None):
+                    return None
+                # Na retomada o cursor ainda não andou: espera a posição que ela precisa, não o cursor (já carregado)
+                lista, posicao = self._lista, (self._espera if self._conferir is not None else self._cursor)
+            lista.aguardar(posicao)
+
+    def espiar(self, quantidade):
+        """ As próximas tarefas em ordem, sem retirá-las (percorre só o topo do heap e o cursor da lista) """
+        resultado = []
+        with self._lock:
+            if self._heap:
+                candidatos = [(self._heap[0], 0)]
+                while candidatos and len(resultado) < quantidade:
+                    entrada, posicao = heapq.heappop(candidatos)
+                    if self._valida(entrada):
+                        resultado.append(entrada[2])
+                    for filho in (2 * posicao + 1, 2 * posicao + 2):
+                        if filho < len(self._heap):
+                            heapq.heappush(candidatos, (self._heap[filho], filho))
+            if self._lista is not None:
+                lista = self._lista
+                posicao = self._cursor
+                while len(resultado) < quantidade and posicao < lista.carregados:
+                    chave = chave_tarefa(lista.cods[posicao])
+                    if chave and chave not in self._processadas and chave not in self._ativas:
+                        resultado.append(Tarefa(lista.cods[posicao], lista.telefones[posicao], PRIORIDADE_LISTA,
+                                                lista.posicao_na_planilha(posicao)))
+                    posicao += 1
+        return resultado
+
+    def chaves_na_fila(self):
+        """ Chaves das tarefas que ainda vão sair: heap (prioridades e retornos) e o que falta da lista principal """
+        with self._lock:
+            self._indexar()
+            # Atrás do cursor, toda chave do índice já está em processadas
+            return set(self._ativas) | (self._indice.keys() - self._processadas)
+
+    def instantaneo(self):
+        """ Tarefas válidas do heap (prioridades e retornos), para o ponto de retomada """
+        with self._lock:
+            return [entrada[2] for entrada in sorted(self._heap) if self._valida(entrada)]
+
+    @property
+    def pendentes(self):
+        with self._lock:
+            if self._lista is None:
+                return len(self._ativas)
+            self._indexar()
+            restantes_lista = max(0, self._lista.carregados - self._cursor) - self._sem_tarefa_a_frente
+            return len(self._ativas) + max(0, restantes_lista)
+
+    @property
+    def total(self):
+        return self.processados + self.pendentes
+
+    def reiniciar_contagem(self):
+        """ Nova execução: esquece o que foi processado, mas mantém o que está na fila """
+        with self._lock:
+            self._processadas.clear()
+            self._lista = None
+            self._cursor = 0
+            self._conferir = None
+            self._reindexar()
+            self.processados = 0
+
+
+# --- PLANO DA EXECUÇÃO ---
+class PlanoExecucao:
+    """
+    A aba de contatos classificada de uma vez (pandas): CODs vazios, repetidos na lista, já
+    contatados e inválidos saem; o que sobra fica em ordem, marcado entre "precisa de busca" e
+    "pronto para discar". Fica salvo em pickle junto com a marca da aba de contatos do
+    EstadoExecucao, então reiniciar com a planilha inalterada não relê a aba. Guarda também a
+    linha de cada COD e os CODs da aba toda, para o ponto de retomada valer nas duas listas.
+    """
+    VERSAO = 2
+
+    def __init__(self, cods, telefones, busca, invalidos, descartes, posicoes, cods_planilha, marca=None):
+        self.cods = cods
+        self.telefones = telefones
+        self.busca = busca            # True onde o COD ainda não tem telefone
+        self.invalidos = invalidos    # CODs sem telefone e com até 5 dígitos (resultado gravado em lote)
+        self.descartes = descartes
+        self.posicoes = posicoes      # Linha na aba de contatos de cada COD do plano
+        self.cods_planilha = cods_planilha
+        self.marca = marca
+
+    @classmethod
+    def compilar(cls, cods, telefones, contatados=()):
+        """ Mesmas regras do loop (deduplicação por chave_tarefa, contatados, limpar_codigo) sobre a lista toda """
+        carregar_modulos_pesados()
+        df = pd.DataFrame({'cod': pd.Series(list(cods), dtype=object), 'telefone': pd.Series(list(telefones), dtype=object)})
+        digitos = df['cod'].str.replace(r'[^0-9]', '', regex=True)
+        vazio = df['cod'] == ''
+        chave = digitos.where(digitos != '', df['cod'])
+        repetido = ~vazio & chave.where(~vazio).duplicated()
+        ja_contatado = ~vazio & ~repetido & df['cod'].isin(list(contatados))
+        sem_telefone = df['telefone'] == ''
+        invalido = ~vazio & ~repetido & ~ja_contatado & sem_telefone & (digitos.str.len() <= 5)
+        entra = ~(vazio | repetido | ja_contatado | invalido)
+        descartes = {'vazios': int(vazio.sum()), 'repetidos': int(repetido.sum()),
+                     'ja_contatados': int(ja_contatado.sum()), 'invalidos': int(invalido.sum())}
+        return cls(df['cod'][entra].tolist(), df['telefone'][entra].tolist(), sem_telefone[entra].tolist(),
+                   df['cod'][invalido].tolist(), descartes, df.index[entra].tolist(), df['cod'].tolist())
+
+    def salvar(self, caminho, marca):
+        self.marca = marca
+        caminho_temp = caminho + ".tmp"
+        with open(caminho_temp, "wb") as f:
+            pickle.dump({'versao': self.VERSAO, 'marca': marca, 'cods': self.cods, 'telefones': self.telefones,
+                         'busca': self.busca, 'invalidos': self.invalidos, 'descartes': self.descartes,
+                         'posicoes': self.posicoes, 'cods_planilha': self.cods_planilha},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(caminho_temp, caminho)
+
+    @classmethod
+    def carregar(cls, caminho, marca):
+        """ O plano salvo, se ele foi compilado com a mesma marca da aba de contatos; senão None """
+        if marca is None or not os.path.exists(caminho):
+            return None
+        try:
+            with open(caminho, "rb") as f:
+                dados = pickle.load(f)
+        except Exception as e:
+            logging.warning(f"Plano da execução ilegível, será refeito: {e}")
+            return None
+        if dados.get('versao') != cls.VERSAO or dados.get('marca') != marca:
+            return None
+        return cls(dados['cods'], dados['telefones'], dados['busca'], dados['invalidos'], dados['descartes'],
+                   dados['posicoes'], dados['cods_planilha'], marca)
+
+    def lista(self):
+        lista = ListaContatos()
+        lista.preencher(self.cods, self.telefones, self.posicoes, self.cods_planilha)
+        return lista
+
+    def resumo(self):
+        return (f"{len(self.cods)} contatos no plano ({sum(self.busca)} precisam de busca); descartados: "
+                + ", ".join(f"{quantidade} {motivo.replace('_', ' ')}" for motivo, quantidade in self.descartes.items()))
+
+
+# --- AGENDA DE RETORNOS ---
+# chave_planilha: (COD, HORA, DATA) como estão na aba, para mudar o STATUS da linha certa
+Retorno = namedtuple('Retorno', ['vencimento', 'cod', 'telefone', 'chave_planilha'])
+
+def vencimento_retorno(data, hora):
+    """ Data e hora do retorno a partir das colunas DATA (dd/mm/aaaa) e HORA (HH:MM); None se inválidas """
+    try:
+        if hasattr(data, 'year'):
+            dia = data.date() if isinstance(data, datetime) else data
+        else:
+            dia = datetime.strptime(str(data).strip(), "%d/%m/%Y").date()
+        if isinstance(hora, datetime):
+            hora = hora.time()
+        elif not hasattr(hora, 'hour'):
+            texto = str(hora).strip()
+            hora = datetime.strptime(texto, "%H:%M:%S" if texto.count(':') == 2 else "%H:%M").time()
+        return datetime.combine(dia, hora)
+    except (TypeError, ValueError):
+        return None
+
+
+class AgendaRetornos:
+    """
+    Retornos aguardando, num heap ordenado pelo vencimento. A aba de retornos é lida uma vez;
+    depois disso os novos agendamentos entram direto na memória. Os vencidos saem do heap para
+    a fila de tarefas e ficam "em fila" até o COD ser processado, quando o status muda.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._sequencia = 0
+        self._em_fila = {}   # chave_tarefa -> [Retorno, ...] já entregues à fila
+        self.carregada = False
+
+    def carregar(self, caminho_excel, escritor):
+        """ Lê os retornos aguardando da planilha e do diário; devolve quantos entraram na agenda """
+        carregar_modulos_pesados()
+        linhas = []
+        wb = load_workbook(caminho_excel, read_only=True, data_only=True)
+        try:
+            linhas.extend(wb[ABA_RETORNOS].iter_rows(min_row=2, max_col=5, values_only=True))
+        finally:
+            wb.close()
+        linhas.extend(escritor.pendentes_da_aba(ABA_RETORNOS))
+        status_pendentes = escritor.status_retornos_pendentes()
+
+        carregados = invalidos = 0
+        for linha in linhas:
+            cod, telefone, hora, data, status = (list(linha) + [None] * 5)[:5]
+            if cod is None:
+                continue
+            chave = (str(cod), str(hora), str(data))
+            status = status_pendentes.get(chave, status)
+            if str(status or '').strip().lower() != STATUS_RETORNO_AGUARDANDO:
+                continue
+            vencimento = vencimento_retorno(data, hora)
+            if vencimento is None:
+                invalidos += 1
+                continue
+            self._inserir(Retorno(vencimento, texto_celula(cod), texto_celula(telefone), chave))
+            carregados += 1
+        if invalidos:
+            logging.warning(f"{invalidos} retornos com DATA/HORA inválida foram ignorados.")
+        self.carregada = True
+        return carregados
+
+    def _inserir(self, retorno):
+        with self._lock:
+            self._sequencia += 1
+            heapq.heappush(self._heap, (retorno.vencimento, self._sequencia, retorno))
+
+    def agendar(self, cod, telefone, data, hora):
+        """ Novo retorno (mesmos textos gravados na aba) """
+        vencimento = vencimento_retorno(data, hora)
+        if vencimento is not None:
+            self._inserir(Retorno(vencimento, str(cod), str(telefone or ''), (str(cod), str(hora), str(data))))
+
+    def vencidos(self, agora=None):
+        """ Retira os retornos que já venceram, em ordem de vencimento """
+        agora = agora or datetime.now()
+        retirados = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= agora:
+                retorno = heapq.heappop(self._heap)[2]
+                self._em_fila.setdefault(chave_tarefa(retorno.cod), []).append(retorno)
+                retirados.append(retorno)
+        return retirados
+
+    def pendente(self, cod):
+        """ True se o COD está na fila por causa de um retorno que ainda não foi feito """
+        with self._lock:
+            return chave_tarefa(cod) in self._em_fila
+
+    def concluir(self, cod):
+        """ Retornos do COD que acabaram de ser processados (para mudar o status) """
+        with self._lock:
+            return self._em_fila.pop(chave_tarefa(cod), [])
+
+    def proximo_vencimento(self):
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+
+# --- RITMO DO LOOP (PAUSA E ESPERAS) ---
+class Ritmo:
+    """
+    Centraliza as esperas do loop: a pausa/continuação usa eventos (sem espera ativa) e as
+    pausas extras de cada etapa vêm do config.txt (padrão zero). Encerrar acorda qualquer espera.
+    """
+    def __init__(self, config):
+        self.atrasos = {chave[len('atraso_'):]: float(valor) for chave, valor in config.items() if chave.startswith('atraso_')}
+        self._liberado = threading.Event()
+        self._liberado.set()
+        self._encerrado = threading.Event()
+
+    def esperar(self, etapa):
+        """ Pausa extra configurada para a etapa; volta na hora se a automação for encerrada """
+        atraso = self.atrasos.get(etapa, 0.0)
+        if atraso > 0:
+            self._encerrado.wait(atraso)
+
+    def aguardar(self, segundos):
+        """ Espera interrompível; retorna True se a automação foi encerrada durante a espera """
+        return self._encerrado.wait(segundos)
+
+    def aguardar_liberacao(self):
+        """ Bloqueia enquanto estiver pausado """
+        while not self._liberado.wait(timeout=1.0):
+            if self._encerrado.is_set():
+                return
+
+    def pausar(self):
+        self._liberado.clear()
+
+    def continuar(self):
+        self._liberado.set()
+
+    def encerrar(self):
+        self._encerrado.set()
+        self._liberado.set()
+
+    @property
+    def encerrado(self):
+        return self._encerrado.is_set()
+
+    def reiniciar(self):
+        self._encerrado.clear()
+        self._liberado.set()
+
+
+# --- MÉTRICAS DE DESEMPENHO ---
+def percentil(valores_ordenados, fracao):
+    """ Percentil pelo posto mais próximo (lista já ordenada, não vazia) """
+    posicao = max(0, min(len(valores_ordenados) - 1, int(-(-fracao * len(valores_ordenados) // 1)) - 1))
+    return valores_ordenados[posicao]
+
+
+class Metricas:
+    """
+    Tempos por etapa do loop (janela móvel das últimas medições, com p50/p95/máx) e contadores
+    de eventos. As taxas de não encontrado e divergência são sobre o total de buscas; as
+    ligações por hora contam as discagens da última hora (extrapoladas enquanto a execução
+    tem menos de uma hora). Os marcos (janela pronta, primeira ligação) são medições únicas
+    e sobrevivem ao reiniciar.
+    """
+    def __init__(self, janela=200):
+        self.janela = max(1, int(janela))
+        self._lock = threading.Lock()
+        self._marcos = {}
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._amostras = {}
+            self._contadores = {}
+            self._ligacoes = deque()
+            self._inicio = time.time()
+
+    def registrar(self, etapa, segundos):
+        with self._lock:
+            amostras = self._amostras.get(etapa)
+            if amostras is None:
+                amostras = self._amostras[etapa] = deque(maxlen=self.janela)
+            amostras.append(segundos)
+
+    def marcar(self, marco, segundos):
+        with self._lock:
+            self._marcos[marco] = round(segundos, 2)
+
+    @contextmanager
+    def medir(self, etapa, cod=None):
+        """
+        Mede o bloco (também quando ele termina com exceção). Com `cod`, a medição também vai
+        para o arquivo de eventos, com o que o bloco puser no dicionário devolvido (ex.: resultado).
+        """
+        inicio = time.monotonic()
+        detalhes = {}
+        try:
+            yield detalhes
+        except BaseException as e:
+            detalhes.setdefault('resultado', f"erro: {type(e).__name__}")
+            raise
+        finally:
+            duracao = time.monotonic() - inicio
+            self.registrar(etapa, duracao)
+            if cod is not None:
+                registrar_evento(etapa, cod, duracao=duracao, **detalhes)
+
+    def contar(self, evento, quantidade=1):
+        with self._lock:
+            self._contadores[evento] = self._contadores.get(evento, 0) + quantidade
+            if evento == 'ligacoes':
+                self._ligacoes.append(time.time())
+
+    def _ligacoes_por_hora(self, agora):
+        while self._ligacoes and self._ligacoes[0] < agora - 3600:
+            self._ligacoes.popleft()
+        decorrido = min(3600.0, agora - self._inicio)
+        if decorrido < 60:
+            return None
+        return len(self._ligacoes) * 3600.0 / decorrido
+
+    def resumo(self):
+        """ Dicionário com as etapas, os contadores e as taxas (o mesmo conteúdo do arquivo) """
+        agora = time.time()
+        with self._lock:
+            etapas = {}
+            for etapa, amostras in self._amostras.items():
+                ordenadas = sorted(amostras)
+                etapas[etapa] = {
+                    'n': len(ordenadas),
+                    'p50': round(percentil(ordenadas, 0.50), 3),
+                    'p95': round(percentil(ordenadas, 0.95), 3),
+                    'max': round(ordenadas[-1], 3),
+                }
+            contadores = dict(self._contadores)
+            marcos = dict(self._marcos)
+            por_hora = self._ligacoes_por_hora(agora)
+        buscas = contadores.get('buscas', 0)
+        buscas_selenium, discagens = contadores.get('buscas_selenium', 0), contadores.get('discagens', 0)
+        return {
+            'gerado_em': datetime.fromtimestamp(agora).isoformat(timespec='seconds'),
+            'inicio': datetime.fromtimestamp(self._inicio).isoformat(timespec='seconds'),
+            'etapas': etapas,
+            'contadores': contadores,
+            'marcos': marcos,
+            'ligacoes_por_hora': round(por_hora, 1) if por_hora is not None else None,
+            'taxa_nao_encontrado': round(contadores.get('nao_encontrados', 0) / buscas, 3) if buscas else None,
+            'taxa_divergencia': round(contadores.get('divergencias', 0) / buscas, 3) if buscas else None,
+            'webdriver_por_busca': round(contadores.get('chamadas_webdriver_busca', 0) / buscas_selenium, 1) if buscas_selenium else None,
+            'webdriver_por_discagem': round(contadores.get('chamadas_webdriver_discagem', 0) / discagens, 1) if discagens else None,
+            # Ligações encerradas pela detecção (NAO ATENDEU / CAIU), sem tempo do operador
+            'taxa_sem_atendimento': round(contadores.get('sem_atendimento', 0) / contadores['ligacoes'], 3) if contadores.get('ligacoes') else None,
+        }
+
+    def texto_painel(self, etapas=('busca', 'discagem', 'operador', 'escrita', 'pulo')):
+        """ Resumo curto para a janela """
+        resumo = self.resumo()
+        linhas = []
+        for etapa in etapas:
+            dados = resumo['etapas'].get(etapa)
+            if dados:
+                linhas.append(f"{etapa}: p50 {dados['p50']:.2f}s  p95 {dados['p95']:.2f}s  máx {dados['max']:.2f}s")
+        por_hora = resumo['ligacoes_por_hora']
+        nao_encontrado, divergencia = resumo['taxa_nao_encontrado'], resumo['taxa_divergencia']
+        linhas.append(
+            f"Ligações/h: {por_hora if por_hora is not None else '-'}  |  "
+            f"Não encontrados: {f'{nao_encontrado:.0%}' if nao_encontrado is not None else '-'}  |  "
+            f"Divergências: {f'{divergencia:.0%}' if divergencia is not None else '-'}")
+        sem_atendimento = resumo['taxa_sem_atendimento']
+        if sem_atendimento is not None:
+            linhas.append(f"Sem atendimento (registradas sozinhas): {sem_atendimento:.0%}")
+        primeira = resumo['marcos'].get('primeira_ligacao_apos_iniciar')
+        if primeira is not None:
+            linhas.append(f"1ª ligação: {primeira:.1f}s após Iniciar")
+        return "\n".join(linhas)
+
+    def salvar(self, caminho):
+        """ Grava o resumo em JSON (troca atômica, para quem lê o arquivo não pegar meio JSON) """
+        caminho_temp = caminho + ".tmp"
+        with open(caminho_temp, "w", encoding="utf-8") as f:
+            json.dump(self.resumo(), f, ensure_ascii=False, indent=2)
+        os.replace(caminho_temp, caminho)
+
+
+# --- CACHE PERSISTENTE DE BUSCAS ---
+class CacheTelefones:
+    """
+    Cache em SQLite dos resultados de busca, chaveado pelo código limpo. Guarda o COD
+    encontrado, o telefone e a situação (encontrado, divergente, não encontrado), com validade
+    separada para resultados negativos e limite de tamanho (descarta os usados há mais tempo).
+    """
+    def __init__(self, caminho, validade_horas=720.0, validade_negativa_horas=24.0, max_entradas=200000):
+        self.validade = validade_horas * 3600
+        self.validade_negativa = validade_negativa_horas * 3600
+        self.max_entradas = max(1, int(max_entradas))
+        self.acertos = 0
+        self.falhas = 0
+
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS busca ("
+            "codigo TEXT PRIMARY KEY, cod_encontrado TEXT, telefone TEXT, situacao TEXT, "
+            "gravado_em REAL, usado_em REAL)")
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS busca_usado_em ON busca (usado_em)")
+        self._conexao.commit()
+        self._inclusoes_desde_limpeza = 0
+        self.limpar_expirados()
+
+    def _validade_de(self, situacao):
+        return self.validade if situacao == BUSCA_ENCONTRADO else self.validade_negativa
+
+    def _consultar(self, codigo_limpo):
+        linha = self._conexao.execute(
+            "SELECT cod_encontrado, telefone, situacao, gravado_em FROM busca WHERE codigo = ?",
+            (codigo_limpo,)).fetchone()
+        if not linha:
+            return None
+        cod_encontrado, telefone, situacao, gravado_em = linha
+        if time.time() - gravado_em > self._validade_de(situacao):
+            return None
+        return ResultadoBusca(codigo_limpo, cod_encontrado, telefone, situacao)
+
+    def contem(self, codigo_limpo):
+        """ Consulta sem contar nas estatísticas (usado pela busca antecipada) """
+        with self._lock:
+            return self._consultar(codigo_limpo) is not None
+
+    def obter(self, codigo_limpo):
+        with self._lock:
+            resultado = self._consultar(codigo_limpo)
+            if resultado is None:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            self._conexao.execute("UPDATE busca SET usado_em = ? WHERE codigo = ?", (time.time(), codigo_limpo))
+            self._conexao.commit()
+            return resultado
+
+    def guardar(self, resultado):
+        if resultado.situacao == BUSCA_ERRO:
+            return
+        agora = time.time()
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO busca VALUES (?, ?, ?, ?, ?, ?)",
+                (resultado.codigo_buscado, resultado.cod_encontrado, resultado.telefone, resultado.situacao, agora, agora))
+            self._conexao.commit()
+            self._inclusoes_desde_limpeza += 1
+            if self._inclusoes_desde_limpeza >= max(1, min(1000, self.max_entradas // 10)):
+                self._limitar_tamanho()
+
+    def limpar_expirados(self):
+        agora = time.time()
+        with self._lock:
+            self._conexao.execute(
+                "DELETE FROM busca WHERE (situacao = ? AND gravado_em < ?) OR (situacao != ? AND gravado_em < ?)",
+                (BUSCA_ENCONTRADO, agora - self.validade, BUSCA_ENCONTRADO, agora - self.validade_negativa))
+            self._limitar_tamanho()
+
+    def _limitar_tamanho(self):
+        self._inclusoes_desde_limpeza = 0
+        total = self._conexao.execute("SELECT COUNT(*) FROM busca").fetchone()[0]
+        excesso = total - self.max_entradas
+        if excesso > 0:
+            # Descarta um pouco além do excesso para não repetir a limpeza a cada inclusão
+            excesso += self.max_entradas // 10
+            self._conexao.execute(
+                "DELETE FROM busca WHERE codigo IN (SELECT codigo FROM busca ORDER BY usado_em LIMIT ?)", (excesso,))
+            logging.info(f"Cache de buscas: {excesso} registros antigos descartados.")
+        self._conexao.commit()
+
+    def resumo(self):
+        return f"Cache: {self.acertos} acertos / {self.falhas} buscas na web"
+
+
+# --- ESTADO PERSISTENTE (CONTATADOS E PONTO DE RETOMADA) ---
+class EstadoExecucao:
+    """
+    Guarda em SQLite o conjunto de CODs que já têm resultado e o ponto de retomada da
+    execução (posição na lista principal, COD em andamento e instantâneo da fila).
+    Os dois são atualizados a cada resultado/tarefa, então reiniciar não precisa reler a
+    aba de resultados: ela só é relida se a planilha foi alterada fora do programa.
+    """
+    def __init__(self, caminho):
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("CREATE TABLE IF NOT EXISTS contatados (cod TEXT PRIMARY KEY)")
+        self._conexao.execute("CREATE TABLE IF NOT EXISTS controle (chave TEXT PRIMARY KEY, valor TEXT)")
+        self._conexao.commit()
+
+    def _ler(self, chave):
+        linha = self._conexao.execute("SELECT valor FROM controle WHERE chave = ?", (chave,)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def _gravar(self, chave, valor):
+        self._conexao.execute("INSERT OR REPLACE INTO controle VALUES (?, ?)", (chave, json.dumps(valor, ensure_ascii=False)))
+
+    def carregar_contatados(self, caminho_excel, escritor):
+        """ Devolve o conjunto de CODs contatados, remontando-o da planilha só se ela mudou por fora """
+        with self._lock:
+            if self._ler('alterada_por_fora') or self._ler('impressao_planilha') != impressao_arquivo(caminho_excel):
+                self._reconstruir(caminho_excel, escritor)
+            else:
+                # Resultados recuperados do diário após uma queda podem não ter chegado ao índice
+                recuperados = [op['linha'][0] for op in escritor.recuperadas
+                               if op['op'] == 'anexar' and op['aba'] == ABA_RESULTADOS and op['linha']]
+                self._conexao.executemany("INSERT OR IGNORE INTO contatados VALUES (?)", ((str(cod),) for cod in recuperados))
+                self._conexao.commit()
+            return {linha[0] for linha in self._conexao.execute("SELECT cod FROM contatados")}
+
+    def _reconstruir(self, caminho_excel, escritor):
+        logging.info("Planilha alterada fora do programa: remontando o índice de contatados.")
+        cods = set()
+        try:
+            carregar_modulos_pesados()
+            wb = load_workbook(caminho_excel, read_only=True, data_only=True)
+            try:
+                for (valor,) in wb[ABA_RESULTADOS].iter_rows(min_row=2, max_col=1, values_only=True):
+                    if valor is not None:
+                        cods.add(texto_celula(valor))
+            finally:
+                wb.close()
+        except Exception as e:
+            logging.warning(f"Não foi possível ler a aba de resultados: {e}")
+        # Resultados que ainda estão no diário também contam
+        cods.update(str(linha[0]) for linha in escritor.pendentes_da_aba(ABA_RESULTADOS) if linha)
+        self._conexao.execute("DELETE FROM contatados")
+        self._conexao.executemany("INSERT OR IGNORE INTO contatados VALUES (?)", ((cod,) for cod in cods))
+        self._gravar('impressao_planilha', impressao_arquivo(caminho_excel))
+        self._gravar('alterada_por_fora', False)
+        self._gravar('marca_contatos', time.time())
+        self._conexao.commit()
+
+    def registrar_resultado(self, cod):
+        with self._lock:
+            self._conexao.execute("INSERT OR IGNORE INTO contatados VALUES (?)", (cod,))
+            self._conexao.commit()
+
+    def registrar_resultados(self, cods):
+        with self._lock:
+            self._conexao.executemany("INSERT OR IGNORE INTO contatados VALUES (?)", ((str(cod),) for cod in cods))
+            self._conexao.commit()
+
+    def marca_contatos(self):
+        """ Muda quando a aba de contatos pode ter mudado (edição por fora ou CODs importados): invalida o plano """
+        with self._lock:
+            marca = self._ler('marca_contatos')
+            if marca is None:
+                # Estado criado antes do plano existir
+                marca = time.time()
+                self._gravar('marca_contatos', marca)
+                self._conexao.commit()
+            return marca
+
+    def registrar_mudanca_contatos(self):
+        with self._lock:
+            self._gravar('marca_contatos', time.time())
+            self._conexao.commit()
+
+    def registrar_impressao(self, impressao, anterior=None):
+        """
+        Chamado pelo EscritorPlanilha após cada gravação feita pelo próprio programa. Se o arquivo
+        lido para a gravação (anterior) não era o que o programa tinha gravado, houve edição por
+        fora: os contatados são remontados na próxima carga e o plano da execução deixa de valer.
+        """
+        with self._lock:
+            if anterior is not None and anterior != self._ler('impressao_planilha') and not self._ler('alterada_por_fora'):
+                logging.info("Planilha alterada fora do programa desde a última gravação.")
+                self._gravar('alterada_por_fora', True)
+                self._gravar('marca_contatos', time.time())
+            self._gravar('impressao_planilha', impressao)
+            self._conexao.commit()
+
+    def salvar_retomada(self, tarefa, fila):
+        """ Registra a tarefa que começou a ser processada e o que ainda está na fila de prioridade """
+        with self._lock:
+            self._gravar('em_andamento', list(tarefa))
+            if tarefa.posicao is not None:
+                self._gravar('posicao', [tarefa.posicao, tarefa.cod])
+            self._gravar('fila', [list(t) for t in fila.instantaneo()])
+            self._conexao.commit()
+
+    def salvar_fila(self, fila):
+        with self._lock:
+            self._gravar('fila', [list(t) for t in fila.instantaneo()])
+            self._conexao.commit()
+
+    def ler_retomada(self):
+        """ Devolve (tarefa em andamento, tarefas da fila, (posição, COD da posição)) da última execução """
+        with self._lock:
+            em_andamento = self._ler('em_andamento')
+            fila = self._ler('fila') or []
+            posicao = self._ler('posicao')
+        return (Tarefa(*em_andamento) if em_andamento else None,
+                [Tarefa(*t) for t in fila],
+                tuple(posicao) if posicao else None)
+
+    def limpar_retomada(self):
+        with self._lock:
+            self._conexao.execute("DELETE FROM controle WHERE chave IN ('em_andamento', 'fila', 'posicao')")
+            self._conexao.commit()
+
+
+# --- RESUMO DOS RESULTADOS (POR DIA E HORA) ---
+# Categoria de cada OBSERVACAO: (categoria, 'prefixo' ou 'igual', texto); o que não casar é 'atendida'
+REGRAS_CATEGORIA = [
+    ('retorno_agendado', 'prefixo', "RETORNO AGENDADO"),
+    ('divergencia', 'prefixo', "DIVERGÊNCIA"),
+    ('nao_encontrado', 'igual', "TELEFONE NÃO ENCONTRADO"),
+    ('erro_discagem', 'igual', "ERRO AO DISCAR"),
+    ('invalido', 'igual', OBS_CODIGO_INVALIDO),
+    ('nao_atendeu', 'igual', OBS_NAO_ATENDEU),
+    ('caiu', 'igual', OBS_CAIU),
+]
+CATEGORIA_PADRAO = 'atendida'
+# Categorias em que houve ligação (entram na coluna "ligacoes" do relatório)
+CATEGORIAS_LIGACAO = ('atendida', 'retorno_agendado', 'nao_atendeu', 'caiu')
+
+def categoria_resultado(obs):
+    texto = str(obs or '')
+    for categoria, tipo, padrao in REGRAS_CATEGORIA:
+        if texto.startswith(padrao) if tipo == 'prefixo' else texto == padrao:
+            return categoria
+    return CATEGORIA_PADRAO
+
+
+class ResumoResultados:
+    """
+    Contagens da aba de resultados por dia, hora e categoria, num SQLite ao lado da planilha.
+    Cada linha nova de resultado soma 1 na sua célula (via EscritorPlanilha.ao_anexar), então o
+    relatório sai da tabela pequena sem reler o histórico. reconstruir() refaz tudo a partir
+    da aba, agrupando com o pandas, para quando as contagens precisarem de conserto.
+    """
+    def __init__(self, caminho):
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("CREATE TABLE IF NOT EXISTS contagem (dia TEXT, hora INTEGER, categoria TEXT, "
+                              "quantidade INTEGER, PRIMARY KEY (dia, hora, categoria))")
+        self._conexao.commit()
+
+    @staticmethod
+    def _celula(linha):
+        """ (dia ISO, hora, categoria) de uma linha [COD, TELEFONE, HORA, DATA, OBSERVACAO] """
+        dia = datetime.strptime(str(linha[3]), "%d/%m/%Y").date().isoformat()
+        return dia, int(str(linha[2])[:2]), categoria_resultado(linha[4] if len(linha) > 4 else '')
+
+    def registrar_anexo(self, nome_aba, linhas):
+        if nome_aba != ABA_RESULTADOS:
+            return
+        celulas = {}
+        for linha in linhas:
+            try:
+                celula = self._celula(linha)
+            except (ValueError, IndexError):
+                continue
+            celulas[celula] = celulas.get(celula, 0) + 1
+        if not celulas:
+            return
+        with self._lock:
+            self._conexao.executemany(
+                "INSERT INTO contagem VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (dia, hora, categoria) DO UPDATE SET quantidade = quantidade + excluded.quantidade",
+                [(*celula, quantidade) for celula, quantidade in celulas.items()])
+            self._conexao.commit()
+
+    def reconstruir(self, caminho_excel, escritor=None):
+        """ Recalcula as contagens a partir da aba de resultados (e do diário); devolve quantas linhas entraram """
+        carregar_modulos_pesados()
+        df = pd.read_excel(caminho_excel, sheet_name=ABA_RESULTADOS, dtype=str)
+        df = df.reindex(columns=['COD', 'TELEFONE', 'HORA', 'DATA', 'OBSERVACAO'])
+        if escritor is not None:
+            pendentes = [(list(linha) + [None] * 5)[:5] for linha in escritor.pendentes_da_aba(ABA_RESULTADOS)]
+            if pendentes:
+                df = pd.concat([df, pd.DataFrame(pendentes, columns=df.columns, dtype=object)], ignore_index=True)
+        datas = pd.to_datetime(df['DATA'], format="%d/%m/%Y", errors='coerce')
+        # Datas que o Excel converteu para o tipo data chegam como "aaaa-mm-dd hh:mm:ss"
+        datas = datas.fillna(pd.to_datetime(df['DATA'], format="%Y-%m-%d %H:%M:%S", errors='coerce'))
+        horas = pd.to_numeric(df['HORA'].str[:2], errors='coerce')
+        obs = df['OBSERVACAO'].fillna('').astype(str)
+        condicoes = [obs.str.startswith(padrao) if tipo == 'prefixo' else obs == padrao
+                     for _, tipo, padrao in REGRAS_CATEGORIA]
+        categorias = pd.Series(CATEGORIA_PADRAO, index=df.index)
+        # Na ordem inversa para a primeira regra que casar prevalecer, como em categoria_resultado
+        for (categoria, _, _), condicao in reversed(list(zip(REGRAS_CATEGORIA, condicoes))):
+            categorias = categorias.mask(condicao, categoria)
+        validas = datas.notna() & horas.notna()
+        agrupado = (pd.DataFrame({'dia': datas[validas].dt.strftime("%Y-%m-%d"), 'hora': horas[validas].astype(int),
+                                  'categoria': categorias[validas]})
+                    .groupby(['dia', 'hora', 'categoria']).size())
+        with self._lock:
+            self._conexao.execute("DELETE FROM contagem")
+            self._conexao.executemany("INSERT INTO contagem VALUES (?, ?, ?, ?)",
+                                      [(dia, int(hora), categoria, int(quantidade))
+                                       for (dia, hora, categoria), quantidade in agrupado.items()])
+            self._conexao.commit()
+        if (~validas).any():
+            logging.warning(f"{int((~validas).sum())} linhas de resultado sem DATA/HORA válida ficaram fora do resumo.")
+        return int(validas.sum())
+
+    def tabelas(self):
+        """ (por dia, por dia e hora): uma coluna por categoria, mais 'ligacoes' """
+        carregar_modulos_pesados()
+        with self._lock:
+            df = pd.read_sql_query("SELECT dia, hora, categoria, quantidade FROM contagem", self._conexao)
+        colunas = [CATEGORIA_PADRAO] + [categoria for categoria, _, _ in REGRAS_CATEGORIA]
+        tabelas = []
+        for indice in (['dia'], ['dia', 'hora']):
+            tabela = (df.pivot_table(index=indice, columns='categoria', values='quantidade', aggfunc='sum', fill_value=0)
+                      .reindex(columns=colunas, fill_value=0))
+            tabela.insert(0, 'ligacoes', tabela[list(CATEGORIAS_LIGACAO)].sum(axis=1))
+            tabelas.append(tabela)
+        return tuple(tabelas)
+
+    def exportar(self, caminho_xlsx):
+        por_dia, por_hora = self.tabelas()
+        with pd.ExcelWriter(caminho_xlsx) as arquivo:
+            # Índice como colunas comuns: cada linha da aba por_hora traz o seu dia
+            por_dia.reset_index().to_excel(arquivo, sheet_name="por_dia", index=False)
+            por_hora.reset_index().to_excel(arquivo, sheet_name="por_hora", index=False)
+        return len(por_dia)
+
+
+# --- CAMPANHA COMPARTILHADA (VÁRIOS OPERADORES) ---
+def identificar_operador(nome=''):
+    """ Nome único desta instância: o configurado (ou usuário@máquina) mais o PID, para duas janelas na mesma máquina não se confundirem """
+    if not nome:
+        usuario = os.environ.get('USERNAME') or os.environ.get('USER') or 'operador'
+        nome = f"{usuario}@{platform.node()}"
+    return f"{nome}:{os.getpid()}"
+
+
+class CampanhaCompartilhada:
+    """
+    Lista de contatos de uma campanha num SQLite em pasta compartilhada, trabalhada por vários
+    operadores ao mesmo tempo. Cada instância reserva lotes de CODs com prazo (reserva/lease),
+    renova o prazo enquanto trabalha e devolve o que não usou ao parar; as reservas de quem
+    caiu vencem e voltam para a fila. Resultados e retornos de todos ficam no mesmo arquivo.
+    """
+    def __init__(self, caminho, operador, duracao_reserva=300.0):
+        self.caminho = caminho
+        self.operador = operador
+        self.duracao_reserva = float(duracao_reserva)
+        self._lock = threading.Lock()
+        self._parar_renovacao = threading.Event()
+        self._thread_renovacao = None
+        # Sem WAL: ele não funciona em pastas de rede. As escritas usam BEGIN IMMEDIATE e esperam o lock.
+        self._conexao = sqlite3.connect(caminho, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conexao.executescript(
+            "CREATE TABLE IF NOT EXISTS contato ("
+            " chave TEXT PRIMARY KEY, cod TEXT, telefone TEXT, posicao INTEGER,"
+            " situacao TEXT NOT NULL DEFAULT 'pendente', operador TEXT, reservado_ate REAL);"
+            "CREATE INDEX IF NOT EXISTS contato_fila ON contato (situacao, posicao);"
+            "CREATE TABLE IF NOT EXISTS resultado (cod TEXT, telefone TEXT, hora TEXT, data TEXT, observacao TEXT, operador TEXT);"
+            "CREATE TABLE IF NOT EXISTS retorno (cod TEXT, telefone TEXT, hora TEXT, data TEXT, status TEXT, operador TEXT);"
+            "CREATE TABLE IF NOT EXISTS importacao (impressao TEXT PRIMARY KEY);")   # Marca da aba de contatos já importada
+
+    @contextmanager
+    def _transacao(self):
+        with self._lock:
+            self._conexao.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conexao
+            except BaseException:
+                self._conexao.execute("ROLLBACK")
+                raise
+            self._conexao.execute("COMMIT")
+
+    def _executar(self, sql, parametros=()):
+        with self._lock:
+            return self._conexao.execute(sql, parametros)
+
+    def importar(self, caminho_excel, marca_contatos):
+        """
+        Acrescenta os CODs da aba de contatos que ainda não estão na campanha, uma vez por
+        marca da aba (EstadoExecucao.marca_contatos): gravar resultados na planilha não reimporta.
+        """
+        # Só a marca: o nome do operador leva o PID e mudaria a cada abertura do programa
+        impressao = str(marca_contatos)
+        if self._executar("SELECT 1 FROM importacao WHERE impressao = ?", (impressao,)).fetchone():
+            return 0
+        # Lê a planilha e separa os CODs novos antes de abrir a transação, para não segurar o lock dos outros operadores
+        existentes = {chave for (chave,) in self._executar("SELECT chave FROM contato").fetchall()}
+        linhas = []
+        for cod, telefone in iterar_contatos(caminho_excel):
+            chave = chave_tarefa(cod)
+            if chave and chave not in existentes:
+                existentes.add(chave)
+                linhas.append((chave, cod, telefone))
+        with self._transacao() as conexao:
+            inicio = conexao.execute("SELECT COALESCE(MAX(posicao), -1) + 1 FROM contato").fetchone()[0]
+            antes = conexao.total_changes
+            conexao.executemany("INSERT OR IGNORE INTO contato (chave, cod, telefone, posicao) VALUES (?, ?, ?, ?)",
+                                ((chave, cod, telefone, inicio + i) for i, (chave, cod, telefone) in enumerate(linhas)))
+            novos = conexao.total_changes - antes
+            conexao.execute("INSERT OR IGNORE INTO importacao VALUES (?)", (impressao,))
+        return novos
+
+    def reservar(self, quantidade):
+        """ Reserva os próximos CODs livres (reservas vencidas primeiro) e devolve [(cod, telefone)] """
+        agora = time.time()
+        with self._transacao() as conexao:
+            linhas = conexao.execute(
+                "SELECT chave, cod, telefone FROM contato WHERE situacao = 'reservado' AND reservado_ate < ? "
+                "ORDER BY posicao LIMIT ?", (agora, quantidade)).fetchall()
+            if len(linhas) < quantidade:
+                linhas += conexao.execute(
+                    "SELECT chave, cod, telefone FROM contato WHERE situacao = 'pendente' ORDER BY posicao LIMIT ?",
+                    (quantidade - len(linhas),)).fetchall()
+            conexao.executemany(
+                "UPDATE contato SET situacao = 'reservado', operador = ?, reservado_ate = ? WHERE chave = ?",
+                [(self.operador, agora + self.duracao_reserva, chave) for chave, _, _ in linhas])
+        return [(cod, telefone or '') for _, cod, telefone in linhas]
+
+    def reservar_cod(self, cod, telefone=''):
+        """ Reserva um COD avulso (prioridade, retorno). False se ele está com outro operador ou já foi concluído """
+        chave = chave_tarefa(cod)
+        agora = time.time()
+        with self._transacao() as conexao:
+            linha = conexao.execute("SELECT situacao, operador, reservado_ate FROM contato WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                conexao.execute(
+                    "INSERT INTO contato SELECT ?, ?, ?, COALESCE(MAX(posicao), -1) + 1, 'reservado', ?, ? FROM contato",
+                    (chave, str(cod), telefone, self.operador, agora + self.duracao_reserva))
+                return True
+            situacao, operador, reservado_ate = linha
+            if situacao == 'concluido':
+                return False
+            if situacao == 'reservado' and operador != self.operador and reservado_ate >= agora:
+                return False
+            conexao.execute("UPDATE contato SET situacao = 'reservado', operador = ?, reservado_ate = ? WHERE chave = ?",
+                            (self.operador, agora + self.duracao_reserva, chave))
+            return True
+
+    def concluir(self, cod):
+        """ Tira da campanha um COD que esta instância terminou sem resultado (só se a reserva ainda é dela) """
+        self._executar("UPDATE contato SET situacao = 'concluido', reservado_ate = NULL "
+                       "WHERE chave = ? AND operador = ? AND situacao = 'reservado'", (chave_tarefa(cod), self.operador))
+
+    def registrar_resultado(self, linha):
+        """ Grava o resultado e conclui o COD seja qual for o dono da reserva (ela pode ter vencido e passado a outro) """
+        with self._transacao() as conexao:
+            conexao.execute("INSERT INTO resultado VALUES (?, ?, ?, ?, ?, ?)", (*linha, self.operador))
+            conexao.execute("UPDATE contato SET situacao = 'concluido', reservado_ate = NULL WHERE chave = ?",
+                            (chave_tarefa(linha[0]),))
+
+    def registrar_retorno(self, linha):
+        self._executar("INSERT INTO retorno VALUES (?, ?, ?, ?, ?, ?)", (*linha, self.operador))
+
+    def atualizar_status_retornos(self, chaves, status):
+        """ Mesmo que EscritorPlanilha.atualizar_status_retornos, para os retornos desta instância """
+        with self._transacao() as conexao:
+            conexao.executemany("UPDATE retorno SET status = ? WHERE cod = ? AND hora = ? AND data = ? AND operador = ?",
+                                [(status, *chave, self.operador) for chave in chaves])
+
+    def atualizar_telefone(self, cod, telefone):
+        self._executar("UPDATE contato SET telefone = ? WHERE chave = ?", (telefone, chave_tarefa(cod)))
+
+    def contatados(self):
+        """ CODs com resultado registrado por qualquer operador """
+        return {cod for (cod,) in self._executar("SELECT DISTINCT cod FROM resultado").fetchall()}
+
+    def reservas_de_outros(self):
+        """ Reservas ainda válidas de outros operadores (podem vencer e voltar para a fila) """
+        return self._executar("SELECT COUNT(*) FROM contato WHERE situacao = 'reservado' AND operador != ? AND reservado_ate >= ?",
+                              (self.operador, time.time())).fetchone()[0]
+
+    def resumo(self):
+        contagem = dict(self._executar("SELECT situacao, COUNT(*) FROM contato GROUP BY situacao").fetchall())
+        return (f"Campanha: {contagem.get('concluido', 0)} concluídos, {contagem.get('reservado', 0)} reservados, "
+                f"{contagem.get('pendente', 0)} pendentes")
+
+    def iniciar_renovacao(self):
+        self._parar_renovacao.clear()
+        if self._thread_renovacao is None or not self._thread_renovacao.is_alive():
+            self._thread_renovacao = threading.Thread(target=self._loop_renovacao, daemon=True)
+            self._thread_renovacao.start()
+
+    def _loop_renovacao(self):
+        while not self._parar_renovacao.wait(self.duracao_reserva / 3):
+            try:
+                self._executar("UPDATE contato SET reservado_ate = ? WHERE situacao = 'reservado' AND operador = ?",
+                               (time.time() + self.duracao_reserva, self.operador))
+            except Exception as e:
+                logging.warning(f"Não foi possível renovar as reservas da campanha: {e}")
+
+    def encerrar(self):
+        """ Para de renovar e devolve à fila os CODs reservados que não foram concluídos """
+        self._parar_renovacao.set()
+        try:
+            devolvidos = self._executar(
+                "UPDATE contato SET situacao = 'pendente', operador = NULL, reservado_ate = NULL "
+                "WHERE situacao = 'reservado' AND operador = ?", (self.operador,)).rowcount
+            logging.info(f"{devolvidos} CODs reservados devolvidos à campanha.")
+        except Exception as e:
+            logging.warning(f"Não foi possível devolver as reservas da campanha (vão vencer sozinhas): {e}")
+
+    def exportar(self, caminho_excel):
+        """ Grava numa planilha os resultados e retornos de todos os operadores """
+        carregar_modulos_pesados()
+        wb = Workbook()
+        aba_resultados = wb.active
+        aba_resultados.title = ABA_RESULTADOS
+        aba_resultados.append(['COD', 'TELEFONE', 'HORA', 'DATA', 'OBSERVACAO', 'OPERADOR'])
+        for linha in self._executar("SELECT * FROM resultado").fetchall():
+            aba_resultados.append(list(linha))
+        aba_retornos = wb.create_sheet(ABA_RETORNOS)
+        aba_retornos.append(['COD', 'TELEFONE', 'HORA', 'DATA', 'STATUS', 'OPERADOR'])
+        for linha in self._executar("SELECT * FROM retorno").fetchall():
+            aba_retornos.append(list(linha))
+        wb.save(caminho_excel)
+
+
+class ListaCompartilhada(ListaContatos):
+    """
+    Lista principal no modo campanha compartilhada: em vez de ler a planilha, reserva lotes
+    de CODs na CampanhaCompartilhada conforme o loop avança. Só termina quando não há nada
+    livre nem reservas de outros operadores que ainda possam vencer e voltar para a fila.
+    """
+    def __init__(self, campanha, tamanho_lote=20, aguardar=None):
+        super().__init__()
+        self.campanha = campanha
+        self.tamanho_lote = max(1, int(tamanho_lote))
+        self.aguardar_encerramento = aguardar or (lambda segundos: time.sleep(segundos) or False)
+
+    def aguardar(self, posicao, tempo_maximo=5.0):
+        if posicao < self.carregados or self.finalizada:
+            return
+        reservados = self.campanha.reservar(self.tamanho_lote)
+        if reservados:
+            self._publicar([cod for cod, _ in reservados], [telefone for _, telefone in reservados])
+        elif self.campanha.reservas_de_outros() == 0 or self.aguardar_encerramento(tempo_maximo):
+            with self._condicao:
+                self.finalizada = True
+                self._condicao.notify_all()
+
+
+# --- SUPERVISÃO DO NAVEGADOR (QUEDAS E SESSÃO EXPIRADA) ---
+class SessaoPerdida(Exception):
+    """ O Chrome principal parou de responder ou o Weon voltou para a tela de login """
+
+
+class SupervisorNavegador:
+    """
+    Cuida do Chrome principal: deixa o navegador logado na página principal e, quando o
+    driver morre ou a sessão do Weon expira, recupera no lugar (novo login no mesmo Chrome se
+    ele ainda responde, senão um Chrome novo), tentando de novo com espera crescente.
+    """
+    ESPERAS = (0, 2, 5, 10, 20, 30)
+
+    def __init__(self, credenciais, perfil=None, aguardar=None, max_tentativas=8, notificar=None, headless=False,
+                 encerrado=None):
+        self.credenciais = credenciais
+        self.perfil = perfil
+        self.headless = headless
+        self.aguardar = aguardar or (lambda segundos: time.sleep(segundos))
+        self.encerrado = encerrado or (lambda: False)   # True depois que a automação começou a fechar
+        self.max_tentativas = max(1, int(max_tentativas))
+        self.notificar = notificar or (lambda mensagem: None)
+        self.driver = None
+        self.ultimo_erro = None
+        self.incidentes = 0
+
+    def situacao(self):
+        """ 'ok', 'deslogado' (fora da página principal) ou 'morto' (o driver não responde) """
+        if self.driver is None:
+            return 'morto'
+        try:
+            if self.driver.find_elements(By.CSS_SELECTOR, SELETOR_CAMPO_BUSCA):
+                return 'ok'
+            if not self.driver.find_elements(By.NAME, "login") and esperar_pagina_principal(self.driver, 5):
+                return 'ok'
+            return 'deslogado'
+        except Exception:
+            return 'morto'
+
+    def _descartar(self):
+        if self.driver is not None:
+            try: self.driver.quit()
+            except Exception: pass
+        self.driver = None
+
+    def _conectar(self, recarregar):
+        usuario, senha, url_weon = self.credenciais
+        if self.driver is not None:
+            try:
+                self.driver.current_url
+            except Exception:
+                self._descartar()
+        if self.driver is None:
+            self.driver = criar_driver(headless=self.headless, perfil=self.perfil)
+        elif recarregar:
+            self.driver.get(url_weon)
+        entrou = entrar_no_weon(self.driver, usuario, senha, url_weon)
+        if not esperar_pagina_principal(self.driver):
+            raise SessaoPerdida("A página principal do Weon não carregou")
+        self.notificar("Login efetuado!" if entrou else "Sessão do Weon reaproveitada, sem novo login.")
+
+    def conectar(self, tentativas=None, recarregar=False):
+        """ Deixa o Chrome logado na página principal. Retorna False se esgotar as tentativas ou a automação for encerrada """
+        tentativas = tentativas or self.max_tentativas
+        for tentativa in range(tentativas):
+            if self.encerrado():
+                # Fechando: não abre um Chrome que ninguém vai fechar
+                return False
+            espera = self.ESPERAS[min(tentativa, len(self.ESPERAS) - 1)]
+            if espera:
+                self.notificar(f"Tentando abrir o Weon de novo em {espera}s ({tentativa + 1}/{tentativas})...")
+                if self.aguardar(espera):
+                    return False
+            try:
+                self._conectar(recarregar)
+                return True
+            except Exception as e:
+                self.ultimo_erro = e
+                logging.warning(f"Tentativa {tentativa + 1}/{tentativas} de abrir o Weon falhou: {e}")
+                # A próxima tentativa começa de um Chrome novo
+                self._descartar()
+        return False
+
+    def recuperar(self):
+        """ Recupera a sessão depois de uma queda; retorna True se o Chrome voltou logado """
+        self.incidentes += 1
+        inicio = time.monotonic()
+        logging.warning(f"Sessão do navegador perdida ({self.situacao()}). Recuperando...")
+        if not self.conectar(recarregar=True):
+            return False
+        logging.info(f"Sessão recuperada em {time.monotonic() - inicio:.1f}s (queda nº {self.incidentes}).")
+        return True
+
+
+# --- BUSCA DIRETA POR HTTP ---
+def _valor_no_caminho(dados, caminho):
+    for parte in filter(None, caminho.split('.')):
+        if isinstance(dados, list):
+            dados = dados[int(parte)] if parte.isdigit() and int(parte) < len(dados) else None
+        elif isinstance(dados, dict):
+            dados = dados.get(parte)
+        else:
+            return None
+    return dados
+
+def cookies_do_driver(driver):
+    return "; ".join(f"{c['name']}={c['value']}" for c in driver.get_cookies())
+
+class ClienteBuscaHTTP:
+    """
+    Chama direto o endpoint de busca que o diálogo do Weon usa, com os cookies da sessão
+    aberta pelo Selenium, numa conexão HTTP reaproveitada (pool) e com limite de requisições
+    simultâneas. Qualquer falha levanta exceção para quem chamou cair no caminho do Selenium;
+    depois de várias falhas seguidas o cliente se desliga.
+    """
+    MAX_FALHAS_SEGUIDAS = 5
+
+    def __init__(self, url_modelo, fonte_cookies, config, token=None, user_agent=None):
+        self.url_modelo = url_modelo
+        self.fonte_cookies = fonte_cookies
+        self.campo_lista = config['api_campo_lista']
+        self.campo_cod = config['api_campo_cod']
+        self.campo_telefone = config['api_campo_telefone']
+        self.timeout = config['api_timeout']
+        self.ativo = True
+
+        maximo = max(1, int(config['api_max_conexoes']))
+        self._limite = threading.BoundedSemaphore(maximo)
+        self._pool = urllib3.PoolManager(maxsize=maximo, block=True, retries=False)
+        self._lock = threading.Lock()
+        self._falhas_seguidas = 0
+        self._cabecalhos = {'Accept': 'application/json'}
+        if token:
+            self._cabecalhos['Authorization'] = f"Bearer {token}"
+        if user_agent:
+            self._cabecalhos['User-Agent'] = user_agent
+        self._cookies = fonte_cookies()
+
+    @classmethod
+    def a_partir_do_driver(cls, driver, config, url_weon, driver_lock=None):
+        """ Monta o cliente com a sessão do driver já logado, ou devolve None se a API não estiver configurada """
+        if not config['api_busca_url']:
+            return None
+        lock = driver_lock or threading.Lock()
+        fonte_cookies = cls._fonte_cookies(driver, lock)
+        with lock:
+            user_agent = driver.execute_script("return navigator.userAgent")
+            token = None
+            if config['api_token_storage']:
+                token = driver.execute_script("return window.localStorage.getItem(arguments[0])", config['api_token_storage'])
+        url_modelo = urljoin(url_weon, config['api_busca_url'])
+        logging.info(f"Busca por HTTP ativada em {url_modelo}.")
+        return cls(url_modelo, fonte_cookies, config, token=token, user_agent=user_agent)
+
+    @staticmethod
+    def _fonte_cookies(driver, lock):
+        def fonte_cookies():
+            with lock:
+                return cookies_do_driver(driver)
+        return fonte_cookies
+
+    def renovar_sessao(self, driver, driver_lock):
+        """ Passa a usar os cookies de outro driver (depois de o Chrome principal ser recriado) e volta a ativar o cliente """
+        fonte_cookies = self._fonte_cookies(driver, driver_lock)
+        cookies = fonte_cookies()
+        with self._lock:
+            self.fonte_cookies = fonte_cookies
+            self._cookies = cookies
+            self._falhas_seguidas = 0
+            self.ativo = True
+
+    def buscar(self, codigo_limpo):
+        if not self.ativo:
+            raise RuntimeError("Busca por HTTP desativada")
+        try:
+            resposta = self._requisitar(codigo_limpo)
+            if resposta.status in (401, 403):
+                # Sessão renovada no navegador: pega os cookies de novo e tenta uma vez
+                self._cookies = self.fonte_cookies()
+                resposta = self._requisitar(codigo_limpo)
+            if resposta.status != 200:
+                raise RuntimeError(f"HTTP {resposta.status}")
+            resultado = self._interpretar(codigo_limpo, json.loads(resposta.data.decode('utf-8')))
+        except Exception:
+            with self._lock:
+                self._falhas_seguidas += 1
+                if self._falhas_seguidas >= self.MAX_FALHAS_SEGUIDAS and self.ativo:
+                    self.ativo = False
+                    logging.error("Busca por HTTP desativada após falhas seguidas; usando só o Selenium.")
+            raise
+        with self._lock:
+            self._falhas_seguidas = 0
+        return resultado
+
+    def _requisitar(self, codigo_limpo):
+        url = self.url_modelo.replace('{codigo}', quote(codigo_limpo))
+        cabecalhos = dict(self._cabecalhos, Cookie=self._cookies)
+        with self._limite:
+            return self._pool.request('GET', url, headers=cabecalhos, timeout=self.timeout)
+
+    def _interpretar(self, codigo_limpo, dados):
+        """ Mesma regra do diálogo: vale a primeira linha da tabela; telefone '-' é telefone vazio """
+        linhas = _valor_no_caminho(dados, self.campo_lista)
+        if not linhas:
+            return classificar_busca(codigo_limpo, None, None)
+        primeira = linhas[0]
+        cod_encontrado = str(_valor_no_caminho(primeira, self.campo_cod) or '').strip()
+        telefone = str(_valor_no_caminho(primeira, self.campo_telefone) or '').strip()
+        if codigo_limpo not in cod_encontrado:
+            # O diálogo espera o código aparecer na primeira coluna; sem isso conta como não encontrado
+            return classificar_busca(codigo_limpo, None, None)
+        return classificar_busca(codigo_limpo, cod_encontrado, telefone if telefone and telefone != "-" else None)
+
+
+# --- BUSCA ANTECIPADA DE TELEFONES ---
+class BuscaAntecipada:
+    """
+    Resolve em segundo plano os telefones dos próximos CODs da fila, num segundo Chrome
+    (headless) com sessão própria, para não disputar o driver_lock da janela de discagem.
+    Enquanto o operador está na chamada, as próximas buscas já vão sendo feitas; o loop
+    principal só pega o resultado pronto (encontrado, divergente ou não encontrado).
+    Erros e "não encontrado" com o segundo Chrome fora da página principal ficam para o loop
+    principal; o segundo Chrome é recuperado pelo próprio SupervisorNavegador.
+    Se receber uma função de busca (a busca por HTTP), usa ela e não abre o segundo Chrome.
+    """
+    def __init__(self, credenciais, fornecer_proximos, profundidade=3, cache=None, buscar=None):
+        self.credenciais = credenciais
+        self.fornecer_proximos = fornecer_proximos
+        self.cache = cache
+        self.buscar = buscar
+        self.profundidade = max(1, int(profundidade))
+        self.supervisor = SupervisorNavegador(credenciais, aguardar=self._aguardar, max_tentativas=3, headless=True,
+                                              encerrado=lambda: not self._ativa)
+
+        self._condicao = threading.Condition()
+        self._resultados = {}
+        self._sem_resultado = set()   # Falhas da busca por HTTP: ficam para o loop principal
+        self._em_busca = None
+        self._ativa = True
+
+        self._thread = threading.Thread(target=self._loop_busca, daemon=True)
+        self._thread.start()
+
+    def avisar(self):
+        """ Acorda a thread para olhar a fila de novo """
+        with self._condicao:
+            self._condicao.notify_all()
+
+    def obter(self, codigo_limpo, tempo_maximo=30):
+        """ Devolve o ResultadoBusca já resolvido (esperando se a busca do código está em andamento) ou None """
+        with self._condicao:
+            limite = time.monotonic() + tempo_maximo
+            while self._ativa and self._em_busca == codigo_limpo and codigo_limpo not in self._resultados:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._condicao.wait(restante)
+            resultado = self._resultados.pop(codigo_limpo, None)
+            self._condicao.notify_all()
+            return resultado
+
+    def encerrar(self):
+        with self._condicao:
+            self._ativa = False
+            self._condicao.notify_all()
+        self._thread.join(timeout=20)
+        if self.supervisor.driver:
+            try: self.supervisor.driver.quit()
+            except Exception as e: logging.warning(f"Erro ao fechar o Chrome da busca antecipada: {e}")
+
+    def _aguardar(self, segundos):
+        """ Espera do SupervisorNavegador; interrompida (True) quando a busca é encerrada """
+        with self._condicao:
+            limite = time.monotonic() + segundos
+            while self._ativa and time.monotonic() < limite:
+                self._condicao.wait(limite - time.monotonic())
+            return not self._ativa
+
+    def _iniciar_driver(self):
+        if self.supervisor.conectar():
+            logging.info("Busca antecipada pronta.")
+            return True
+        logging.error(f"Busca antecipada desativada: não foi possível abrir o segundo Chrome. Detalhes: {self.supervisor.ultimo_erro}")
+        return False
+
+    def _proximo_codigo(self):
+        for codigo in self.fornecer_proximos(self.profundidade):
+            if codigo in self._resultados or codigo in self._sem_resultado or (self.cache and self.cache.contem(codigo)):
+                continue
+            return codigo
+        return None
+
+    def _buscar(self, codigo):
+        if self.buscar:
+            try:
+                return self.buscar(codigo)
+            except Exception as e:
+                # Sem resultado antecipado: o loop principal busca pelo caminho normal
+                logging.warning(f"Busca antecipada por HTTP falhou para {codigo}: {e}")
+                return None
+        resultado = buscar_contato(self.supervisor.driver, codigo)
+        if resultado.situacao == BUSCA_ERRO or (resultado.situacao == BUSCA_NAO_ENCONTRADO and self.supervisor.situacao() != 'ok'):
+            # Pode ser só a sessão do segundo Chrome que caiu: o loop principal busca de novo,
+            # com o navegador supervisionado, e o segundo Chrome volta para a página principal
+            if self.supervisor.situacao() != 'ok' and not self.supervisor.recuperar():
+                logging.error("Busca antecipada desativada: o segundo Chrome não voltou para o Weon.")
+                with self._condicao:
+                    self._ativa = False
+            return None
+        return resultado
+
+    def _loop_busca(self):
+        if not self.buscar and not self._iniciar_driver():
+            with self._condicao:
+                self._ativa = False
+                self._condicao.notify_all()
+            return
 
-# Arquivos de configuração
-NOME_ARQUIVO_EXCEL = "automacao_weon.xlsx"
-NOME_ARQUIVO_LOGIN = "login.txt"
+        while True:
+            with self._condicao:
+                codigo = None
+                while self._ativa:
+                    codigo = self._proximo_codigo()
+                    if codigo:
+                        break
+                    self._condicao.wait(1.0)
+                if not self._ativa:
+                    return
+                self._em_busca = codigo
 
-# Abas da Planilha
-ABA_CONTATOS = "contatos"
-ABA_RESULTADOS = "resultados"
-ABA_RETORNOS = "retornos"
-ABA_PRIORIDADE = "PRIORIDADE"
+            resultado = self._buscar(codigo)
 
-# Seletor do Selenium
-SELETOR_BOTAO_ENCERRAR_CHAMADA = "//button[@class='v-btn v-btn--block theme--dark green accent-5']"
+            with self._condicao:
+                if resultado is not None:
+                    self._resultados[codigo] = resultado
+                else:
+                    if len(self._sem_resultado) > 1000:
+                        self._sem_resultado.clear()
+                    self._sem_resultado.add(codigo)
+                # Descarta os mais antigos (CODs que saíram da fila sem serem consumidos)
+                while len(self._resultados) > self.profundidade * 2:
+                    del self._resultados[next(iter(self._resultados))]
+                self._em_busca = None
+                self._condicao.notify_all()
 
 
-# --- FUNÇÃO DE AJUDA PARA PYINSTALLER ---
-def resource_path(relative_path):
-    """ Retorna o caminho absoluto para o recurso, funciona para desenvolvimento e para o PyInstaller """
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+# --- ATUALIZAÇÃO DA INTERFACE (BARRAMENTO ENTRE THREADS) ---
+class BarramentoInterface:
+    """
+    Ponte entre as threads de trabalho e o Tk: elas só publicam (o valor mais recente de cada
+    variável, as opções de cada widget ou uma ação para rodar uma vez) e a thread do Tk aplica
+    tudo a cada tique. Vários status seguidos viram um só redesenho e nenhuma chamada ao Tk
+    sai de outra thread.
+    """
+    def __init__(self, master, intervalo_ms=100):
+        self.master = master
+        self.intervalo_ms = int(intervalo_ms)
+        self._lock = threading.Lock()
+        self._variaveis = {}   # nome Tcl da variável -> (variável, valor mais recente)
+        self._widgets = {}     # nome Tcl do widget -> (widget, opções acumuladas)
+        self._acoes = deque()
 
-# --- FUNÇÕES AUXILIARES ---
-def verificar_ou_criar_planilha():
-    if not os.path.exists(NOME_ARQUIVO_EXCEL):
-        logging.info(f"Arquivo '{NOME_ARQUIVO_EXCEL}' não encontrado. Criando um novo.")
-        wb = Workbook()
-        ws_contatos = wb.active
-        ws_contatos.title = ABA_CONTATOS
-        ws_contatos.append(['COD', 'TELEFONE'])
-        ws_resultados = wb.create_sheet(ABA_RESULTADOS)
-        ws_resultados.append(['COD', 'TELEFONE', 'HORA', 'DATA', 'OBSERVACAO'])
-        ws_retornos = wb.create_sheet(ABA_RETORNOS)
-        ws_retornos.append(['COD', 'TELEFONE', 'HORA', 'DATA', 'STATUS'])
-        ws_prioridade = wb.create_sheet(ABA_PRIORIDADE)
-        ws_prioridade.append(['COD'])
-        wb.save(NOME_ARQUIVO_EXCEL)
-        logging.info("Planilha criada com sucesso.")
-        messagebox.showinfo("Planilha Criada", 
-                            f"A planilha '{NOME_ARQUIVO_EXCEL}' foi criada com as abas necessárias, incluindo a aba 'PRIORIDADE'.")
-    else:
-        logging.info(f"Planilha '{NOME_ARQUIVO_EXCEL}' encontrada.")
+    def publicar(self, variavel, valor):
+        with self._lock:
+            self._variaveis[str(variavel)] = (variavel, valor)
 
-def verificar_ou_criar_login():
-    if not os.path.exists(NOME_ARQUIVO_LOGIN):
-        with open(NOME_ARQUIVO_LOGIN, "w", encoding="utf-8") as f:
-            f.write("Usuário=\nSenha=\nURL=\n")
-        logging.info("Arquivo login.txt criado automaticamente.")
-        messagebox.showinfo("Login Criado", f"O arquivo '{NOME_ARQUIVO_LOGIN}' foi criado.\n\nPor favor, preencha seu usuário, senha e a URL do sistema Weon antes de continuar.")
+    def configurar(self, widget, **opcoes):
+        with self._lock:
+            _, acumuladas = self._widgets.get(str(widget), (widget, {}))
+            acumuladas.update(opcoes)
+            self._widgets[str(widget)] = (widget, acumuladas)
 
-def ler_login():
-    try:
-        config = {}
-        with open(NOME_ARQUIVO_LOGIN, "r", encoding="utf-8") as f:
-            for linha in f:
-                if "=" in linha:
-                    chave, valor = linha.strip().split("=", 1)
-                    config[chave.strip().lower()] = valor.strip()
-        
-        usuario = config.get('usuário')
-        senha = config.get('senha')
-        url = config.get('url')
+    def executar(self, funcao, *argumentos):
+        """ Ação única (ex.: uma caixa de mensagem), na ordem em que foi pedida """
+        with self._lock:
+            self._acoes.append((funcao, argumentos))
 
-        if not all([usuario, senha, url]):
-            raise ValueError("Usuário, senha ou URL não preenchidos no login.txt")
-        
-        return usuario, senha, url
-    except (FileNotFoundError, ValueError) as e:
-        raise ValueError(f"Erro ao ler '{NOME_ARQUIVO_LOGIN}': {e}.")
+    def iniciar(self):
+        self.master.after(self.intervalo_ms, self._drenar)
 
-def esperar_elemento(driver, by, value, tempo=10):
-    try:
-        return WebDriverWait(driver, tempo).until(EC.presence_of_element_located((by, value)))
-    except TimeoutException:
-        logging.error(f"Timeout esperando elemento: {value}")
-        return None
+    def _drenar(self):
+        # O próximo tique é agendado antes de aplicar: uma ação modal (caixa de mensagem) roda o
+        # loop do Tk e as atualizações continuam enquanto ela está aberta
+        try:
+            self.master.after(self.intervalo_ms, self._drenar)
+        except tk.TclError:
+            # Janela fechada: não há mais o que atualizar
+            return
+        with self._lock:
+            variaveis, self._variaveis = self._variaveis, {}
+            widgets, self._widgets = self._widgets, {}
+            quantidade_acoes = len(self._acoes)
+        for variavel, valor in variaveis.values():
+            self._aplicar(variavel.set, valor)
+        for widget, opcoes in widgets.values():
+            self._aplicar(widget.config, **opcoes)
+        # As ações saem uma a uma: um tique aninhado (dentro de uma modal) continua da próxima, na ordem
+        for _ in range(quantidade_acoes):
+            with self._lock:
+                if not self._acoes:
+                    break
+                funcao, argumentos = self._acoes.popleft()
+            self._aplicar(funcao, *argumentos)
 
-def esperar_elemento_clickable(driver, by, value, tempo=10):
-    try:
-        return WebDriverWait(driver, tempo).until(EC.element_to_be_clickable((by, value)))
-    except TimeoutException:
-        logging.error(f"Timeout esperando elemento clicável: {value}")
-        return None
+    @staticmethod
+    def _aplicar(funcao, *argumentos, **opcoes):
+        """ Um item com erro é registrado e descartado sem parar o barramento """
+        try:
+            funcao(*argumentos, **opcoes)
+        except Exception:
+            logging.exception("Erro ao atualizar a interface")
 
-def limpar_codigo(codigo_bruto):
-    if not isinstance(codigo_bruto, str): return ""
-    return re.sub(r'[^0-9]', '', codigo_bruto)
+
+# --- IMPORTAÇÃO DE CODS EM LOTE ---
+def ler_cods_arquivo(caminho):
+    """ Coluna COD (ou a primeira coluna, se nenhuma se chamar COD) de um .csv ou .xlsx, como texto """
+    carregar_modulos_pesados()
+    if caminho.lower().endswith(('.xlsx', '.xlsm', '.xls')):
+        df = pd.read_excel(caminho, header=None, dtype=str)
+    else:
+        with open(caminho, "r", encoding="utf-8-sig", errors="replace") as f:
+            amostra = f.read(4096)
+        try:
+            separador = csv.Sniffer().sniff(amostra, delimiters=";,\t|").delimiter
+        except csv.Error:
+            # Arquivo de uma coluna só: não há separador para descobrir
+            separador = ","
+        df = pd.read_csv(caminho, header=None, dtype=str, sep=separador, encoding='utf-8-sig')
+    if df.empty:
+        return pd.Series([], dtype=object)
+    cabecalho = df.iloc[0].fillna('').str.strip().str.upper()
+    colunas_cod = list(cabecalho[cabecalho == 'COD'].index)
+    if colunas_cod:
+        return df[colunas_cod[0]].iloc[1:]
+    return df[df.columns[0]]
+
+def preparar_cods(cods, chaves_na_fila=(), contatados=()):
+    """
+    Normaliza a lista inteira de uma vez (o mesmo que limpar_codigo, com as operações de texto
+    do pandas) e separa os CODs que entram na fila. Devolve (CODs aceitos, descartes por motivo):
+    inválidos (até 5 dígitos), repetidos na própria lista, já contatados e já na fila.
+    """
+    carregar_modulos_pesados()
+    textos = pd.Series(list(cods), dtype=object).dropna().astype(str).str.strip()
+    # Números lidos do Excel como float (12345678.0)
+    textos = textos.str.replace(r'\.0$', '', regex=True)
+    textos = textos[textos != '']
+    chaves = textos.str.replace(r'[^0-9]', '', regex=True)
+    invalidos = chaves.str.len() <= 5
+    repetidos = ~invalidos & chaves.duplicated()
+    # Os contatados são comparados pela mesma chave (12.345.678/0001-90 é o 12345678000190 já contatado)
+    chaves_contatados = pd.Series(list(contatados), dtype=object).astype(str).str.replace(r'[^0-9]', '', regex=True)
+    ja_contatados = ~invalidos & ~repetidos & chaves.isin(set(chaves_contatados))
+    na_fila = ~invalidos & ~repetidos & ~ja_contatados & chaves.isin(set(chaves_na_fila))
+    aceitos = ~(invalidos | repetidos | ja_contatados | na_fila)
+    descartes = {'invalidos': int(invalidos.sum()), 'repetidos': int(repetidos.sum()),
+                 'ja_contatados': int(ja_contatados.sum()), 'ja_na_fila': int(na_fila.sum())}
+    return textos[aceitos].tolist(), descartes
 
 
 # --- CLASSES DE DIÁLOGO ---
@@ -156,16 +2678,28 @@ class AgendamentoDialog(simpledialog.Dialog):
 
 class AddCodDialog(simpledialog.Dialog):
     def body(self, master):
-        self.geometry("350x300")
+        self.geometry("350x360")
+        self.arquivo = None
         tk.Label(master, text="Cole os CODs abaixo (um por linha):").pack(pady=10)
         self.text_widget = scrolledtext.ScrolledText(master, width=40, height=10, wrap=tk.WORD)
         self.text_widget.pack(pady=5, padx=10, fill="both", expand=True)
+        tk.Button(master, text="Ou importar de um arquivo (.csv / .xlsx)...", command=self.escolher_arquivo).pack(pady=5)
+        self.arquivo_var = tk.StringVar(value="")
+        tk.Label(master, textvariable=self.arquivo_var, fg="blue", font=("Helvetica", 8, "italic")).pack()
         return self.text_widget
 
+    def escolher_arquivo(self):
+        caminho = filedialog.askopenfilename(parent=self, title="Arquivo com a coluna COD",
+                                             filetypes=[("Planilhas e CSV", "*.xlsx *.xlsm *.xls *.csv *.txt"),
+                                                        ("Todos os arquivos", "*.*")])
+        if caminho:
+            self.arquivo = caminho
+            self.arquivo_var.set(os.path.basename(caminho))
+
     def apply(self):
         text_content = self.text_widget.get("1.0", tk.END)
         cods = [line.strip() for line in text_content.splitlines() if line.strip()]
-        self.result = cods if cods else None
+        self.result = (cods, self.arquivo) if cods or self.arquivo else None
 
 
 # --- CLASSE PRINCIPAL DA GUI E AUTOMAÇÃO ---
@@ -173,7 +2707,7 @@ class AutomacaoGUI:
     def __init__(self, master):
         self.master = master
         master.title(f"Automação Weon Integrada by Gavet © {datetime.now().year}")
-        master.geometry("550x380")
+        master.geometry("550x540")
         master.protocol("WM_DELETE_WINDOW", self.on_closing)
         
         self.is_running = False
@@ -183,24 +2717,40 @@ class AutomacaoGUI:
         self.current_cod = None
         self.current_phone = None
         
-        self.priority_queue = []
-        self.list_lock = threading.Lock()
+        self.fila = FilaTarefas()
+        self.agenda = AgendaRetornos()
+        self._lock_chamada = threading.Lock()
+        self._chamada_pendente = False
+        self.contatados_anteriormente = set()
+        self.busca_antecipada = None
+        self.cliente_http = None
+        self.supervisor = None
+        self.campanha = None
+        self._preaquecimento = None
+        self._driver_preaquecido = None
+        self._iniciado_em = None
 
         self.excel_lock = threading.Lock()
         self.driver_lock = threading.Lock()
         self.action_taken_event = threading.Event()
 
+        self.ui = BarramentoInterface(master)
         self.status_var = tk.StringVar(value="Status: Ocioso")
         self.cod_var = tk.StringVar(value="COD: -")
         self.fone_var = tk.StringVar(value="Fone: -")
         self.contador_var = tk.StringVar(value="Contatos: 0/0")
+        self.cache_var = tk.StringVar(value="Cache: -")
+        self.metricas_var = tk.StringVar(value="Sem medições ainda.")
         
         tk.Label(master, textvariable=self.status_var, font=("Helvetica", 12, "bold")).pack(pady=10)
+        self.progresso = ttk.Progressbar(master, mode='determinate', maximum=100, length=300)
+        self.progresso.pack()
         info_frame = tk.Frame(master)
         info_frame.pack(pady=5)
         tk.Label(info_frame, textvariable=self.cod_var, font=("Helvetica", 10)).pack(side=tk.LEFT, padx=10)
         tk.Label(info_frame, textvariable=self.fone_var, font=("Helvetica", 10)).pack(side=tk.LEFT, padx=10)
         tk.Label(master, textvariable=self.contador_var, font=("Helvetica", 10, "italic")).pack(pady=5)
+        tk.Label(master, textvariable=self.cache_var, font=("Helvetica", 8)).pack()
 
         control_frame = tk.Frame(master)
         control_frame.pack(pady=10)
@@ -219,17 +2769,101 @@ class AutomacaoGUI:
         self.schedule_button = tk.Button(action_frame, text="Agendar Retorno", command=self.agendar_retorno, state=tk.DISABLED)
         self.schedule_button.pack(side=tk.LEFT, padx=5)
         
-        self.copy_button = tk.Button(master, text="Copiar Código", command=self.copiar_codigo_atual)
-        self.copy_button.pack(pady=10)
+        extra_frame = tk.Frame(master)
+        extra_frame.pack(pady=10)
+        self.copy_button = tk.Button(extra_frame, text="Copiar Código", command=self.copiar_codigo_atual)
+        self.copy_button.pack(side=tk.LEFT, padx=5)
+        self.report_button = tk.Button(extra_frame, text="Exportar Resumo", command=self.exportar_resumo)
+        self.report_button.pack(side=tk.LEFT, padx=5)
+
+        metricas_frame = tk.LabelFrame(master, text="Desempenho", font=("Helvetica", 8))
+        metricas_frame.pack(fill=tk.X, padx=10, pady=5)
+        tk.Label(metricas_frame, textvariable=self.metricas_var, font=("Courier", 8), justify=tk.LEFT).pack(anchor=tk.W)
+
+        self.config = ler_configuracoes()
+        ajustar_log(self.config)
+        self.metricas = Metricas(janela=self.config['janela_metricas'])
+        self.escritor = EscritorPlanilha(NOME_ARQUIVO_EXCEL, NOME_ARQUIVO_DIARIO, self.excel_lock,
+                                         lote_maximo=self.config['lote_escrita'],
+                                         intervalo_maximo=self.config['intervalo_escrita'],
+                                         notificar=self.atualizar_status,
+                                         metricas=self.metricas)
+        self.cache = CacheTelefones(NOME_ARQUIVO_CACHE,
+                                    validade_horas=self.config['cache_validade_horas'],
+                                    validade_negativa_horas=self.config['cache_validade_negativa_horas'],
+                                    max_entradas=self.config['cache_max_entradas'])
+        self.ritmo = Ritmo(self.config)
+        self.estado = EstadoExecucao(NOME_ARQUIVO_ESTADO)
+        self.escritor.ao_gravar.append(self.estado.registrar_impressao)
+        self.resumo = ResumoResultados(NOME_ARQUIVO_RESUMO)
+        self.escritor.ao_anexar.append(self.resumo.registrar_anexo)
+        self._metricas_salvas_em = time.monotonic()
+        self.atualizar_painel_metricas()
+        self.ui.iniciar()
+        master.after(100, self._iniciar_preaquecimento)
+
+    # --- INICIALIZAÇÃO RÁPIDA ---
+    def _iniciar_preaquecimento(self):
+        """ Chamado logo depois de a janela aparecer: importa os módulos pesados e abre o Chrome em segundo plano """
+        self.master.update_idletasks()
+        self.metricas.marcar('janela_pronta', time.monotonic() - INICIO_PROCESSO)
+        logging.info(f"Janela pronta {time.monotonic() - INICIO_PROCESSO:.2f}s após abrir o programa.")
+        if self.is_running or self.driver:
+            return
+        self._preaquecimento = threading.Thread(target=self._preaquecer, daemon=True)
+        self._preaquecimento.start()
+
+    def _preaquecer(self):
+        try:
+            carregar_modulos_pesados()
+            if not self.config['preaquecer_chrome']:
+                return
+            usuario, senha, url_weon = ler_login()
+            driver = criar_driver(headless=self.config['chrome_headless'], perfil=self.config['perfil_chrome'] or None)
+            self._driver_preaquecido = driver
+            driver.get(url_weon)
+            logging.info(f"Chrome pré-aquecido {time.monotonic() - INICIO_PROCESSO:.2f}s após abrir o programa.")
+        except Exception as e:
+            # O setup tenta de novo e mostra o erro, se houver
+            logging.warning(f"Não foi possível pré-aquecer o Chrome: {e}")
+
+    def _obter_navegador(self):
+        """ O Chrome pré-aquecido (ou o da execução anterior) se ainda responder; None para o supervisor abrir outro """
+        if self._preaquecimento:
+            self._preaquecimento.join(timeout=120)
+            self._preaquecimento = None
+        driver, self._driver_preaquecido = self._driver_preaquecido or self.driver, None
+        if driver:
+            try:
+                driver.current_url
+                return driver
+            except Exception:
+                logging.warning("O Chrome aberto antes não responde mais; abrindo outro.")
+                try: driver.quit()
+                except Exception: pass
+        return None
+
+    def _registrar_primeira_ligacao(self):
+        apos_iniciar = time.monotonic() - self._iniciado_em
+        apos_abrir = time.monotonic() - INICIO_PROCESSO
+        self._iniciado_em = None
+        self.metricas.marcar('primeira_ligacao_apos_iniciar', apos_iniciar)
+        self.metricas.marcar('primeira_ligacao_apos_abrir', apos_abrir)
+        logging.info(f"Primeira ligação {apos_iniciar:.1f}s após Iniciar ({apos_abrir:.1f}s após abrir o programa).")
 
     def iniciar_automacao(self):
         if self.is_paused:
             self.is_paused = False
+            self.ritmo.continuar()
             self.start_button.config(state=tk.DISABLED)
             self.pause_button.config(text="Pausar", state=tk.NORMAL)
             self.atualizar_status("Continuando automação...")
         elif not self.is_running:
             self.is_running = True
+            self.ritmo.reiniciar()
+            self.fila.reiniciar_contagem()
+            self.metricas.reiniciar()
+            self._iniciado_em = time.monotonic()
             self.start_button.config(text="Continuar", state=tk.DISABLED)
             self.pause_button.config(state=tk.NORMAL)
             self.add_cod_button.config(state=tk.NORMAL)
@@ -238,6 +2872,7 @@ class AutomacaoGUI:
 
     def pausar_automacao(self):
         self.is_paused = True
+        self.ritmo.pausar()
         self.atualizar_status("Pausado")
         self.start_button.config(state=tk.NORMAL)
         self.pause_button.config(text="Continuar", state=tk.DISABLED)
@@ -245,16 +2880,52 @@ class AutomacaoGUI:
     def on_closing(self):
         if messagebox.askokcancel("Sair", "Deseja fechar a automação?"):
             self.is_running = False
+            self.ritmo.encerrar()
             self.action_taken_event.set() 
-            if self.driver:
-                try: self.driver.quit()
+            for driver in {self.driver, self._driver_preaquecido} - {None}:
+                try: driver.quit()
                 except Exception as e: logging.warning(f"Erro ao fechar o Chrome: {e}")
+            if self.busca_antecipada:
+                self.busca_antecipada.encerrar()
+            self.escritor.encerrar()
             self.master.destroy()
 
+    def atualizar_painel_metricas(self):
+        """ Atualiza a seção de desempenho e, a cada intervalo_metricas, grava o arquivo de métricas """
+        try:
+            self.metricas_var.set(self.metricas.texto_painel())
+            if self.is_running and time.monotonic() - self._metricas_salvas_em >= self.config['intervalo_metricas']:
+                self.salvar_metricas()
+        except Exception as e:
+            logging.warning(f"Erro ao atualizar as métricas: {e}")
+        self.master.after(2000, self.atualizar_painel_metricas)
+
+    def salvar_metricas(self):
+        self._metricas_salvas_em = time.monotonic()
+        try:
+            self.metricas.salvar(NOME_ARQUIVO_METRICAS)
+        except Exception as e:
+            logging.warning(f"Não foi possível gravar o arquivo de métricas: {e}")
+
     def atualizar_status(self, mensagem):
-        self.master.after(0, self.status_var.set, f"Status: {mensagem}")
+        self.ui.publicar(self.status_var, f"Status: {mensagem}")
         logging.info(mensagem)
     
+    def exportar_resumo(self):
+        caminho = filedialog.asksaveasfilename(parent=self.master, title="Salvar resumo dos resultados",
+                                               defaultextension=".xlsx", initialfile="resumo_resultados.xlsx",
+                                               filetypes=[("Planilha do Excel", "*.xlsx")])
+        if caminho:
+            threading.Thread(target=self._exportar_resumo, args=(caminho,), daemon=True).start()
+
+    def _exportar_resumo(self, caminho):
+        try:
+            dias = self.resumo.exportar(caminho)
+            self.atualizar_status(f"Resumo de {dias} dia(s) gravado em {os.path.basename(caminho)}.")
+        except Exception as e:
+            logging.error(f"Erro ao exportar o resumo: {traceback.format_exc()}")
+            self.ui.executar(messagebox.showerror, "Erro ao Exportar", f"Não foi possível gravar o resumo: {e}")
+
     def copiar_codigo_atual(self):
         if self.current_cod:
             pyperclip.copy(self.current_cod)
@@ -264,192 +2935,507 @@ class AutomacaoGUI:
 
     def adicionar_novos_cods(self):
         dialog = AddCodDialog(self.master, "Adicionar CODs com Prioridade")
-        novos_cods = dialog.result
-        
-        if novos_cods:
-            self.atualizar_status(f"Adicionando {len(novos_cods)} CODs à fila...")
-            
-            novas_tarefas = []
-            for cod in novos_cods:
-                self._escrever_em_planilha(ABA_CONTATOS, [cod, ''])
-                novas_tarefas.append({'COD': cod, 'TELEFONE': ''})
+        if not dialog.result:
+            return
+        cods, arquivo = dialog.result
+        self.add_cod_button.config(state=tk.DISABLED)
+        threading.Thread(target=self._importar_cods, args=(cods, arquivo), daemon=True).start()
 
-            with self.list_lock:
-                self.priority_queue.extend(novas_tarefas)
-            
-            self.atualizar_status(f"{len(novos_cods)} CODs adicionados com prioridade.")
+    def _progresso(self, valor, mensagem=None):
+        self.ui.configurar(self.progresso, value=valor)
+        if mensagem:
+            self.atualizar_status(mensagem)
+
+    def _importar_cods(self, cods, arquivo):
+        """ Lê, normaliza, filtra e grava os CODs fora da thread do Tk, com o progresso na barra """
+        try:
+            self._progresso(5, "Lendo os CODs...")
+            carregar_modulos_pesados()
+            if arquivo:
+                cods = list(cods) + ler_cods_arquivo(arquivo).tolist()
+            self._progresso(40, f"Conferindo {len(cods)} CODs...")
+            aceitos, descartes = preparar_cods(cods, self.fila.chaves_na_fila(), frozenset(self.contatados_anteriormente))
+            self._progresso(70, f"Gravando {len(aceitos)} CODs...")
+            self.escritor.anexar_varias(ABA_CONTATOS, [[cod, ''] for cod in aceitos])
+            if aceitos:
+                self.estado.registrar_mudanca_contatos()
+            self.fila.adicionar([Tarefa(cod, '', PRIORIDADE_MANUAL) for cod in aceitos], PRIORIDADE_MANUAL)
+            self.estado.salvar_fila(self.fila)
+            ignorados = ", ".join(f"{quantidade} {motivo.replace('_', ' ')}" for motivo, quantidade in descartes.items() if quantidade)
+            self.atualizar_status(f"{len(aceitos)} CODs adicionados com prioridade." + (f" Ignorados: {ignorados}." if ignorados else ""))
+        except Exception as e:
+            logging.error(f"Erro ao importar CODs: {traceback.format_exc()}")
+            self.atualizar_status("Erro ao importar os CODs.")
+            self.ui.executar(messagebox.showerror, "Erro ao Importar", f"Não foi possível importar os CODs: {e}")
+        finally:
+            self._progresso(0)
+            self.ui.configurar(self.add_cod_button, state=tk.NORMAL)
+
+    def _assumir_chamada(self):
+        """ Operador e detecção disputam o resultado da chamada atual: só quem chega primeiro grava """
+        with self._lock_chamada:
+            pendente, self._chamada_pendente = self._chamada_pendente, False
+            return pendente
+
+    def _devolver_chamada(self):
+        with self._lock_chamada:
+            self._chamada_pendente = True
 
     def registrar_observacao(self):
+        if not self._assumir_chamada():
+            return
         obs = simpledialog.askstring("Observação", "Digite a observação da ligação:", parent=self.master)
         self.escrever_resultado(self.current_cod, self.current_phone, obs or "N/A")
         self.action_taken_event.set()
 
     def agendar_retorno(self):
+        if not self._assumir_chamada():
+            return
         dialog = AgendamentoDialog(self.master, "Agendar Retorno")
-        if dialog.result:
+        if not dialog.result:
+            self._devolver_chamada()
+        else:
             data, hora = dialog.result
-            nova_linha = [self.current_cod, self.current_phone, hora, data, 'aguardando']
+            nova_linha = [self.current_cod, self.current_phone, hora, data, STATUS_RETORNO_AGUARDANDO]
             self._escrever_em_planilha(ABA_RETORNOS, nova_linha)
+            self.agenda.agendar(self.current_cod, self.current_phone, data, hora)
+            if self.campanha:
+                try:
+                    self.campanha.registrar_retorno(nova_linha)
+                except Exception as e:
+                    logging.error(f"Erro ao registrar o retorno na campanha compartilhada: {e}")
             obs_agendamento = f"RETORNO AGENDADO para {data} às {hora}"
             self.escrever_resultado(self.current_cod, self.current_phone, obs_agendamento)
             self.action_taken_event.set()
 
     def escrever_resultado(self, cod, tel, obs):
-        agora = datetime.now()
-        linha = [str(cod), str(tel), agora.strftime("%H:%M:%S"), agora.strftime("%d/%m/%Y"), obs]
+        registrar_evento('resultado', str(cod), obs)
+        linha = linha_resultado(cod, tel, obs)
         self._escrever_em_planilha(ABA_RESULTADOS, linha)
-
-    def _escrever_em_planilha(self, nome_aba, dados_linha):
-        with self.excel_lock:
+        self.estado.registrar_resultado(str(cod))
+        if self.campanha:
             try:
-                wb = load_workbook(NOME_ARQUIVO_EXCEL)
-                sheet = wb[nome_aba]
-                sheet.append(dados_linha)
-                wb.save(NOME_ARQUIVO_EXCEL)
-                logging.info(f"Linha adicionada à aba '{nome_aba}' com sucesso.")
+                self.campanha.registrar_resultado(linha)
             except Exception as e:
-                logging.error(f"Erro ao escrever na planilha '{nome_aba}': {e}")
-                self.atualizar_status(f"Erro ao salvar na planilha!")
+                logging.error(f"Erro ao registrar o resultado do COD {cod} na campanha compartilhada: {e}")
+
+    def _escrever_em_planilha(self, nome_aba, dados_linha):
+        try:
+            with self.metricas.medir('escrita'):
+                self.escritor.anexar(nome_aba, dados_linha)
+            logging.info(f"Linha registrada para a aba '{nome_aba}'.")
+        except Exception as e:
+            logging.error(f"Erro ao registrar linha para a aba '{nome_aba}': {e}")
+            self.atualizar_status(f"Erro ao salvar na planilha!")
 
     def _atualizar_telefone_na_planilha(self, telefone, cod_alvo):
-        with self.excel_lock:
-            try:
-                wb = load_workbook(NOME_ARQUIVO_EXCEL)
-                sheet = wb[ABA_CONTATOS]
-                for row in range(2, sheet.max_row + 1):
-                    if str(sheet.cell(row, 1).value) == str(cod_alvo):
-                        sheet.cell(row, 2, value=telefone)
-                        break
-                wb.save(NOME_ARQUIVO_EXCEL)
-                logging.info(f"Telefone '{telefone}' atualizado para o COD {cod_alvo}.")
-            except Exception as e:
-                logging.error(f"Erro ao ATUALIZAR telefone na planilha: {e}")
+        try:
+            self.escritor.atualizar_telefone(cod_alvo, telefone)
+            if self.campanha:
+                self.campanha.atualizar_telefone(cod_alvo, telefone)
+        except Exception as e:
+            logging.error(f"Erro ao ATUALIZAR telefone na planilha: {e}")
     
     def _limpar_aba_excel(self, nome_aba):
-        with self.excel_lock:
-            try:
-                wb = load_workbook(NOME_ARQUIVO_EXCEL)
-                if nome_aba in wb.sheetnames:
-                    sheet = wb[nome_aba]
-                    if sheet.max_row > 1:
-                        sheet.delete_rows(2, sheet.max_row)
-                    wb.save(NOME_ARQUIVO_EXCEL)
-                    logging.info(f"Aba '{nome_aba}' limpa com sucesso.")
-            except Exception as e:
-                logging.error(f"Erro ao limpar a aba '{nome_aba}': {e}")
+        try:
+            self.escritor.limpar_aba(nome_aba)
+        except Exception as e:
+            logging.error(f"Erro ao limpar a aba '{nome_aba}': {e}")
 
     # --- LÓGICA PRINCIPAL DA AUTOMAÇÃO ---
     def setup_automacao(self):
+        with self.metricas.medir('setup'):
+            return self._setup_automacao()
+
+    def _setup_automacao(self):
         try:
             self.atualizar_status("Lendo configurações...")
             usuario, senha, url_weon = ler_login()
             
             self.atualizar_status("Abrindo o Chrome...")
-            chrome_options = webdriver.ChromeOptions()
-            prefs = {"profile.default_content_setting_values.notifications": 2, "profile.default_content_setting_values.media_stream_mic": 1}
-            chrome_options.add_experimental_option("prefs", prefs)
-            chrome_options.add_argument("--force-device-scale-factor=0.7")
-            
-            caminho_chromedriver = resource_path("chromedriver.exe")
-            service = ChromeService(executable_path=caminho_chromedriver)
-            
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            self.driver.get(url_weon)
-            
-            esperar_elemento(self.driver, By.NAME, "login").send_keys(usuario)
-            esperar_elemento(self.driver, By.ID, "password").send_keys(senha)
-            esperar_elemento_clickable(self.driver, By.XPATH, "//button[contains(., 'Acessar')]").click()
-            
-            self.atualizar_status("Login efetuado! Aguardando página carregar...")
-            esperar_elemento(self.driver, By.XPATH, '//input[@aria-label="Buscar contato"]', 30)
+            self.supervisor = SupervisorNavegador((usuario, senha, url_weon),
+                                                  perfil=self.config['perfil_chrome'] or None,
+                                                  headless=self.config['chrome_headless'],
+                                                  aguardar=self.ritmo.aguardar,
+                                                  max_tentativas=self.config['max_tentativas_reconexao'],
+                                                  notificar=self.atualizar_status,
+                                                  encerrado=lambda: not self.is_running)
+            self.supervisor.driver = self._obter_navegador()
+            conectou = self.supervisor.conectar(tentativas=3)
+            self.driver = self.supervisor.driver
+            if not conectou:
+                raise self.supervisor.ultimo_erro or SessaoPerdida("Não foi possível entrar no Weon")
+
+            try:
+                self.cliente_http = ClienteBuscaHTTP.a_partir_do_driver(self.driver, self.config, url_weon, self.driver_lock)
+            except Exception as e:
+                logging.error(f"Busca por HTTP indisponível, usando o Selenium. Detalhes: {e}")
+                self.cliente_http = None
+
+            if self.config['busca_antecipada']:
+                self.busca_antecipada = BuscaAntecipada((usuario, senha, url_weon), self._proximos_para_busca,
+                                                        profundidade=self.config['profundidade_busca'],
+                                                        cache=self.cache,
+                                                        buscar=self.cliente_http.buscar if self.cliente_http else None)
             return True
         except Exception as e:
             self.atualizar_status("Erro no setup inicial!")
             logging.critical("Erro crítico no setup: %s", traceback.format_exc())
-            messagebox.showerror("Erro Crítico no Setup", f"Ocorreu um erro: {e}")
+            self.ui.executar(messagebox.showerror, "Erro Crítico no Setup", f"Ocorreu um erro: {e}")
             self.is_running = False
             return False
 
     def buscar_contato_web(self, codigo_limpo_buscado):
-        with self.driver_lock:
+        with self.metricas.medir('busca', cod=codigo_limpo_buscado) as detalhes:
+            resultado = self._resolver_busca(codigo_limpo_buscado)
+            detalhes['resultado'] = resultado.situacao
+        self.metricas.contar('buscas')
+        if resultado.situacao == BUSCA_DIVERGENTE:
+            self.metricas.contar('divergencias')
+        elif resultado.situacao != BUSCA_ENCONTRADO:
+            self.metricas.contar('nao_encontrados')
+        return resultado
+
+    def _resolver_busca(self, codigo_limpo_buscado):
+        resultado = self.cache.obter(codigo_limpo_buscado)
+        self.ui.publicar(self.cache_var, self.cache.resumo())
+        if resultado:
+            logging.info(f"COD {codigo_limpo_buscado} resolvido pelo cache ({resultado.situacao}).")
+            return resultado
+
+        if self.busca_antecipada:
+            resultado = self.busca_antecipada.obter(codigo_limpo_buscado)
+            if resultado:
+                logging.info(f"Busca antecipada já tinha o resultado do COD {codigo_limpo_buscado}.")
+        if not resultado and self.cliente_http and self.cliente_http.ativo:
             try:
+                resultado = self.cliente_http.buscar(codigo_limpo_buscado)
+            except Exception as e:
+                logging.warning(f"Busca por HTTP falhou para {codigo_limpo_buscado}: {e}. Usando o Selenium.")
+        if not resultado:
+            with self.driver_lock:
                 self.atualizar_status(f"Buscando COD: {codigo_limpo_buscado}")
-                wait = WebDriverWait(self.driver, 15)
+                chamadas_antes = getattr(self.driver, 'chamadas_webdriver', 0)
+                resultado = buscar_contato(self.driver, codigo_limpo_buscado)
+                self.metricas.contar('buscas_selenium')
+                self.metricas.contar('chamadas_webdriver_busca', getattr(self.driver, 'chamadas_webdriver', 0) - chamadas_antes)
+                # Um Chrome caído ou deslogado também aparece como "não encontrado": não pode ir para o cache
+                if resultado.situacao in (BUSCA_ERRO, BUSCA_NAO_ENCONTRADO) and self.supervisor.situacao() != 'ok':
+                    raise SessaoPerdida(f"Navegador sem sessão ao buscar {codigo_limpo_buscado}")
+        self.cache.guardar(resultado)
+        return resultado
+
+    def _proximos_para_busca(self, quantidade):
+        """ Códigos limpos dos próximos CODs da fila que ainda vão precisar de busca na web """
+        codigos = []
+        for tarefa in self.fila.espiar(quantidade * 20):
+            cod = tarefa.cod
+            if not cod or tarefa.telefone or cod in self.contatados_anteriormente:
+                continue
+            codigo_limpo = limpar_codigo(cod)
+            if len(codigo_limpo) > 5 and codigo_limpo not in codigos:
+                codigos.append(codigo_limpo)
+                if len(codigos) >= quantidade:
+                    break
+        return codigos
+
+    def realizar_chamada(self, telefone, cod=None):
+        """ Disca e espera o botão de encerrar aparecer (o tempo medido na etapa 'discagem') """
+        with self.driver_lock, self.metricas.medir('discagem', cod=cod) as detalhes:
+            detalhes['resultado'] = 'erro'
+            try:
+                esperar_dialogo_fechar(self.driver)
+                self.ritmo.esperar('antes_discar')
+                self.atualizar_status(f"Discando para {telefone}...")
+                chamadas_antes = getattr(self.driver, 'chamadas_webdriver', 0)
+                discar(self.driver, telefone)
+                self.metricas.contar('discagens')
+                self.metricas.contar('chamadas_webdriver_discagem', getattr(self.driver, 'chamadas_webdriver', 0) - chamadas_antes)
+                detalhes['resultado'] = 'ok'
+                return True
+            except Exception as e:
+                logging.error(f"Falha ao tentar discar para {telefone}: {e}")
+                return False
+
+    def _aguardar_fim_da_chamada(self, cod, telefone):
+        """
+        Espera o operador; enquanto isso, lê o estado da chamada na página (um script a cada
+        0,5s) e, se ela não conectou, grava NAO ATENDEU/CAIU e segue sem o operador.
+        Devolve o resultado automático ou 'operador'.
+        """
+        detector = DetectorChamada(self.config['tempo_toque'], self.config['tempo_minimo_chamada'],
+                                   self.config['seletor_chamada_atendida']) if self.config['deteccao_chamada'] else None
+        inicio = time.monotonic()
+        while not self.action_taken_event.wait(0.5 if detector else None):
+            try:
+                with self.driver_lock:
+                    decisao = detector.avaliar(estado_chamada(self.driver, detector.seletor_atendida),
+                                               time.monotonic() - inicio)
+            except Exception as e:
+                # Sem leitura da página, a chamada fica com o operador
+                logging.warning(f"Detecção de chamada desligada para o COD {cod}: {e}")
+                detector = None
+                continue
+            if decisao is None:
+                if detector.com_operador:
+                    # Atendida (ou sem como saber): daqui em diante só o operador encerra
+                    detector = None
+                continue
+            detector = None
+            if not self._assumir_chamada():
+                continue   # O operador já está registrando esta chamada
+            obs, precisa_desligar = decisao
+            if precisa_desligar:
+                with self.driver_lock:
+                    try:
+                        desligar(self.driver)
+                    except Exception as e:
+                        logging.warning(f"Não foi possível desligar a chamada do COD {cod}: {e}")
+            self.escrever_resultado(cod, telefone, obs)
+            self.metricas.contar('sem_atendimento')
+            self.atualizar_status(f"{obs} ({telefone}). Indo para o próximo.")
+            return obs
+        return 'operador'
+
+    def _registrar_pulo(self, motivo, inicio_tarefa, cod):
+        """ Tempo de um COD que não chegou a ser discado (etapa 'pulo'), contado por motivo """
+        duracao = time.monotonic() - inicio_tarefa
+        self.metricas.registrar('pulo', duracao)
+        self.metricas.contar(motivo)
+        registrar_evento('pulo', cod, motivo, duracao)
+
+    def _processar_tarefa(self, tarefa_atual):
+        """ Um COD da fila: busca o telefone se preciso, disca e espera o operador (ou registra o motivo do pulo) """
+        cod_original = str(tarefa_atual.cod)
+        telefone_existente = str(tarefa_atual.telefone)
+        inicio_tarefa = time.monotonic()
+        
+        self.ui.publicar(self.contador_var, f"Contatos: {self.fila.processados}/{self.fila.total}")
+
+        if not cod_original: return
+
+        # Um retorno vencido é ligado mesmo que o COD já tenha resultado
+        retorno = self.agenda.pendente(cod_original)
+
+        if cod_original in self.contatados_anteriormente and not retorno:
+            self.atualizar_status(f"COD {cod_original} já contatado. Pulando.")
+            self._registrar_pulo('ja_contatados', inicio_tarefa, cod_original)
+            self.ritmo.esperar('ja_contatado')
+            return
+
+        if self.campanha and not retorno and not self.campanha.reservar_cod(cod_original, telefone_existente):
+            self.atualizar_status(f"COD {cod_original} está com outro operador ou já foi concluído. Pulando.")
+            self._registrar_pulo('com_outro_operador', inicio_tarefa, cod_original)
+            return
+
+        telefone_para_ligar = telefone_existente
+
+        if not telefone_para_ligar:
+            codigo_limpo = limpar_codigo(cod_original)
+            if len(codigo_limpo) > 5:
+                resultado_busca = self.buscar_contato_web(codigo_limpo)
+                telefone_encontrado = resultado_busca.telefone
                 
-                campo_pesquisa = wait.until(EC.presence_of_element_located((By.XPATH, '//input[@aria-label="Buscar contato"]')))
-                campo_pesquisa.clear()
-                campo_pesquisa.send_keys(codigo_limpo_buscado)
-                campo_pesquisa.send_keys(Keys.ENTER)
+                if resultado_busca.situacao == BUSCA_DIVERGENTE:
+                    obs = observacao_busca(resultado_busca)
+                    self.escrever_resultado(cod_original, '', obs)
+                    self.contatados_anteriormente.add(cod_original)
+                    self.atualizar_status(obs + ". Pulando.")
+                    self._registrar_pulo('pulos_divergencia', inicio_tarefa, cod_original)
+                    self.ritmo.esperar('apos_divergencia')
+                    return
+
+                if resultado_busca.situacao == BUSCA_ENCONTRADO:
+                    self.atualizar_status(f"Telefone encontrado: {telefone_encontrado}")
+                    self._atualizar_telefone_na_planilha(telefone_encontrado, cod_original)
+                    telefone_para_ligar = telefone_encontrado
+                else:
+                    self.escrever_resultado(cod_original, '', observacao_busca(resultado_busca))
+                    self.contatados_anteriormente.add(cod_original)
+                    self.atualizar_status(f"Telefone não encontrado para {cod_original}. Pulando.")
+                    self._registrar_pulo('pulos_nao_encontrado', inicio_tarefa, cod_original)
+                    self.ritmo.esperar('apos_nao_encontrado')
+                    return
+            else:
+                self.escrever_resultado(cod_original, '', OBS_CODIGO_INVALIDO)
+                self.contatados_anteriormente.add(cod_original)
+                self._registrar_pulo('invalidos', inicio_tarefa, cod_original)
+                return
+        
+        self.current_cod = cod_original
+        self.current_phone = telefone_para_ligar
+        self.ui.publicar(self.cod_var, f"COD: {self.current_cod}")
+        self.ui.publicar(self.fone_var, f"Fone: {self.current_phone or 'Não encontrado'}")
+        
+        if telefone_para_ligar:
+            if self.realizar_chamada(telefone_para_ligar, cod=cod_original):
+                self.metricas.contar('ligacoes')
+                if self._iniciado_em is not None:
+                    self._registrar_primeira_ligacao()
                 
-                seletor_cod = (By.XPATH, "//div[contains(@class, 'v-dialog--active')]//tbody/tr/td[1]")
-                seletor_telefone = (By.XPATH, "//div[contains(@class, 'v-dialog--active')]//tbody/tr/td[3]")
+                self.atualizar_status("Em chamada... Aguardando sua ação.")
+                self.ui.configurar(self.end_call_button, state=tk.NORMAL)
+                self.ui.configurar(self.schedule_button, state=tk.NORMAL)
                 
-                cod_elemento = wait.until(EC.text_to_be_present_in_element(seletor_cod, codigo_limpo_buscado))
+                self.action_taken_event.clear()
+                self._devolver_chamada()
+                with self.metricas.medir('operador', cod=cod_original) as detalhes:
+                    detalhes['resultado'] = self._aguardar_fim_da_chamada(cod_original, telefone_para_ligar)
+                # Fecha a disputa: um clique atrasado nos botões não grava nada
+                self._assumir_chamada()
                 
-                if not cod_elemento:
-                    logging.warning(f"Divergência ou timeout para COD {codigo_limpo_buscado}.")
-                    cod_encontrado_na_tela = self.driver.find_element(*seletor_cod).text
-                    return cod_encontrado_na_tela, None
-
-                telefone_elemento = self.driver.find_element(*seletor_telefone)
-                telefone_encontrado = telefone_elemento.text.strip()
-                cod_encontrado = self.driver.find_element(*seletor_cod).text.strip()
+                self.contatados_anteriormente.add(cod_original)
                 
-                if telefone_encontrado and telefone_encontrado != "-":
-                    webdriver.ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                    time.sleep(0.5)
-                    return cod_encontrado, telefone_encontrado
-                else:
-                    webdriver.ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                    time.sleep(0.5)
-                    return cod_encontrado, None
-
-            except TimeoutException:
-                logging.warning(f"Timeout buscando telefone para {codigo_limpo_buscado}. Nenhum resultado encontrado.")
-                try: 
-                    webdriver.ActionChains(self.driver).send_keys(Keys.ESCAPE).perform()
-                except: pass
-                return None, None
+                self.ui.configurar(self.end_call_button, state=tk.DISABLED)
+                self.ui.configurar(self.schedule_button, state=tk.DISABLED)
+            else:
+                if not self._sessao_ok():
+                    raise SessaoPerdida(f"Navegador sem sessão ao discar para {telefone_para_ligar}")
+                self.atualizar_status("Erro ao discar. Indo para o próximo.")
+                self.escrever_resultado(cod_original, telefone_para_ligar, "ERRO AO DISCAR")
+                self.contatados_anteriormente.add(cod_original)
+                self.metricas.contar('erros_discagem')
+                self.ritmo.esperar('apos_erro_discagem')
+        else:
+            self.atualizar_status(f"Nenhum telefone para {cod_original}. Pulando.")
+            self._registrar_pulo('sem_telefone', inicio_tarefa, cod_original)
+            self.ritmo.esperar('sem_telefone')
+
+    def _abrir_campanha(self):
+        """ Conecta à campanha compartilhada, acrescenta os CODs desta planilha e junta os contatados de todos """
+        if self.campanha is None:
+            self.campanha = CampanhaCompartilhada(self.config['campanha_compartilhada'],
+                                                  identificar_operador(self.config['nome_operador']),
+                                                  self.config['reserva_campanha_segundos'])
+        self.atualizar_status("Sincronizando com a campanha compartilhada...")
+        novos = self.campanha.importar(NOME_ARQUIVO_EXCEL, self.estado.marca_contatos())
+        if novos:
+            logging.info(f"{novos} CODs desta planilha acrescentados à campanha.")
+        self.contatados_anteriormente |= self.campanha.contatados()
+        self.campanha.iniciar_renovacao()
+        self.atualizar_status(self.campanha.resumo())
+
+    def _lista_do_plano(self):
+        """
+        Com a aba de contatos inalterada, a lista vem pronta do plano salvo (e os CODs inválidos
+        ganham o resultado de uma vez). Senão a aba é lida em segundo plano como sempre, e o
+        plano é compilado no fim da leitura para a próxima execução.
+        """
+        marca = self.estado.marca_contatos()
+        plano = PlanoExecucao.carregar(NOME_ARQUIVO_PLANO, marca)
+        if plano is None:
+            lista_contatos = ListaContatos()
+            threading.Thread(target=self._carregar_e_planejar, args=(lista_contatos, marca), daemon=True).start()
+            return lista_contatos
+        self.atualizar_status(f"Plano da execução reaproveitado: {plano.resumo()}.")
+        invalidos = [cod for cod in plano.invalidos if cod not in self.contatados_anteriormente]
+        if invalidos:
+            self.escritor.anexar_varias(ABA_RESULTADOS, [linha_resultado(cod, '', OBS_CODIGO_INVALIDO) for cod in invalidos])
+            self.estado.registrar_resultados(invalidos)
+            self.contatados_anteriormente.update(invalidos)
+            logging.info(f"{len(invalidos)} CODs inválidos registrados em lote.")
+        return plano.lista()
+
+    def _carregar_e_planejar(self, lista_contatos, marca):
+        lista_contatos.carregar(NOME_ARQUIVO_EXCEL)
+        if not lista_contatos.completa:
+            return
+        try:
+            inicio = time.monotonic()
+            plano = PlanoExecucao.compilar(lista_contatos.cods, lista_contatos.telefones,
+                                           frozenset(self.contatados_anteriormente))
+            plano.salvar(NOME_ARQUIVO_PLANO, marca)
+            logging.info(f"Plano da execução compilado em {time.monotonic() - inicio:.2f}s: {plano.resumo()}.")
+        except Exception as e:
+            logging.warning(f"Não foi possível compilar o plano da execução: {e}")
+
+    def _injetar_retornos(self):
+        """ Passa para a fila (à frente da lista principal) os retornos que já venceram """
+        vencidos = self.agenda.vencidos()
+        if vencidos:
+            tarefas = [Tarefa(retorno.cod, retorno.telefone, PRIORIDADE_RETORNO) for retorno in vencidos]
+            self.fila.adicionar(tarefas, PRIORIDADE_RETORNO, forcar=True)
+            self.atualizar_status(f"{len(vencidos)} retorno(s) agendado(s) entraram na fila.")
+
+    def _concluir_retorno(self, cod):
+        """ Marca como concluídos os retornos do COD que acabou de ser processado """
+        retornos = self.agenda.concluir(cod)
+        if not retornos:
+            return
+        chaves = [retorno.chave_planilha for retorno in retornos]
+        self.escritor.atualizar_status_retornos(chaves, STATUS_RETORNO_CONCLUIDO)
+        if self.campanha:
+            try:
+                self.campanha.atualizar_status_retornos(chaves, STATUS_RETORNO_CONCLUIDO)
             except Exception as e:
-                logging.error(f"Erro inesperado ao buscar {codigo_limpo_buscado}. Detalhes: {e}")
-                return None, None
+                logging.error(f"Erro ao atualizar os retornos do COD {cod} na campanha compartilhada: {e}")
+
+    def _aguardar_retorno(self):
+        """ Lista acabou: se ainda há retorno para hoje, espera por ele (True) em vez de encerrar """
+        vencimento = self.agenda.proximo_vencimento()
+        agora = datetime.now()
+        if vencimento is None or vencimento.date() != agora.date():
+            return False
+        self.atualizar_status(f"Lista concluída. Próximo retorno às {vencimento:%H:%M}.")
+        self.ritmo.aguardar(min(60.0, max(0.0, (vencimento - agora).total_seconds())))
+        return True
 
-    def realizar_chamada(self, telefone):
+    def _sessao_ok(self):
         with self.driver_lock:
+            return self.supervisor.situacao() == 'ok'
+
+    def _recuperar_sessao(self, tarefa, erro):
+        """ Devolve o COD em andamento para o início da fila e recupera o Chrome/login sem parar a execução """
+        logging.warning(f"Problema no navegador durante o COD {tarefa.cod}: {erro}")
+        self.fila.adicionar([tarefa], PRIORIDADE_MANUAL, forcar=True)
+        if not self.is_running:
+            # A janela foi fechada (o Chrome caiu por isso): o COD fica na fila de retomada, sem reconectar
+            return
+        self.metricas.contar('quedas_sessao')
+        self.atualizar_status("Conexão com o Weon perdida. Reconectando...")
+        with self.driver_lock, self.metricas.medir('recuperacao', cod=str(tarefa.cod)) as detalhes:
+            recuperou = self.supervisor.recuperar()
+            self.driver = self.supervisor.driver
+            detalhes['resultado'] = 'ok' if recuperou else 'falhou'
+            detalhes['erro'] = str(erro)
+        if not recuperou:
+            if not self.is_running:
+                return
+            raise SessaoPerdida(f"Não foi possível reconectar ao Weon: {self.supervisor.ultimo_erro}")
+        if self.cliente_http:
             try:
-                time.sleep(1)
-                self.atualizar_status(f"Discando para {telefone}...")
-                botao_discador = esperar_elemento_clickable(self.driver, By.XPATH, "//button[.//i[contains(@class, 'mdi-rocket-launch')]]", 30)
-                if not botao_discador: raise Exception("Botão de discador não encontrado")
-                botao_discador.click()
-                campo_telefone = esperar_elemento(self.driver, By.XPATH, "//input[@type='text' and @placeholder='Telefone']")
-                if not campo_telefone: raise Exception("Campo de telefone não encontrado")
-                campo_telefone.clear()
-                campo_telefone.send_keys(str(telefone))
-                botao_ligar = esperar_elemento_clickable(self.driver, By.XPATH, "//span[contains(@class, 'white--text') and text()='Acionar']")
-                if not botao_ligar: raise Exception("Botão 'Acionar' não encontrado")
-                botao_ligar.click()
-                esperar_elemento(self.driver, By.XPATH, SELETOR_BOTAO_ENCERRAR_CHAMADA, 30)
-                return True
+                self.cliente_http.renovar_sessao(self.driver, self.driver_lock)
             except Exception as e:
-                logging.error(f"Falha ao tentar discar para {telefone}: {e}")
-                return False
+                logging.warning(f"Busca por HTTP não acompanhou a nova sessão: {e}")
+        self.atualizar_status(f"Conexão recuperada. Continuando pelo COD {tarefa.cod}.")
 
     def loop_principal_automacao(self):
-        if not self.setup_automacao():
-            self.on_closing()
-            return
-
         try:
+            carregar_modulos_pesados()
+            if not self.setup_automacao():
+                return
+
             self.atualizar_status("Verificando contatos já realizados...")
-            try:
-                df_resultados = pd.read_excel(NOME_ARQUIVO_EXCEL, sheet_name=ABA_RESULTADOS)
-                contatados_anteriormente = set(df_resultados['COD'].astype(str).unique())
-                self.atualizar_status(f"{len(contatados_anteriormente)} contatos já estão nos resultados.")
-            except Exception as e:
-                logging.warning(f"Não foi possível ler a aba de resultados: {e}")
-                contatados_anteriormente = set()
+            self.escritor.descarregar()
+            self.contatados_anteriormente = self.estado.carregar_contatados(NOME_ARQUIVO_EXCEL, self.escritor)
+            self.atualizar_status(f"{len(self.contatados_anteriormente)} contatos já estão nos resultados.")
+            if self.config['campanha_compartilhada']:
+                self._abrir_campanha()
+
+            if not self.agenda.carregada:
+                try:
+                    self.atualizar_status("Lendo os retornos agendados...")
+                    self.atualizar_status(f"{self.agenda.carregar(NOME_ARQUIVO_EXCEL, self.escritor)} retornos aguardando.")
+                except Exception as e:
+                    logging.warning(f"Não foi possível ler a aba de retornos: {e}")
+
+            em_andamento, fila_salva, posicao_salva = self.estado.ler_retomada()
+            if em_andamento and em_andamento.cod not in self.contatados_anteriormente:
+                self.fila.adicionar([em_andamento], PRIORIDADE_MANUAL)
+            for tarefa in fila_salva:
+                self.fila.adicionar([tarefa], tarefa.nivel)
+            if em_andamento or fila_salva:
+                self.atualizar_status(f"Retomando a execução anterior ({self.fila.pendentes} CODs na fila de prioridade).")
             
             try:
                 self.atualizar_status("Lendo a aba de Prioridade...")
@@ -458,118 +3444,279 @@ class AutomacaoGUI:
                 cods_prioritarios = df_prioridade['COD'].tolist()
                 
                 if cods_prioritarios:
-                    tarefas_prioritarias = [{'COD': cod, 'TELEFONE': ''} for cod in cods_prioritarios]
-                    with self.list_lock:
-                        self.priority_queue.extend(tarefas_prioritarias)
+                    tarefas_prioritarias = [Tarefa(cod, '', PRIORIDADE_PLANILHA) for cod in cods_prioritarios]
+                    self.fila.adicionar(tarefas_prioritarias, PRIORIDADE_PLANILHA)
                     self.atualizar_status(f"{len(cods_prioritarios)} CODs carregados da aba Prioridade.")
                     self._limpar_aba_excel(ABA_PRIORIDADE)
             except Exception as e:
                 logging.warning(f"Não foi possível ler a aba de Prioridade: {e}")
 
-            contatos_df = pd.read_excel(NOME_ARQUIVO_EXCEL, sheet_name=ABA_CONTATOS, dtype=str).fillna('')
-            lista_de_tarefas = [row.to_dict() for index, row in contatos_df.iterrows()]
+            self.atualizar_status("Carregando a lista de contatos...")
+            if self.campanha:
+                # A posição salva não vale aqui: a ordem vem das reservas na campanha
+                self.fila.definir_lista(ListaCompartilhada(self.campanha, self.config['lote_campanha'], self.ritmo.aguardar))
+            else:
+                self.fila.definir_lista(self._lista_do_plano(), retomar_apos=posicao_salva)
             
-            indice_atual = 0
-            while self.is_running and (indice_atual < len(lista_de_tarefas) or self.priority_queue):
-                while self.is_paused: time.sleep(0.5)
+            while self.is_running:
+                self.ritmo.aguardar_liberacao()
                 if not self.is_running: break
 
-                tarefa_atual = None
-                
-                with self.list_lock:
-                    if self.priority_queue:
-                        tarefa_atual = self.priority_queue.pop(0)
-
-                if not tarefa_atual:
-                    tarefa_atual = lista_de_tarefas[indice_atual]
-                    indice_atual += 1
-
-                cod_original = str(tarefa_atual.get('COD', ''))
-                telefone_existente = str(tarefa_atual.get('TELEFONE', ''))
-                
-                total_na_fila = len(lista_de_tarefas) + len(self.priority_queue)
-                self.contador_var.set(f"Contatos: {indice_atual}/{total_na_fila}")
-                self.master.update_idletasks()
+                self._injetar_retornos()
+                tarefa_atual = self.fila.proxima()
+                if tarefa_atual is None:
+                    if self._aguardar_retorno():
+                        continue
+                    self.estado.limpar_retomada()
+                    break
+                self.estado.salvar_retomada(tarefa_atual, self.fila)
 
-                if not cod_original: continue
+                if self.busca_antecipada:
+                    self.busca_antecipada.avisar()
 
-                if cod_original in contatados_anteriormente:
-                    self.atualizar_status(f"COD {cod_original} já contatado. Pulando.")
-                    time.sleep(1)
-                    continue
+                try:
+                    self._processar_tarefa(tarefa_atual)
+                    self._concluir_retorno(tarefa_atual.cod)
+                    if self.campanha:
+                        self.campanha.concluir(tarefa_atual.cod)
+                except Exception as e:
+                    if not isinstance(e, SessaoPerdida) and self._sessao_ok():
+                        raise
+                    self._recuperar_sessao(tarefa_atual, e)
 
-                telefone_para_ligar = telefone_existente
-
-                if not telefone_para_ligar:
-                    codigo_limpo = limpar_codigo(cod_original)
-                    if len(codigo_limpo) > 5:
-                        cod_encontrado, telefone_encontrado = self.buscar_contato_web(codigo_limpo)
-                        
-                        if cod_encontrado and (limpar_codigo(cod_encontrado) != codigo_limpo):
-                            obs = f"DIVERGÊNCIA: Buscou {codigo_limpo}, encontrou {cod_encontrado}"
-                            self.escrever_resultado(cod_original, '', obs)
-                            contatados_anteriormente.add(cod_original)
-                            self.atualizar_status(obs + ". Pulando.")
-                            time.sleep(2)
-                            continue
-
-                        if telefone_encontrado:
-                            self.atualizar_status(f"Telefone encontrado: {telefone_encontrado}")
-                            self._atualizar_telefone_na_planilha(telefone_encontrado, cod_original)
-                            telefone_para_ligar = telefone_encontrado
-                        else:
-                            self.escrever_resultado(cod_original, '', 'TELEFONE NÃO ENCONTRADO')
-                            contatados_anteriormente.add(cod_original)
-                            self.atualizar_status(f"Telefone não encontrado para {cod_original}. Pulando.")
-                            time.sleep(2)
-                            continue
-                    else:
-                        self.escrever_resultado(cod_original, '', 'CÓDIGO/CNPJ INVÁLIDO')
-                        contatados_anteriormente.add(cod_original)
-                        continue
-                
-                self.current_cod = cod_original
-                self.current_phone = telefone_para_ligar
-                self.cod_var.set(f"COD: {self.current_cod}")
-                self.fone_var.set(f"Fone: {self.current_phone or 'Não encontrado'}")
-                self.master.update_idletasks()
-                
-                if telefone_para_ligar:
-                    if self.realizar_chamada(telefone_para_ligar):
-                        
-                        self.atualizar_status("Em chamada... Aguardando sua ação.")
-                        self.master.after(0, self.end_call_button.config, {'state': tk.NORMAL})
-                        self.master.after(0, self.schedule_button.config, {'state': tk.NORMAL})
-                        
-                        self.action_taken_event.clear()
-                        self.action_taken_event.wait()
-                        
-                        contatados_anteriormente.add(cod_original)
-                        
-                        self.master.after(0, self.end_call_button.config, {'state': tk.DISABLED})
-                        self.master.after(0, self.schedule_button.config, {'state': tk.DISABLED})
-                    else:
-                        self.atualizar_status("Erro ao discar. Próximo em 5s.")
-                        self.escrever_resultado(cod_original, telefone_para_ligar, "ERRO AO DISCAR")
-                        contatados_anteriormente.add(cod_original)
-                        time.sleep(5)
-                else:
-                    self.atualizar_status(f"Nenhum telefone para {cod_original}. Pulando.")
-                    time.sleep(2)
 
         except Exception as e:
             logging.error(f"Erro no loop principal: {traceback.format_exc()}")
-            messagebox.showerror("Erro no Loop", f"Ocorreu um erro inesperado: {e}")
+            self.ui.executar(messagebox.showerror, "Erro no Loop", f"Ocorreu um erro inesperado: {e}")
         finally:
             self.atualizar_status("Automação finalizada.")
+            logging.info(self.cache.resumo())
+            self.escritor.descarregar()
+            self.salvar_metricas()
+            if self.campanha:
+                self.campanha.encerrar()
+                logging.info(self.campanha.resumo())
+            if self.busca_antecipada:
+                self.busca_antecipada.encerrar()
+                self.busca_antecipada = None
+            if self.ritmo.encerrado and self.supervisor and self.supervisor.driver:
+                # Janela fechada: um Chrome aberto por uma reconexão no meio do fechamento não fica órfão
+                try: self.supervisor.driver.quit()
+                except Exception: pass
+            self.cliente_http = None
             self.is_running = False
             self.is_paused = False
-            self.start_button.config(text="Iniciar", state=tk.NORMAL)
-            self.pause_button.config(text="Pausar", state=tk.DISABLED)
-            self.add_cod_button.config(state=tk.NORMAL)
+            self.ui.configurar(self.start_button, text="Iniciar", state=tk.NORMAL)
+            self.ui.configurar(self.pause_button, text="Pausar", state=tk.DISABLED)
+            self.ui.configurar(self.add_cod_button, state=tk.NORMAL)
+
+# --- ENRIQUECIMENTO EM LOTE (SEM INTERFACE) ---
+def _informar(mensagem):
+    if sys.stdout:   # No .exe com --windowed não há console
+        print(mensagem, flush=True)
+    logging.info(mensagem)
+
+def enriquecer_telefones(quantidade_workers=4):
+    """
+    Preenche os telefones da aba de contatos sem discar: N Chromes headless, cada um com
+    seu login, dividem a fila de CODs sem telefone. Telefones, divergências e não encontrados
+    são gravados em lotes (lote_enriquecimento) pelo EscritorPlanilha.
+    """
+    carregar_modulos_pesados()
+    config = ler_configuracoes()
+    ajustar_log(config)
+    credenciais = ler_login()
+    escritor = EscritorPlanilha(NOME_ARQUIVO_EXCEL, NOME_ARQUIVO_DIARIO, threading.Lock(),
+                                lote_maximo=config['lote_enriquecimento'],
+                                intervalo_maximo=config['intervalo_escrita'])
+    cache = CacheTelefones(NOME_ARQUIVO_CACHE,
+                           validade_horas=config['cache_validade_horas'],
+                           validade_negativa_horas=config['cache_validade_negativa_horas'],
+                           max_entradas=config['cache_max_entradas'])
+    estado = EstadoExecucao(NOME_ARQUIVO_ESTADO)
+    escritor.ao_gravar.append(estado.registrar_impressao)
+    escritor.ao_anexar.append(ResumoResultados(NOME_ARQUIVO_RESUMO).registrar_anexo)
+    escritor.descarregar()
+    contatados = estado.carregar_contatados(NOME_ARQUIVO_EXCEL, escritor)
+
+    cods_por_codigo = {}
+    for cod, telefone in iterar_contatos(NOME_ARQUIVO_EXCEL):
+        if telefone or not cod or cod in contatados:
+            continue
+        codigo_limpo = limpar_codigo(cod)
+        if len(codigo_limpo) > 5:
+            cods_por_codigo.setdefault(codigo_limpo, []).append(cod)
+    _informar(f"{len(cods_por_codigo)} códigos sem telefone para buscar com {quantidade_workers} navegadores.")
+
+    lock_gravacao = threading.Lock()
+    contagem = {'buscas': 0, 'encontrados': 0, 'divergentes': 0, 'nao_encontrados': 0, 'erros': 0}
+    inicio = time.monotonic()
+
+    def gravar(resultado, veio_do_cache=False):
+        with lock_gravacao:
+            chave = {BUSCA_ENCONTRADO: 'encontrados', BUSCA_DIVERGENTE: 'divergentes',
+                     BUSCA_NAO_ENCONTRADO: 'nao_encontrados', BUSCA_ERRO: 'erros'}[resultado.situacao]
+            contagem[chave] += 1
+            if resultado.situacao == BUSCA_ERRO:
+                # Fica sem resultado para ser buscado de novo numa próxima rodada
+                return
+            if not veio_do_cache:
+                cache.guardar(resultado)
+            for cod in cods_por_codigo[resultado.codigo_buscado]:
+                if resultado.situacao == BUSCA_ENCONTRADO:
+                    escritor.atualizar_telefone(cod, resultado.telefone)
+                else:
+                    escritor.anexar(ABA_RESULTADOS, linha_resultado(cod, '', observacao_busca(resultado)))
+                    estado.registrar_resultado(cod)
+
+    fila_codigos = queue.Queue()
+    for codigo_limpo in cods_por_codigo:
+        resultado = cache.obter(codigo_limpo)
+        if resultado:
+            gravar(resultado, veio_do_cache=True)
+        else:
+            fila_codigos.put(codigo_limpo)
+    _informar(f"{cache.acertos} resolvidos pelo cache; {fila_codigos.qsize()} vão para a web.")
+
+    def abrir_sessao():
+        supervisor = SupervisorNavegador(credenciais, max_tentativas=3, headless=True)
+        if not supervisor.conectar():
+            raise SessaoPerdida(f"Não foi possível abrir o Weon: {supervisor.ultimo_erro}")
+        return supervisor
+
+    def buscar_supervisionado(supervisor, codigo_limpo):
+        """
+        buscar_contato, mas erro ou não encontrado com o Chrome fora da página principal (sessão
+        expirada, driver morto) não vira resultado: a sessão é refeita e devolve None.
+        """
+        resultado = buscar_contato(supervisor.driver, codigo_limpo)
+        if resultado.situacao in (BUSCA_ERRO, BUSCA_NAO_ENCONTRADO) and supervisor.situacao() != 'ok':
+            if not supervisor.recuperar():
+                raise SessaoPerdida(f"Não foi possível reconectar ao Weon: {supervisor.ultimo_erro}")
+            return None
+        return resultado
+
+    # Com a API configurada, um único Chrome faz o login e os workers só fazem requisições HTTP
+    cliente_http, supervisor_reserva, lock_reserva = None, None, threading.Lock()
+    if config['api_busca_url'] and not fila_codigos.empty():
+        try:
+            supervisor_reserva = abrir_sessao()
+            config_http = dict(config, api_max_conexoes=max(config['api_max_conexoes'], quantidade_workers))
+            cliente_http = ClienteBuscaHTTP.a_partir_do_driver(supervisor_reserva.driver, config_http, credenciais[2], lock_reserva)
+        except Exception as e:
+            logging.error(f"Busca por HTTP indisponível, usando um Chrome por worker. Detalhes: {e}")
+
+    def buscar_com_reserva(codigo_limpo):
+        if cliente_http.ativo:
+            try:
+                return cliente_http.buscar(codigo_limpo)
+            except Exception as e:
+                logging.warning(f"Busca por HTTP falhou para {codigo_limpo}: {e}. Usando o Selenium.")
+        with lock_reserva:
+            resultado = buscar_supervisionado(supervisor_reserva, codigo_limpo)
+        if resultado is None:
+            # O Chrome de reserva pode ter sido recriado: a busca por HTTP passa a usar os cookies dele
+            try:
+                cliente_http.renovar_sessao(supervisor_reserva.driver, lock_reserva)
+            except Exception as e:
+                logging.warning(f"Busca por HTTP não acompanhou a nova sessão: {e}")
+        return resultado
+
+    def trabalhar(numero):
+        supervisor = None
+        try:
+            if cliente_http:
+                buscar = buscar_com_reserva
+            else:
+                supervisor = abrir_sessao()
+                buscar = lambda codigo_limpo: buscar_supervisionado(supervisor, codigo_limpo)
+            while True:
+                try:
+                    codigo_limpo = fila_codigos.get_nowait()
+                except queue.Empty:
+                    return
+                resultado = buscar(codigo_limpo)
+                if resultado is None:
+                    # Sessão refeita: o código volta para a fila em vez de virar NÃO ENCONTRADO
+                    fila_codigos.put(codigo_limpo)
+                    continue
+                gravar(resultado)
+                with lock_gravacao:
+                    contagem['buscas'] += 1
+                    feitas = contagem['buscas']
+                if feitas % 50 == 0:
+                    minutos = (time.monotonic() - inicio) / 60
+                    _informar(f"{feitas} buscas na web ({feitas / minutos:.1f}/min), {fila_codigos.qsize()} restantes.")
+        except Exception as e:
+            logging.error(f"Worker {numero} parou: {e}")
+        finally:
+            if supervisor and supervisor.driver:
+                try: supervisor.driver.quit()
+                except Exception: pass
+
+    threads = [threading.Thread(target=trabalhar, args=(n,), daemon=True) for n in range(max(1, quantidade_workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if supervisor_reserva and supervisor_reserva.driver:
+        try: supervisor_reserva.driver.quit()
+        except Exception: pass
+
+    escritor.encerrar()
+    if contagem['encontrados']:
+        # Telefones novos na aba de contatos: o plano salvo da execução deixa de valer
+        estado.registrar_mudanca_contatos()
+    minutos = max((time.monotonic() - inicio) / 60, 1e-9)
+    _informar(f"Enriquecimento concluído em {minutos:.1f} min: {contagem['buscas']} buscas na web "
+              f"({contagem['buscas'] / minutos:.1f}/min), {contagem['encontrados']} telefones encontrados, "
+              f"{contagem['divergentes']} divergências, {contagem['nao_encontrados']} não encontrados, "
+              f"{contagem['erros']} erros, {cache.acertos} resolvidos pelo cache.")
+    if not fila_codigos.empty():
+        _informar(f"{fila_codigos.qsize()} códigos ficaram sem busca (nenhum navegador disponível).")
+
 
 # --- PONTO DE ENTRADA DO PROGRAMA ---
+def ler_argumentos():
+    parser = argparse.ArgumentParser(description="Automação de chamadas do Weon.")
+    parser.add_argument("--enriquecer", action="store_true",
+                        help="Só preenche os telefones da aba de contatos (sem interface e sem discar)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Quantidade de Chromes headless no modo --enriquecer (padrão: 4)")
+    parser.add_argument("--exportar-campanha", metavar="ARQUIVO.xlsx",
+                        help="Grava os resultados e retornos de todos os operadores da campanha compartilhada e sai")
+    parser.add_argument("--exportar-resumo", metavar="ARQUIVO.xlsx",
+                        help="Grava as contagens de resultados por dia e por hora e sai")
+    parser.add_argument("--reconstruir-resumo", action="store_true",
+                        help="Recalcula as contagens a partir da aba de resultados (antes de exportar, se combinado)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    argumentos = ler_argumentos()
+    if argumentos.enriquecer:
+        enriquecer_telefones(argumentos.workers)
+        sys.exit(0)
+    if argumentos.exportar_campanha:
+        caminho_campanha = ler_configuracoes()['campanha_compartilhada']
+        if not caminho_campanha:
+            sys.exit(f"Informe campanha_compartilhada no {NOME_ARQUIVO_CONFIG}.")
+        campanha = CampanhaCompartilhada(caminho_campanha, identificar_operador())
+        campanha.exportar(argumentos.exportar_campanha)
+        print(f"{campanha.resumo()}. Resultados gravados em {argumentos.exportar_campanha}.")
+        sys.exit(0)
+
+    if argumentos.reconstruir_resumo or argumentos.exportar_resumo:
+        resumo = ResumoResultados(NOME_ARQUIVO_RESUMO)
+        if argumentos.reconstruir_resumo:
+            escritor = EscritorPlanilha(NOME_ARQUIVO_EXCEL, NOME_ARQUIVO_DIARIO, threading.Lock())
+            try:
+                print(f"Resumo reconstruído com {resumo.reconstruir(NOME_ARQUIVO_EXCEL, escritor)} resultados.")
+            finally:
+                escritor.encerrar()
+        if argumentos.exportar_resumo:
+            print(f"Resumo de {resumo.exportar(argumentos.exportar_resumo)} dia(s) gravado em {argumentos.exportar_resumo}.")
+        sys.exit(0)
+
     verificar_ou_criar_login()
     verificar_ou_criar_planilha()
     root = tk.Tk()
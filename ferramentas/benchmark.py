@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de ponta a ponta do loop_principal_automacao contra o Weon falso, com uma
+planilha sintética e um operador automático. Mede contatos por minuto, o tempo de cada
+etapa (as mesmas métricas da seção "Desempenho") e o pico de memória do processo Python.
+
+Uso:
+    python ferramentas/benchmark.py --linhas 1000 --limite 200 --headless --chromedriver ./chromedriver
+    python ferramentas/benchmark.py --linhas 50000 --limite 500 --saida novo.json --comparar antigo.json
+
+Cada execução roda numa pasta própria (temporária, ou --pasta), com login.txt e config.txt
+gerados, então não mexe na planilha nem no estado do uso normal.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tkinter as tk
+from datetime import datetime
+
+from gerar_planilha import gerar_planilha
+from weon_falso import iniciar_servidor
+
+PASTA_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class OperadorAutomatico(threading.Event):
+    """
+    Toma o lugar do action_taken_event: quando o loop para esperando o operador, registra
+    uma observação depois de `tempo` segundos e dispara o evento, como o botão "Registrar Obs.".
+    """
+    def __init__(self, app, tempo=0.0):
+        super().__init__()
+        self.app = app
+        self.tempo = tempo
+        self.atendimentos = 0
+
+    def wait(self, timeout=None):
+        if not self.is_set() and self.app.is_running:
+            if self.tempo > 0:
+                time.sleep(self.tempo)
+            self.app.escrever_resultado(self.app.current_cod, self.app.current_phone, "BENCHMARK")
+            self.atendimentos += 1
+            self.set()
+        return super().wait(timeout)
+
+
+def pico_memoria_mb():
+    """ Pico de memória residente do processo (sem os Chromes), ou None se não der para medir """
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KB, macOS em bytes
+        return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def preparar_pasta(pasta, argumentos, url):
+    gerar_planilha(os.path.join(pasta, "automacao_weon.xlsx"), argumentos.linhas,
+                   argumentos.com_telefone, argumentos.sem_ausentes)
+    with open(os.path.join(pasta, "login.txt"), "w", encoding="utf-8") as f:
+        f.write(f"Usuário=benchmark\nSenha=benchmark\nURL={url}\n")
+    with open(os.path.join(pasta, "config.txt"), "w", encoding="utf-8") as f:
+        f.write(f"busca_antecipada={1 if argumentos.busca_antecipada else 0}\n")
+        f.write("atraso_apos_erro_discagem=0\n")
+        f.write("intervalo_metricas=5\n")
+        f.write(f"chrome_headless={1 if argumentos.headless else 0}\n")
+        if argumentos.http:
+            f.write("api_busca_url=/api/contatos?busca={codigo}\n")
+    if argumentos.chromedriver:
+        shutil.copy(argumentos.chromedriver, os.path.join(pasta, "chromedriver.exe"))
+
+
+def executar(argumentos):
+    pasta = argumentos.pasta or tempfile.mkdtemp(prefix="benchmark_weon_")
+    os.makedirs(pasta, exist_ok=True)
+    servidor = iniciar_servidor(argumentos.porta, argumentos.latencia_busca, argumentos.latencia_chamada,
+                                argumentos.latencia_login, argumentos.latencia_fechar)
+    print(f"Pasta do benchmark: {pasta}")
+    preparar_pasta(pasta, argumentos, f"http://127.0.0.1:{argumentos.porta}/")
+
+    # O programa usa caminhos relativos à pasta atual (planilha, log, diário, estado)
+    os.chdir(pasta)
+    sys.path.insert(0, PASTA_RAIZ)
+    import automacao_completa as automacao
+
+    root = tk.Tk()
+    root.withdraw()
+    app = automacao.AutomacaoGUI(root)
+    operador = OperadorAutomatico(app, argumentos.tempo_operador)
+    app.action_taken_event = operador
+    medicao = {}
+
+    def acompanhar():
+        while app.automation_thread is None:
+            time.sleep(0.05)
+        while app.automation_thread.is_alive():
+            if argumentos.limite and app.fila.processados >= argumentos.limite and app.is_running:
+                app.is_running = False
+                app.ritmo.encerrar()
+            time.sleep(0.1)
+        medicao['fim'] = time.monotonic()
+        app.ui.executar(root.quit)
+
+    medicao['inicio'] = time.monotonic()
+    root.after(0, app.iniciar_automacao)
+    threading.Thread(target=acompanhar, daemon=True).start()
+    root.mainloop()
+
+    app.escritor.encerrar()
+    if app.driver:
+        try:
+            app.driver.quit()
+        except Exception:
+            pass
+    root.destroy()
+    servidor.shutdown()
+
+    metricas = app.metricas.resumo()
+    duracao = medicao['fim'] - medicao['inicio']
+    setup = metricas['etapas'].get('setup', {}).get('max', 0.0)
+    processados = app.fila.processados
+    tempo_loop = max(duracao - setup, 1e-9)
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'parametros': {chave: valor for chave, valor in vars(argumentos).items() if chave not in ('saida', 'comparar')},
+        'processados': processados,
+        'ligacoes': operador.atendimentos,
+        'duracao_s': round(duracao, 2),
+        'setup_s': round(setup, 2),
+        'contatos_por_minuto': round(processados * 60.0 / tempo_loop, 1),
+        'pico_memoria_mb': pico_memoria_mb(),
+        'metricas': metricas,
+    }
+
+
+def imprimir_relatorio(relatorio, anterior=None):
+    def comparar(atual, antigo):
+        if antigo in (None, 0) or atual is None:
+            return ""
+        return f"  ({(atual - antigo) / antigo:+.0%})"
+
+    antigo = anterior or {}
+    print(f"Contatos processados: {relatorio['processados']} ({relatorio['ligacoes']} ligações) "
+          f"em {relatorio['duracao_s']}s, setup {relatorio['setup_s']}s")
+    print(f"Contatos por minuto: {relatorio['contatos_por_minuto']}"
+          + comparar(relatorio['contatos_por_minuto'], antigo.get('contatos_por_minuto')))
+    print(f"Pico de memória (Python): {relatorio['pico_memoria_mb']} MB"
+          + comparar(relatorio['pico_memoria_mb'], antigo.get('pico_memoria_mb')))
+    metricas_antigas = antigo.get('metricas', {})
+    for chave in ('webdriver_por_busca', 'webdriver_por_discagem'):
+        if relatorio['metricas'].get(chave) is not None:
+            print(f"Chamadas WebDriver {chave[len('webdriver_'):].replace('_', ' ')}: {relatorio['metricas'][chave]}"
+                  + comparar(relatorio['metricas'][chave], metricas_antigas.get(chave)))
+    marcos_antigos = antigo.get('metricas', {}).get('marcos', {})
+    for marco, segundos in sorted(relatorio['metricas'].get('marcos', {}).items()):
+        print(f"  {marco:<30} {segundos:.2f}s" + comparar(segundos, marcos_antigos.get(marco)))
+    etapas_antigas = antigo.get('metricas', {}).get('etapas', {})
+    for etapa, dados in sorted(relatorio['metricas']['etapas'].items()):
+        print(f"  {etapa:<18} n={dados['n']:<5} p50 {dados['p50']:.3f}s  p95 {dados['p95']:.3f}s  máx {dados['max']:.3f}s"
+              + comparar(dados['p50'], etapas_antigas.get(etapa, {}).get('p50')))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do loop de ligações contra o Weon falso.")
+    parser.add_argument("--linhas", type=int, default=1000, help="Contatos na planilha gerada (ex.: 1000, 50000, 300000)")
+    parser.add_argument("--limite", type=int, default=0, help="Encerra depois de processar N contatos (0 = a planilha toda)")
+    parser.add_argument("--com-telefone", type=float, default=0.0, help="Fração de CODs que já têm telefone")
+    parser.add_argument("--sem-ausentes", action="store_true", help="Sem CODs inexistentes (que esperam o timeout da busca)")
+    parser.add_argument("--tempo-operador", type=float, default=0.0, help="Segundos que o operador leva em cada ligação")
+    parser.add_argument("--latencia-busca", type=float, default=0.3)
+    parser.add_argument("--latencia-chamada", type=float, default=1.0)
+    parser.add_argument("--latencia-login", type=float, default=0.5)
+    parser.add_argument("--latencia-fechar", type=float, default=0.1)
+    parser.add_argument("--busca-antecipada", action="store_true", help="Liga a busca antecipada (segundo Chrome)")
+    parser.add_argument("--http", action="store_true", help="Usa a busca direta por HTTP")
+    parser.add_argument("--headless", action="store_true", help="Chrome sem janela")
+    parser.add_argument("--chromedriver", default=None, help="Caminho do chromedriver (copiado como chromedriver.exe)")
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--pasta", default=None, help="Pasta da execução (padrão: temporária)")
+    parser.add_argument("--saida", default=None, help="Grava o relatório em JSON")
+    parser.add_argument("--comparar", default=None, help="Relatório JSON anterior para comparar")
+    argumentos = parser.parse_args()
+
+    saida = os.path.abspath(argumentos.saida) if argumentos.saida else None
+    anterior = None
+    if argumentos.comparar:
+        with open(argumentos.comparar, "r", encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    relatorio = executar(argumentos)
+    imprimir_relatorio(relatorio, anterior)
+    if saida:
+        with open(saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"Relatório gravado em {saida}")
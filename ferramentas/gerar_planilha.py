@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Gera planilhas automacao_weon.xlsx sintéticas para o benchmark, com as mesmas abas e
+cabeçalhos que verificar_ou_criar_planilha cria. Os CODs são sequenciais, então o
+resultado de cada busca no Weon falso é previsível (veja contato_sintetico).
+
+Uso:
+    python ferramentas/gerar_planilha.py                  # 1k, 50k e 300k linhas
+    python ferramentas/gerar_planilha.py --linhas 5000 --com-telefone 0.3
+"""
+
+import argparse
+import random
+
+from openpyxl import Workbook
+
+TAMANHOS_PADRAO = (1000, 50000, 300000)
+COD_INICIAL = 10000000
+
+
+def gerar_planilha(caminho, linhas, com_telefone=0.0, sem_ausentes=False, semente=0):
+    """
+    Cria a planilha com `linhas` CODs na aba de contatos. `com_telefone` é a fração que já
+    vem com telefone preenchido (não passa pela busca); `sem_ausentes` pula os CODs que o
+    Weon falso não encontra (final 7), cuja busca espera o timeout inteiro.
+    """
+    aleatorio = random.Random(semente)
+    wb = Workbook(write_only=True)
+    contatos = wb.create_sheet("contatos")
+    contatos.append(["COD", "TELEFONE"])
+    cod = COD_INICIAL
+    escritas = 0
+    while escritas < linhas:
+        cod += 1
+        if sem_ausentes and cod % 10 == 7:
+            continue
+        telefone = f"11 9{cod % 100000000:08d}" if aleatorio.random() < com_telefone else None
+        contatos.append([str(cod), telefone])
+        escritas += 1
+    wb.create_sheet("resultados").append(["COD", "TELEFONE", "HORA", "DATA", "OBSERVACAO"])
+    wb.create_sheet("retornos").append(["COD", "TELEFONE", "HORA", "DATA", "STATUS"])
+    wb.create_sheet("PRIORIDADE").append(["COD"])
+    wb.save(caminho)
+    return caminho
+
+
+def rotulo_tamanho(linhas):
+    return f"{linhas // 1000}k" if linhas % 1000 == 0 else str(linhas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas para o benchmark.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=list(TAMANHOS_PADRAO))
+    parser.add_argument("--com-telefone", type=float, default=0.0, help="Fração de CODs que já têm telefone")
+    parser.add_argument("--sem-ausentes", action="store_true", help="Não gera CODs que o Weon falso não encontra")
+    parser.add_argument("--semente", type=int, default=0)
+    argumentos = parser.parse_args()
+    for linhas in argumentos.linhas:
+        caminho = f"automacao_weon_{rotulo_tamanho(linhas)}.xlsx"
+        gerar_planilha(caminho, linhas, argumentos.com_telefone, argumentos.sem_ausentes, argumentos.semente)
+        print(f"{caminho}: {linhas} contatos")
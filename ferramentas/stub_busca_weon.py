@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita o endpoint de busca de contatos do Weon, para testar a busca
+por HTTP (ClienteBuscaHTTP) sem tocar no sistema de produção.
+
+Uso:
+    python ferramentas/stub_busca_weon.py --porta 8765 --latencia 0.2
+
+E no config.txt:
+    api_busca_url=http://127.0.0.1:8765/api/contatos?busca={codigo}
+
+Os dados são sintéticos e determinísticos (veja contato_sintetico); com --cookie, as
+requisições sem esse cookie recebem 401, como uma sessão expirada.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def contato_sintetico(codigo):
+    """
+    Regra fixa pelo último dígito do código: 0-5 tem telefone, 6 tem telefone '-',
+    7 não existe, 8 devolve outro cliente cujo código contém o buscado (divergência) e 9 tem telefone.
+    """
+    if not codigo.isdigit() or len(codigo) <= 5:
+        return None
+    final = int(codigo[-1])
+    if final == 7:
+        return None
+    cod = codigo + "0" if final == 8 else codigo
+    telefone = "-" if final == 6 else f"11 9{codigo[-8:].rjust(8, '0')}"
+    return {"cod": cod, "nome": f"Cliente {cod}", "telefone": telefone}
+
+
+class ManipuladorBusca(BaseHTTPRequestHandler):
+    latencia = 0.0
+    cookie_exigido = None
+    requisicoes = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/api/contatos":
+            self._responder(404, {"erro": "não encontrado"})
+            return
+        if self.cookie_exigido and self.cookie_exigido not in (self.headers.get("Cookie") or ""):
+            self._responder(401, {"erro": "sessão expirada"})
+            return
+        with self._lock:
+            ManipuladorBusca.requisicoes += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        codigo = (parse_qs(url.query).get("busca") or [""])[0]
+        contato = contato_sintetico(codigo)
+        self._responder(200, {"data": [contato] if contato else []})
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_servidor(porta=8765, latencia=0.0, cookie=None):
+    """ Sobe o servidor numa thread e devolve o objeto (use .shutdown() para parar) """
+    ManipuladorBusca.latencia = latencia
+    ManipuladorBusca.cookie_exigido = cookie
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), ManipuladorBusca)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub do endpoint de busca de contatos do Weon.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por requisição")
+    parser.add_argument("--cookie", default=None, help="Exige este trecho no cabeçalho Cookie (ex.: sessao=teste)")
+    argumentos = parser.parse_args()
+    servidor = iniciar_servidor(argumentos.porta, argumentos.latencia, argumentos.cookie)
+    print(f"Stub de busca em http://127.0.0.1:{argumentos.porta}/api/contatos?busca={{codigo}}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
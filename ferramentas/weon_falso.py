@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Imitação local do Weon para medir o robô sem tocar no sistema de produção: página de
+login, campo "Buscar contato" com o diálogo de resultados (v-dialog--active), discador
+(mdi-rocket-launch), campo Telefone, botão Acionar e o botão de encerrar chamada com a
+classe exata de SELETOR_BOTAO_ENCERRAR_CHAMADA. Também responde em /api/contatos como o
+stub_busca_weon, com os mesmos contatos sintéticos.
+
+Uso:
+    python ferramentas/weon_falso.py --porta 8766 --latencia-busca 0.3 --latencia-chamada 1.0
+
+E no login.txt:
+    URL=http://127.0.0.1:8766/
+"""
+
+import argparse
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from stub_busca_weon import ManipuladorBusca
+
+
+PAGINA_LOGIN = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Weon (falso) - Login</title></head>
+<body>
+<form onsubmit="return entrar()">
+  <input type="text" name="login" placeholder="Usuário">
+  <input type="password" id="password" placeholder="Senha">
+  <button type="submit">Acessar</button>
+</form>
+<script>
+function entrar() {
+  document.cookie = "sessao=weon-falso; path=/";
+  setTimeout(function () { location.href = "/app"; }, __LATENCIA_LOGIN__);
+  return false;
+}
+</script>
+</body></html>
+"""
+
+PAGINA_PRINCIPAL = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Weon (falso)</title>
+<style>.oculto { display: none; }</style></head>
+<body>
+<input type="text" id="busca" aria-label="Buscar contato">
+<div id="dialogo" class="v-dialog oculto">
+  <table><thead><tr><th>COD</th><th>Nome</th><th>Telefone</th></tr></thead><tbody id="linhas"></tbody></table>
+</div>
+<button id="discador"><i class="mdi mdi-rocket-launch"></i></button>
+<div id="painel" class="oculto">
+  <input type="text" id="telefone" placeholder="Telefone">
+  <button id="acionar"><span class="white--text">Acionar</span></button>
+</div>
+<div id="chamada"></div>
+<script>
+var dialogo = document.getElementById("dialogo");
+var linhas = document.getElementById("linhas");
+var painel = document.getElementById("painel");
+var chamada = document.getElementById("chamada");
+
+function celula(texto) { var td = document.createElement("td"); td.textContent = texto; return td; }
+
+function abrirDialogo() { dialogo.className = "v-dialog v-dialog--active"; }
+function fecharDialogo() { dialogo.className = "v-dialog oculto"; }
+
+document.getElementById("busca").addEventListener("keydown", function (evento) {
+  if (evento.key !== "Enter") return;
+  linhas.innerHTML = "";
+  abrirDialogo();
+  fetch("/api/contatos?busca=" + encodeURIComponent(this.value))
+    .then(function (resposta) { return resposta.json(); })
+    .then(function (corpo) {
+      var tr = document.createElement("tr");
+      if (corpo.data.length) {
+        var contato = corpo.data[0];
+        tr.appendChild(celula(contato.cod));
+        tr.appendChild(celula(contato.nome));
+        tr.appendChild(celula(contato.telefone));
+      } else {
+        var vazio = celula("Nenhum dado disponível");
+        vazio.colSpan = 3;
+        tr.appendChild(vazio);
+      }
+      linhas.appendChild(tr);
+    });
+});
+
+document.addEventListener("keydown", function (evento) {
+  if (evento.key === "Escape") setTimeout(fecharDialogo, __LATENCIA_FECHAR__);
+});
+
+document.getElementById("discador").addEventListener("click", function () {
+  chamada.innerHTML = "";
+  document.getElementById("telefone").value = "";
+  painel.className = "";
+});
+
+document.getElementById("acionar").addEventListener("click", function () {
+  painel.className = "oculto";
+  setTimeout(function () {
+    var botao = document.createElement("button");
+    botao.className = "v-btn v-btn--block theme--dark green accent-5";
+    botao.textContent = "Encerrar";
+    botao.addEventListener("click", function () { chamada.innerHTML = ""; });
+    chamada.appendChild(botao);
+    // Chamada que não conecta: o botão some sozinho (0 = nunca)
+    if (__DURACAO_CHAMADA__ > 0) setTimeout(function () { chamada.innerHTML = ""; }, __DURACAO_CHAMADA__);
+  }, __LATENCIA_CHAMADA__);
+});
+</script>
+</body></html>
+"""
+
+
+class ManipuladorWeonFalso(ManipuladorBusca):
+    latencia_login = 0.0
+    latencia_chamada = 0.0
+    latencia_fechar = 0.0
+    duracao_chamada = 0.0
+
+    def do_GET(self):
+        caminho = urlparse(self.path).path
+        if caminho == "/":
+            self._responder_pagina(PAGINA_LOGIN)
+        elif caminho == "/app":
+            self._responder_pagina(PAGINA_PRINCIPAL)
+        else:
+            super().do_GET()
+
+    def _responder_pagina(self, modelo):
+        html = (modelo
+                .replace("__LATENCIA_LOGIN__", str(int(self.latencia_login * 1000)))
+                .replace("__LATENCIA_CHAMADA__", str(int(self.latencia_chamada * 1000)))
+                .replace("__LATENCIA_FECHAR__", str(int(self.latencia_fechar * 1000)))
+                .replace("__DURACAO_CHAMADA__", str(int(self.duracao_chamada * 1000))))
+        dados = html.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+
+def iniciar_servidor(porta=8766, latencia_busca=0.0, latencia_chamada=0.0, latencia_login=0.0, latencia_fechar=0.0,
+                     duracao_chamada=0.0):
+    """ Sobe o Weon falso numa thread e devolve o objeto (use .shutdown() para parar) """
+    ManipuladorWeonFalso.latencia = latencia_busca
+    ManipuladorWeonFalso.latencia_chamada = latencia_chamada
+    ManipuladorWeonFalso.latencia_login = latencia_login
+    ManipuladorWeonFalso.latencia_fechar = latencia_fechar
+    ManipuladorWeonFalso.duracao_chamada = duracao_chamada
+    ManipuladorWeonFalso.cookie_exigido = None
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), ManipuladorWeonFalso)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Imitação local do Weon (login, busca e discador).")
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--latencia-busca", type=float, default=0.0, help="Segundos até a resposta da busca")
+    parser.add_argument("--latencia-chamada", type=float, default=0.0, help="Segundos entre Acionar e o botão de encerrar")
+    parser.add_argument("--latencia-login", type=float, default=0.0, help="Segundos entre Acessar e a página principal")
+    parser.add_argument("--latencia-fechar", type=float, default=0.0, help="Segundos até o diálogo fechar após o ESC")
+    parser.add_argument("--duracao-chamada", type=float, default=0.0,
+                        help="Segundos até a chamada cair sozinha, sem atendimento (0 = nunca)")
+    argumentos = parser.parse_args()
+    servidor = iniciar_servidor(argumentos.porta, argumentos.latencia_busca, argumentos.latencia_chamada,
+                                argumentos.latencia_login, argumentos.latencia_fechar, argumentos.duracao_chamada)
+    print(f"Weon falso em http://127.0.0.1:{argumentos.porta}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# O módulo abre os arquivos de log na pasta atual assim que é importado
+os.chdir(tempfile.mkdtemp(prefix="automacao_testes_"))
+
+import automacao_completa  # noqa: E402
+
+
+@pytest.fixture
+def ac():
+    automacao_completa.carregar_modulos_pesados()
+    return automacao_completa
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    """ Cada teste trabalha com os arquivos (planilha, diário, bancos) numa pasta própria """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def planilha(ac, pasta):
+    """ Planilha com as abas do programa; contatos opcionais em (cod, telefone) """
+    def criar(contatos=(), nome=None):
+        caminho = str(pasta / (nome or ac.NOME_ARQUIVO_EXCEL))
+        wb = ac.Workbook()
+        aba = wb.active
+        aba.title = ac.ABA_CONTATOS
+        aba.append(['COD', 'TELEFONE'])
+        for linha in contatos:
+            aba.append(list(linha))
+        wb.create_sheet(ac.ABA_RESULTADOS).append(['COD', 'TELEFONE', 'HORA', 'DATA', 'OBSERVACAO'])
+        wb.create_sheet(ac.ABA_RETORNOS).append(['COD', 'TELEFONE', 'HORA', 'DATA', 'STATUS'])
+        wb.create_sheet(ac.ABA_PRIORIDADE).append(['COD'])
+        wb.save(caminho)
+        return caminho
+    return criar
@@ -0,0 +1,48 @@
+import threading
+from datetime import datetime
+
+
+def _escritor(ac, caminho_excel, pasta):
+    return ac.EscritorPlanilha(caminho_excel, str(pasta / "teste.diario"), threading.Lock(),
+                               lote_maximo=10000, intervalo_maximo=3600)
+
+
+def _gravar_retornos(ac, caminho_excel, linhas):
+    wb = ac.load_workbook(caminho_excel)
+    for linha in linhas:
+        wb[ac.ABA_RETORNOS].append(linha)
+    wb.save(caminho_excel)
+
+
+def test_carrega_planilha_e_diario_respeitando_status(ac, pasta, planilha):
+    caminho = planilha()
+    _gravar_retornos(ac, caminho, [
+        ['1000001', '11999990001', '10:00', '02/01/2026', 'aguardando'],
+        ['1000002', '11999990002', '09:00', '01/01/2026', 'concluido'],
+        ['1000003', '11999990003', '25:99', '01/01/2026', 'aguardando'],
+        ['1000004', '11999990004', '08:00', '03/01/2026', 'aguardando'],
+    ])
+    escritor = _escritor(ac, caminho, pasta)
+    # Ainda só no diário: um retorno novo e o 1000004 já feito
+    escritor.anexar(ac.ABA_RETORNOS, ['1000005', '11999990005', '07:00', '01/01/2026', 'aguardando'])
+    escritor.atualizar_status_retornos([('1000004', '08:00', '03/01/2026')], ac.STATUS_RETORNO_CONCLUIDO)
+
+    agenda = ac.AgendaRetornos()
+    assert agenda.carregar(caminho, escritor) == 2
+    assert agenda.proximo_vencimento() == datetime(2026, 1, 1, 7, 0)
+    assert [r.cod for r in agenda.vencidos(datetime(2026, 1, 5))] == ['1000005', '1000001']
+    assert len(agenda) == 0
+
+
+def test_vencidos_saem_em_ordem_e_ficam_pendentes_ate_concluir(ac):
+    agenda = ac.AgendaRetornos()
+    agenda.agendar('1000002', '11999990002', '01/01/2026', '11:00')
+    agenda.agendar('1000001', '11999990001', '01/01/2026', '10:00')
+    agenda.agendar('1000003', '11999990003', '02/01/2026', '10:00')
+
+    assert agenda.vencidos(datetime(2026, 1, 1, 9, 59)) == []
+    assert [r.cod for r in agenda.vencidos(datetime(2026, 1, 1, 12, 0))] == ['1000001', '1000002']
+    assert agenda.pendente('1000001') and not agenda.pendente('1000003')
+    assert [r.chave_planilha for r in agenda.concluir('1000001')] == [('1000001', '10:00', '01/01/2026')]
+    assert not agenda.pendente('1000001')
+    assert len(agenda) == 1
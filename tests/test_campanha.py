@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def campanha(ac, pasta, planilha):
+    """ Abre instâncias (operadores) sobre o mesmo arquivo da campanha, com reservas curtas """
+    caminho_excel = planilha([('1000001', '11'), ('1000002', ''), ('1000003', '33'), ('1000004', '')])
+    abertas = []
+
+    def abrir(operador, duracao_reserva=300.0):
+        instancia = ac.CampanhaCompartilhada(str(pasta / "campanha.db"), operador, duracao_reserva=duracao_reserva)
+        abertas.append(instancia)
+        return instancia
+    abrir.caminho_excel = caminho_excel
+    yield abrir
+    for instancia in abertas:
+        instancia._conexao.close()
+
+
+def test_importa_uma_vez_por_marca_entre_aberturas(ac, campanha):
+    primeira = campanha(ac.identificar_operador('ana'))
+    assert primeira.importar(campanha.caminho_excel, 1700000000.5) == 4
+    # Outra abertura do programa: mesmo operador, PID diferente
+    segunda = campanha('ana@maquina:99999')
+    assert segunda.importar(campanha.caminho_excel, 1700000000.5) == 0
+    assert segunda._executar("SELECT COUNT(*) FROM importacao").fetchone()[0] == 1
+    # Aba de contatos mudou: importa de novo, mas só acrescenta o que ainda não existe
+    assert segunda.importar(campanha.caminho_excel, 1700000999.0) == 0
+
+
+def test_reserva_vencida_volta_para_a_fila_e_resultado_conclui_para_todos(ac, campanha):
+    ana = campanha('ana:1', duracao_reserva=0.05)
+    bia = campanha('bia:2')
+    ana.importar(campanha.caminho_excel, 1.0)
+
+    assert ana.reservar(2) == [('1000001', '11'), ('1000002', '')]
+    assert bia.reservar(1) == [('1000003', '33')]
+    assert bia.reservas_de_outros() == 2
+    time.sleep(0.1)
+    # Ana caiu sem devolver: as reservas dela vencem e passam para a Bia, antes dos pendentes
+    assert bia.reservas_de_outros() == 0
+    assert bia.reservar(2) == [('1000001', '11'), ('1000002', '')]
+
+    # A Ana volta e grava o resultado do COD que já é da Bia: ele é concluído mesmo assim
+    ana.registrar_resultado(['1000001', '11', '10:00', '01/01/2026', 'ATENDEU'])
+    assert not bia.reservar_cod('1000001')
+    assert ana.contatados() == {'1000001'}
+    situacoes = dict(bia._executar("SELECT chave, situacao FROM contato").fetchall())
+    assert situacoes == {'1000001': 'concluido', '1000002': 'reservado', '1000003': 'reservado', '1000004': 'pendente'}
+
+
+def test_concluir_sem_resultado_respeita_o_dono_da_reserva(ac, campanha):
+    ana = campanha('ana:1')
+    bia = campanha('bia:2')
+    ana.importar(campanha.caminho_excel, 1.0)
+    ana.reservar(1)
+
+    assert not bia.reservar_cod('1000001')
+    bia.concluir('1000001')
+    assert ana._executar("SELECT situacao, operador FROM contato WHERE chave = '1000001'").fetchone() == ('reservado', 'ana:1')
+
+
+def test_encerrar_devolve_as_reservas_para_os_outros(ac, campanha):
+    ana = campanha('ana:1')
+    bia = campanha('bia:2')
+    ana.importar(campanha.caminho_excel, 1.0)
+    ana.reservar(3)
+
+    ana.encerrar()
+    assert bia.reservar(4) == [('1000001', '11'), ('1000002', ''), ('1000003', '33'), ('1000004', '')]
@@ -0,0 +1,35 @@
+def test_botao_some_antes_do_tempo_minimo_e_caiu(ac):
+    detector = ac.DetectorChamada(tempo_toque=40, tempo_minimo=5)
+
+    assert detector.avaliar({'ativa': True}, 1.0) is None
+    assert detector.avaliar({'ativa': False}, 2.0) == (ac.OBS_CAIU, False)
+
+
+def test_sem_seletor_a_chamada_fica_com_o_operador_depois_do_tempo_minimo(ac):
+    detector = ac.DetectorChamada(tempo_toque=40, tempo_minimo=5)
+
+    assert detector.avaliar({'ativa': True}, 6.0) is None
+    assert detector.com_operador
+    # Nem o fim da chamada nem o tempo de toque decidem mais nada
+    assert detector.avaliar({'ativa': False}, 60.0) is None
+
+
+def test_com_seletor_toque_longo_desliga_como_nao_atendeu(ac):
+    detector = ac.DetectorChamada(tempo_toque=40, tempo_minimo=5, seletor_atendida='.cronometro')
+
+    assert detector.avaliar({'ativa': True}, 20.0) is None
+    assert detector.avaliar({'ativa': True}, 40.0) == (ac.OBS_NAO_ATENDEU, True)
+
+
+def test_com_seletor_chamada_que_some_sem_atender_e_nao_atendeu(ac):
+    detector = ac.DetectorChamada(tempo_toque=40, tempo_minimo=5, seletor_atendida='.cronometro')
+
+    assert detector.avaliar({'ativa': False}, 12.0) == (ac.OBS_NAO_ATENDEU, False)
+
+
+def test_chamada_atendida_nunca_e_registrada_sozinha(ac):
+    detector = ac.DetectorChamada(tempo_toque=40, tempo_minimo=5, seletor_atendida='.cronometro')
+
+    assert detector.avaliar({'ativa': True, 'atendida': True}, 3.0) is None
+    assert detector.avaliar({'ativa': False}, 4.0) is None
+    assert detector.avaliar({'ativa': True}, 90.0) is None
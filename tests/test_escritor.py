@@ -0,0 +1,86 @@
+import os
+import threading
+
+
+def _escritor(ac, caminho_excel, pasta):
+    # Lote e intervalo grandes: nada vai para a planilha sem descarregar()
+    return ac.EscritorPlanilha(caminho_excel, str(pasta / "teste.diario"), threading.Lock(),
+                               lote_maximo=10000, intervalo_maximo=3600)
+
+
+def _linhas(ac, caminho_excel, aba):
+    wb = ac.load_workbook(caminho_excel, read_only=True)
+    try:
+        return [[ac.texto_celula(valor) for valor in linha] for linha in wb[aba].iter_rows(min_row=2, values_only=True)]
+    finally:
+        wb.close()
+
+
+def _editar_por_fora(ac, caminho_excel, aba, linha):
+    """ Como o Excel faria: abre, mexe e salva, com data de modificação nova """
+    antes = os.stat(caminho_excel)
+    wb = ac.load_workbook(caminho_excel)
+    wb[aba].append(linha)
+    wb.save(caminho_excel)
+    os.utime(caminho_excel, ns=(antes.st_atime_ns, antes.st_mtime_ns + 5_000_000_000))
+
+
+def test_diario_e_reaplicado_depois_de_uma_queda(ac, pasta, planilha):
+    caminho = planilha([('1000001', ''), ('1000002', '')])
+    escritor = _escritor(ac, caminho, pasta)
+    escritor.anexar(ac.ABA_RESULTADOS, ['1000001', '11999990000', '10:00', '01/01/2026', 'ATENDEU'])
+    escritor.atualizar_telefone('1000002', '11888880000')
+    escritor.atualizar_telefone('1000002', '11777770000')
+    # Queda: nada foi gravado na planilha e a última linha do diário ficou pela metade
+    with open(escritor.caminho_diario, "a", encoding="utf-8") as f:
+        f.write('{"op": "anexar", "aba": ')
+    assert _linhas(ac, caminho, ac.ABA_RESULTADOS) == []
+
+    recuperado = _escritor(ac, caminho, pasta)
+    assert len(recuperado.recuperadas) == 3
+    assert recuperado.pendentes_da_aba(ac.ABA_RESULTADOS) == [['1000001', '11999990000', '10:00', '01/01/2026', 'ATENDEU']]
+    assert recuperado.descarregar()
+    recuperado.encerrar()
+
+    assert _linhas(ac, caminho, ac.ABA_RESULTADOS) == [['1000001', '11999990000', '10:00', '01/01/2026', 'ATENDEU']]
+    # A última atualização de telefone do COD é a que vale
+    assert _linhas(ac, caminho, ac.ABA_CONTATOS) == [['1000001', ''], ['1000002', '11777770000']]
+    assert os.path.getsize(escritor.caminho_diario) == 0
+
+
+def test_gravacao_do_programa_nao_conta_como_edicao_por_fora(ac, pasta, planilha):
+    caminho = planilha([('1000001', '')])
+    estado = ac.EstadoExecucao(str(pasta / "estado.db"))
+    escritor = _escritor(ac, caminho, pasta)
+    escritor.ao_gravar.append(estado.registrar_impressao)
+    assert estado.carregar_contatados(caminho, escritor) == set()
+    marca = estado.marca_contatos()
+
+    escritor.anexar(ac.ABA_RESULTADOS, ['1000001', '', '', '', 'CAIU'])
+    escritor.descarregar()
+    escritor.encerrar()
+
+    assert estado.marca_contatos() == marca
+    assert not estado._ler('alterada_por_fora')
+    # Sem remontagem: o índice só tem o que o programa registrou (aqui, nada)
+    assert estado.carregar_contatados(caminho, escritor) == set()
+
+
+def test_edicao_por_fora_entre_gravacoes_e_percebida(ac, pasta, planilha):
+    caminho = planilha([('1000001', ''), ('1000002', '')])
+    estado = ac.EstadoExecucao(str(pasta / "estado.db"))
+    escritor = _escritor(ac, caminho, pasta)
+    escritor.ao_gravar.append(estado.registrar_impressao)
+    estado.carregar_contatados(caminho, escritor)
+    escritor.anexar(ac.ABA_RESULTADOS, ['1000001', '', '', '', 'CAIU'])
+    escritor.descarregar()
+    marca = estado.marca_contatos()
+
+    _editar_por_fora(ac, caminho, ac.ABA_RESULTADOS, ['1000002', '', '', '', 'ATENDEU'])
+    escritor.anexar(ac.ABA_RESULTADOS, ['1000003', '', '', '', 'CAIU'])
+    escritor.descarregar()
+    escritor.encerrar()
+
+    assert estado.marca_contatos() != marca
+    assert estado.carregar_contatados(caminho, escritor) == {'1000001', '1000002', '1000003'}
+    assert not estado._ler('alterada_por_fora')
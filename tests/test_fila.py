@@ -0,0 +1,152 @@
+import threading
+import time
+
+
+def _cods(quantidade, inicio=1000000):
+    return [str(inicio + i) for i in range(quantidade)]
+
+
+def _contar_esperas(lista):
+    chamadas = []
+    aguardar = lista.aguardar
+
+    def contando(posicao, tempo_maximo=0.5):
+        chamadas.append(posicao)
+        return aguardar(posicao, tempo_maximo)
+    lista.aguardar = contando
+    return chamadas
+
+
+def _publicar_depois(lista, atraso, cods, finalizar=True):
+    def publicar():
+        time.sleep(atraso)
+        lista._publicar(list(cods), [''] * len(cods))
+        if finalizar:
+            with lista._condicao:
+                lista.finalizada = True
+                lista._condicao.notify_all()
+    thread = threading.Thread(target=publicar, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_retomada_espera_a_linha_salva_sem_girar(ac):
+    cods = _cods(100)
+    lista = ac.ListaContatos()
+    lista._publicar(cods[:10], [''] * 10)
+    fila = ac.FilaTarefas()
+    fila.definir_lista(lista, retomar_apos=(50, cods[50]))
+    chamadas = _contar_esperas(lista)
+    thread = _publicar_depois(lista, 0.3, cods[10:])
+
+    tarefa = fila.proxima()
+    thread.join()
+
+    assert tarefa.cod == cods[51]
+    assert tarefa.posicao == 51
+    # Esperas bloqueantes na linha 50, não um laço sobre a posição 0 (já carregada)
+    assert chamadas and set(chamadas) == {50}
+    assert len(chamadas) < 10
+
+
+def test_retomada_acha_o_cod_deslocado_sem_esperar_a_aba_toda(ac, monkeypatch):
+    monkeypatch.setattr(ac.ListaContatos, 'TAMANHO_BLOCO', 10)
+    cods = ['900', '901', '902'] + _cods(100)   # Três linhas inseridas no topo desde a última execução
+    lista = ac.ListaContatos()
+    lista._publicar(cods[:55], [''] * 55)
+    fila = ac.FilaTarefas()
+    fila.definir_lista(lista, retomar_apos=(50, cods[53]))
+    # Um bloco depois da linha salva já basta: o resto da aba nunca chega neste teste
+    thread = _publicar_depois(lista, 0.2, cods[55:70], finalizar=False)
+
+    tarefa = fila.proxima()
+    thread.join()
+
+    assert not lista.finalizada
+    assert tarefa.cod == cods[54]
+
+
+def test_retomada_com_cod_que_sumiu_volta_ao_inicio(ac):
+    cods = _cods(20)
+    lista = ac.ListaContatos()
+    lista.preencher(cods, [''] * 20)
+    fila = ac.FilaTarefas()
+    fila.definir_lista(lista, retomar_apos=(5, '123'))
+
+    assert fila.proxima().cod == cods[0]
+
+
+def test_retomada_no_plano_com_posicao_da_aba_toda(ac):
+    cods = ['1000001', '1000002', '', '1000003', '1000002', '1000004', '1000005']
+    plano = ac.PlanoExecucao.compilar(cods, ['11', '', '', '33', '', '44', ''], frozenset({'1000001', '1000003'}))
+    fila = ac.FilaTarefas()
+    fila.definir_lista(plano.lista(), retomar_apos=(3, '1000003'))
+
+    assert [fila.proxima().cod, fila.proxima().cod, fila.proxima()] == ['1000004', '1000005', None]
+
+
+def _pendentes_esperados(ac, fila, lista):
+    """ Contagem direta: tarefas no heap mais os CODs distintos da lista à frente do cursor que ainda vão sair """
+    chaves = {ac.chave_tarefa(cod) for cod in lista.cods[fila._cursor:lista.carregados]} - {''}
+    return len(fila._ativas) + len(chaves - set(fila._ativas) - fila._processadas)
+
+
+def test_pendentes_conta_uma_vez_cod_repetido_na_lista(ac):
+    lista = ac.ListaContatos()
+    lista.preencher(['1000001', '1000002', '1000001', '', '1000003'], [''] * 5)
+    fila = ac.FilaTarefas()
+    fila.definir_lista(lista)
+
+    assert fila.total == 3
+    assert [fila.proxima().cod for _ in range(3)] == ['1000001', '1000002', '1000003']
+    assert fila.total == 3
+    assert fila.proxima() is None
+
+
+def test_pendentes_nao_conta_duas_vezes_cod_do_heap_que_esta_na_lista(ac):
+    lista = ac.ListaContatos()
+    lista.preencher(['1000001', '1000002', '1000003'], [''] * 3)
+    fila = ac.FilaTarefas()
+    fila.definir_lista(lista)
+    fila.adicionar([ac.Tarefa('1000003', '', ac.PRIORIDADE_MANUAL), ac.Tarefa('1000009', '', ac.PRIORIDADE_MANUAL)],
+                   ac.PRIORIDADE_MANUAL)
+
+    assert fila.pendentes == 4
+    assert [fila.proxima().cod for _ in range(2)] == ['1000003', '1000009']
+    assert fila.pendentes == 2
+    assert [fila.proxima().cod for _ in range(2)] == ['1000001', '1000002']
+    assert fila.proxima() is None
+    assert fila.total == 4
+
+
+def test_pendentes_bate_com_a_contagem_direta(ac):
+    import random
+    sorteio = random.Random(1)
+    for _ in range(200):
+        cods = [str(sorteio.randint(1000000, 1000030)) if sorteio.random() > 0.05 else '' for _ in range(40)]
+        lista = ac.ListaContatos()
+        fila = ac.FilaTarefas()
+        if sorteio.random() < 0.3:
+            fila.adicionar([ac.Tarefa(sorteio.choice(cods) or '1000001', '', 1)], 1)
+        if sorteio.random() < 0.5:
+            lista.preencher(cods, [''] * 40)
+        else:
+            lista._publicar(cods[:10], [''] * 10)
+        fila.definir_lista(lista, retomar_apos=(5, cods[5]) if sorteio.random() < 0.3 and lista.finalizada else None)
+        for _ in range(60):
+            sorteado = sorteio.random()
+            if sorteado < 0.3:
+                nivel = sorteio.randint(0, 2)
+                fila.adicionar([ac.Tarefa(str(sorteio.randint(1000000, 1000040)), '', nivel)], nivel,
+                               forcar=sorteio.random() < 0.2)
+            elif sorteado < 0.4 and not lista.finalizada:
+                inicio = lista.carregados
+                lista._publicar(cods[inicio:inicio + 10], [''] * len(cods[inicio:inicio + 10]))
+                lista.finalizada = lista.carregados == len(cods)
+            else:
+                with fila._lock:
+                    if fila._retirar_do_heap() is None:
+                        fila._retirar_da_lista()
+            pendentes = fila.pendentes
+            with fila._lock:
+                assert pendentes == _pendentes_esperados(ac, fila, lista)
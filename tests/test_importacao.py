@@ -0,0 +1,21 @@
+def test_cod_formatado_ja_contatado_e_descartado(ac):
+    aceitos, descartes = ac.preparar_cods(['12.345.678/0001-90', '98765432000110'],
+                                          contatados={'12345678000190'})
+
+    assert aceitos == ['98765432000110']
+    assert descartes['ja_contatados'] == 1
+
+
+def test_cod_pendente_na_lista_principal_conta_como_ja_na_fila(ac):
+    lista = ac.ListaContatos()
+    lista.preencher(['1000001', '1000002', '1000003'], [''] * 3)
+    fila = ac.FilaTarefas()
+    fila.definir_lista(lista)
+    fila.adicionar([ac.Tarefa('1000009', '', ac.PRIORIDADE_MANUAL)], ac.PRIORIDADE_MANUAL)
+    assert fila.proxima().cod == '1000009'
+    assert fila.proxima().cod == '1000001'
+
+    assert fila.chaves_na_fila() == {'1000002', '1000003'}
+    aceitos, descartes = ac.preparar_cods(['1.000.001', '1.000.002', '1000009', '1000010'], fila.chaves_na_fila())
+    assert aceitos == ['1.000.001', '1000009', '1000010']
+    assert descartes['ja_na_fila'] == 1
@@ -0,0 +1,105 @@
+import pytest
+
+
+class DriverFalso:
+    """ Chrome falso: 'ok' na página principal, 'deslogado' na tela de login, 'morto' não responde """
+    def __init__(self, estado='ok'):
+        self.estado = estado
+        self.fechado = False
+        self.logins = 0
+
+    @property
+    def current_url(self):
+        if self.estado == 'morto':
+            raise RuntimeError("chromedriver não responde")
+        return "https://weon.exemplo/"
+
+    def find_elements(self, por, seletor):
+        if self.estado == 'morto':
+            raise RuntimeError("chromedriver não responde")
+        if seletor == "login":
+            return ['campo'] if self.estado == 'deslogado' else []
+        return ['campo'] if self.estado == 'ok' else []
+
+    def get(self, url):
+        if self.estado == 'morto':
+            raise RuntimeError("chromedriver não responde")
+
+    def quit(self):
+        self.fechado = True
+
+
+@pytest.fixture
+def navegador(ac, monkeypatch):
+    """ Troca o Chrome e o login do Weon por falsos; devolve a lista de drivers criados """
+    criados = []
+
+    def criar_driver(headless=False, perfil=None):
+        driver = DriverFalso('deslogado')
+        driver.headless = headless
+        criados.append(driver)
+        return driver
+
+    def entrar_no_weon(driver, usuario, senha, url_weon, tempo=30):
+        if driver.estado == 'morto':
+            raise RuntimeError("chromedriver não responde")
+        entrou = driver.estado == 'deslogado'
+        driver.estado = 'ok'
+        driver.logins += entrou
+        return entrou
+
+    monkeypatch.setattr(ac, 'criar_driver', criar_driver)
+    monkeypatch.setattr(ac, 'entrar_no_weon', entrar_no_weon)
+    monkeypatch.setattr(ac, 'esperar_pagina_principal', lambda driver, tempo=30: driver.estado == 'ok')
+    return criados
+
+
+def _supervisor(ac, **opcoes):
+    esperas = []
+    opcoes.setdefault('aguardar', lambda segundos: esperas.append(segundos) or False)
+    supervisor = ac.SupervisorNavegador(('usuario', 'senha', 'https://weon.exemplo/'), **opcoes)
+    return supervisor, esperas
+
+
+def test_sessao_expirada_faz_novo_login_no_mesmo_chrome(ac, navegador):
+    supervisor, esperas = _supervisor(ac)
+    assert supervisor.conectar()
+    driver = supervisor.driver
+    driver.estado = 'deslogado'
+
+    assert supervisor.situacao() == 'deslogado'
+    assert supervisor.recuperar()
+    assert supervisor.driver is driver
+    assert driver.logins == 2
+    assert len(navegador) == 1 and esperas == []
+
+
+def test_chrome_morto_e_trocado_por_outro(ac, navegador):
+    supervisor, _ = _supervisor(ac, headless=True)
+    assert supervisor.conectar()
+    antigo = supervisor.driver
+    antigo.estado = 'morto'
+
+    assert supervisor.situacao() == 'morto'
+    assert supervisor.recuperar()
+    assert supervisor.driver is not antigo and antigo.fechado
+    assert supervisor.situacao() == 'ok'
+    assert all(driver.headless for driver in navegador)
+
+
+def test_tentativas_com_espera_crescente(ac, navegador, monkeypatch):
+    monkeypatch.setattr(ac, 'esperar_pagina_principal', lambda driver, tempo=30: False)
+    supervisor, esperas = _supervisor(ac, max_tentativas=4)
+
+    assert not supervisor.conectar()
+    assert esperas == list(ac.SupervisorNavegador.ESPERAS[1:4])
+    assert all(driver.fechado for driver in navegador)
+
+
+def test_nao_abre_chrome_depois_de_encerrar(ac, navegador):
+    encerrado = []
+    supervisor, _ = _supervisor(ac, encerrado=lambda: bool(encerrado))
+    encerrado.append(True)
+
+    assert not supervisor.conectar()
+    assert navegador == []